@@ -1,1029 +1,406 @@
 import streamlit as st
-import json
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import logging
 import random
 import re
-import os
+import time
 import traceback
 
+import numpy as np
+
+import catalog
+import hero_constraints
+import hero_optimizer
+import model
+import scheme_rules
+import setup_log
+from scheme_rules import SETUP_RULES
+from setup_log import logger
+
 # TOGGLE THIS TO TRUE/FALSE TO SHOW/HIDE SYNERGY LOGS
 SHOW_SYNERGY_DEBUG = True
 
-SETUP_RULES = {
-    1: {"villains": 1, "henchmen": 1, "bystanders": 1, "heroes": 5},
-    2: {"villains": 2, "henchmen": 1, "bystanders": 2, "heroes": 5},
-    3: {"villains": 3, "henchmen": 1, "bystanders": 8, "heroes": 5},
-    4: {"villains": 3, "henchmen": 2, "bystanders": 8, "heroes": 5},
-    5: {"villains": 4, "henchmen": 2, "bystanders": 12, "heroes": 6}
-}
+# Seeds are drawn from [0, SEED_RANGE) when none is given
+SEED_RANGE = 2 ** 32
+
+# Setup tags that switch on a Hero mechanic bonus (catalog.HeroFeatures flag -> tag)
+MECHANIC_TAGS = {"wound": "Mechanic_Wound", "rescue": "Mechanic_Rescue", "artifact": "Mechanic_Artifact",
+                 "ko": "Gen_KO", "graveyard": "Mechanic_Rise_Dead"}
+MECHANIC_POINTS = {"wound": 2, "rescue": 4, "artifact": 5, "ko": 2, "graveyard": 3}
+
+class DeckState:
+    """Hero Deck under construction plus running totals for the scorer.
+
+    Heroes only go in through add()/extend()/reset(), so the cost, class,
+    trigger and team aggregates are updated once per Hero instead of being
+    rebuilt from the cards for every candidate.
+    """
+    def __init__(self, features):
+        self.features = features  # hero -> catalog.HeroFeatures
+        self.reset([])
+
+    def reset(self, heroes):
+        self.heroes = []
+        self.cost_sum = 0
+        self.cost_count = 0
+        self.classes = set()
+        self.needs = set()
+        self.teams = {}  # team name (as in the data) -> number of Heroes
+        self.extend(heroes)
+
+    def add(self, hero):
+        self.heroes.append(hero)
+        if hero.get('is_placeholder'): return
+        f = self.features(hero)
+        self.cost_sum += sum(f.costs)
+        self.cost_count += len(f.costs)
+        self.classes.update(f.classes)
+        self.needs.update(f.needs)
+        self.teams[f.team] = self.teams.get(f.team, 0) + 1
+
+    def extend(self, heroes):
+        for h in heroes: self.add(h)
+
+    def __len__(self):
+        return len(self.heroes)
+
+    def __iter__(self):
+        return iter(self.heroes)
+
+    @property
+    def avg_cost(self):
+        return self.cost_sum / self.cost_count if self.cost_count else 0
+
+    def team_count(self, team_fragment):
+        """Number of Heroes whose team contains the fragment (e.g. "x-men")."""
+        return sum(n for team, n in self.teams.items() if team_fragment in team.lower())
 
 
 class LegendaryRandomizer:
-    def __init__(self, user_sets, player_count, user_selections=None):
+    def __init__(self, user_sets, player_count, user_selections=None, seed=None):
         self.user_sets = [s.lower().strip() for s in user_sets]
         self.player_count = player_count
         self.user_selections = user_selections or {}  # <--- NEW: Store selections
         self.data = {}
+        # Shared catalog + expansion bitmask, set by load_data (used for indexed lookups)
+        self.catalog = None
+        self.set_mask = 0
+        self.loaded = False
+        self.generated = 0
+        self.reset(seed)
+        logger.debug("Randomizer ready for %s players using sets: %s", player_count, self.user_sets)
+
+    def reset(self, seed=None):
+        """Clears the per-setup state so the same instance can generate again."""
+        # All randomness goes through self.rng, so a seed reproduces a setup
+        self.seed = seed if seed is not None else random.randrange(SEED_RANGE)
+        self.rng = random.Random(self.seed)
         self.setup = {}
-        self.synergy_tags = []
-        self.scheme_mods = {
-            "twists": 8,
-            "twist_note": "",
-            "master_strikes": 5,
-            "bystanders_override": None,
-            "bystanders_add": 0,
-            "extra_villains": 0,
-            "extra_henchmen": 0,
-            "required_villains": [],
-            "required_henchmen": [],
-            # Dynamically set base hero count (5 for 1-4p, 6 for 5p)
-            "hero_deck_count": SETUP_RULES[player_count]["heroes"],
-            "villain_deck_heroes": 0,
-            "required_villain_deck_heroes": [],
-            "heroes_from_hero_deck": 0, 
-            "team_versus_counts": None,
-            "custom_deck": None,    
-            "banned_heroes": [],     
-            "required_hero_deck_includes": [],
-            "bystanders_in_hero_deck": 0,
-            "tyrant_masterminds_count": 0,
-            "sidekicks_in_villain_deck": 0,
-            "ambitions_in_villain_deck": 0,
-            "officers_in_villain_deck": 0,
-            "player_picked_heroes": 0,
-            "required_teams": [],
-            "henchmen_in_hero_deck_count": 0, 
-            "henchmen_in_hero_deck_obj": None, 
-            "banned_villains": [],
-            "banned_henchmen": [],
-            "tactics_in_villain_deck": 0,
-            "quantum_ambush_scheme": False,
-            "henchman_alias": None,
-            "wedding_heroes": [],
-            "banned_teams_from_open_selection": [],
-            "drained_mastermind_required": False,
-            "extra_hero_card_count": None,
-            "double_group_count": False,
-            "half_deck_mechanic": False
-        }
-        print(f"2. Randomizer ready for {player_count} players using sets: {self.user_sets}")
+        # Bitset of the Scheme, Mastermind and Villain tags (see model.TAGS)
+        self.synergy_mask = 0
+        self.scheme_mods = scheme_rules.default_scheme_mods(self.player_count)
+        self.scheme_record = None
+        # Phase timings of this setup (see _span) and Hero scores computed
+        self.timings = []
+        self.score_evaluations = 0
+        # Warning events of this setup (see _warn)
+        self.events = []
+
+    def _has_tag(self, tag):
+        """Whether the Scheme, Mastermind or a Villain Group carries the tag."""
+        return bool(self.synergy_mask & model.TAGS.bit(tag))
+
+    def _warn(self, name, msg, **fields):
+        """Records a warning event for result['events'] and logs it (see setup_log)."""
+        self.events.append({"event": name, **fields})
+        setup_log.event(logging.WARNING, name, msg, **fields)
+
+    @contextlib.contextmanager
+    def _span(self, phase):
+        """Times a block into self.timings. Spans are listed in start order."""
+        span = {"phase": phase, "ms": None}
+        self.timings.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span['ms'] = round((time.perf_counter() - start) * 1000, 3)
     
     def load_data(self):
-        print("3. Loading Data Files...")
-        files = {
-            "heroes": "enriched_heroes.json",
-            "masterminds": "enriched_masterminds.json",
-            "villains": "enriched_villains.json",
-            "henchmen": "enriched_henchmen.json",
-            "schemes": "enriched_schemes.json"
-        }
-        
+        logger.debug("Loading data files...")
+        # The decoded files are shared process-wide (see catalog.py)
+        try:
+            shared = catalog.get_catalog()
+        except Exception as e:
+            logger.error("Error loading data files: %s", e)
+            return False
+
+        if shared.missing:
+            logger.critical("Missing %s. Cannot proceed.", catalog.DATA_FILES[shared.missing[0]])
+            return False
+
         loaded_count = 0
-        for key, filename in files.items():
-            if not os.path.exists(filename):
-                print(f"   [!] CRITICAL: Missing {filename}. Cannot proceed.")
-                return False
-            
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    raw_data = json.load(f)
-                
-                self.data[key] = [
-                    item for item in raw_data 
-                    if self._is_in_set(item.get('set', ''))
-                ]
-                
-                count = len(self.data[key])
-                print(f"   - Loaded {count} {key}")
-                if count > 0: loaded_count += 1
+        self.catalog = shared
+        self.set_mask = shared.selection_mask(self.user_sets)
+        for key in catalog.DATA_FILES:
+            self.data[key] = shared.filter(key, self.set_mask)
 
-            except Exception as e:
-                print(f"   [!] Error loading {filename}: {e}")
-                return False
+            count = len(self.data[key])
+            logger.debug("Loaded %d %s", count, key)
+            if count > 0: loaded_count += 1
 
         if loaded_count == 0:
-            print("   [!] ERROR: No data loaded! Check your set names.")
+            logger.error("No data loaded! Check your set names: %s", self.user_sets)
             return False
+        self.loaded = True
         return True
 
-    def _is_in_set(self, item_set_str):
-        if not item_set_str: return False
-        item_sets = [s.strip().lower() for s in item_set_str.split('/')]
-        return any(s in self.user_sets for s in item_sets)
-
+    # Team and tags come from the parsed item models (see model.py)
     def _get_hero_team(self, hero_obj):
-        if 'cards' in hero_obj and len(hero_obj['cards']) > 0:
-            team = hero_obj['cards'][0].get('team')
-            # Check if team is None or empty string, fallback to 'Unknown'
-            return team if team else 'Unknown'
-        return 'Unknown'
+        return self.catalog.model(hero_obj).team
 
     def _get_tags(self, obj):
-        if 'tags' not in obj: return []
-        flat_tags = []
-        for category, tags in obj['tags'].items():
-            flat_tags.extend(tags)
-        return flat_tags
+        return list(self.catalog.model(obj).tags)
 
     def _get_hero_tags(self, hero):
-        all_tags = set()
-        team = self._get_hero_team(hero)
-        if team and team != 'Unknown':
-             clean_team = team.replace('-', ' ').title().replace(' ', '')
-             all_tags.add(f"Team_{clean_team}")
-        for card in hero['cards']:
-            if 'tags' in card:
-                for cat, tags in card['tags'].items():
-                    for t in tags: all_tags.add(t)
-        return list(all_tags)
+        return list(self.catalog.model(hero).hero_tags)
 
     def _find_group_by_name(self, name_fragment, group_type):
-        target_list = self.data['henchmen'] if group_type == 'henchmen' else self.data['villains']
+        key = 'henchmen' if group_type == 'henchmen' else 'villains'
+        index = self.catalog.names[key]
         # Exact match
-        for g in target_list:
-            g_name = g.get('name') or g.get('group_name')
-            if g_name.lower() == name_fragment.lower(): return g
+        found = self.catalog.first(key, index.equal(name_fragment), self.set_mask)
+        if found: return found
         # Fuzzy match
         singular = name_fragment.rstrip('s')
-        for g in target_list:
-            g_name = g.get('name') or g.get('group_name')
-            if singular.lower() in g_name.lower(): return g
-        return None
+        return self.catalog.first(key, index.containing(singular), self.set_mask)
 
     def parse_scheme_rules(self, scheme):
-        """Intelligent parsing for Setup mechanics."""
-        text = " ".join(scheme.get('description', []))
-        
-        # --- 0. VILLAIN COUNT OVERRIDES (NEW) ---
-        # Matches: "1-2 players: Use 3 Villain Groups"
-        # Must run BEFORE Twist Math so we know the total Villain count for "Per Reality" logic
-        v_override_match = re.search(r'(?:For\s+)?(\d+)(?:-(\d+))?\s+players:?.*?Use (\d+) Villain Groups', text, re.IGNORECASE)
-        if v_override_match:
-            low = int(v_override_match.group(1))
-            high = int(v_override_match.group(2)) if v_override_match.group(2) else low
-            target = int(v_override_match.group(3))
-            
-            if low <= self.player_count <= high:
-                # Calculate how many extras we need to reach the target
-                # We use SETUP_RULES directly since self.setup['villains'] isn't populated yet
-                base_v = SETUP_RULES.get(self.player_count, {}).get('villains', 2)
-                diff = target - base_v
-                if diff > 0:
-                    self.scheme_mods['extra_villains'] = diff
-        
-# --- # --- 1. TWIST MATH (FIXED PRIORITIES) ---
-        explicit_twist_found = False
-        
-        # A. PER REALITY CHECK (Highest Priority - Nexus Scheme)
-        # Matches: "Add 2 Twists to each Reality"
-        reality_twist = re.search(r'Add (\d+) Twists to each Reality', text, re.IGNORECASE)
-        if reality_twist:
-            per_reality = int(reality_twist.group(1))
-            
-            # Total Villains = Base + Extra (calculated in Section 0)
-            base_v = SETUP_RULES.get(self.player_count, {}).get('villains', 2)
-            total_v = base_v + self.scheme_mods['extra_villains']
-            
-            self.scheme_mods['twists'] = per_reality * total_v
-            self.scheme_mods['twist_note'] = f"({per_reality} per Reality x {total_v} Realities)"
-            explicit_twist_found = True
-
-        # B. SPECIFIC OVERRIDES (Ranges or Lists)
-        # Matches patterns like: "2 players: 9 Twists", "1 or 4 players: 10 Twists"
-        # Only run if we didn't find a higher priority rule (like Per Reality)
-        if not explicit_twist_found:
-            specific_matches = re.finditer(r'(?:For\s+)?([0-9\s\-,or]+?)\s+players:?.*?(?:use\s*)?(\d+)\s+Twists', text, re.IGNORECASE)
-            
-            for m in specific_matches:
-                condition_str = m.group(1).strip()
-                val = int(m.group(2))
-                is_match = False
-                
-                # Range Check (e.g. "2-3")
-                if '-' in condition_str:
-                    parts = condition_str.split('-')
-                    if len(parts) == 2 and parts[0].strip().isdigit() and parts[1].strip().isdigit():
-                        low, high = int(parts[0]), int(parts[1])
-                        if low <= self.player_count <= high:
-                            is_match = True
-                
-                # List Check (e.g. "1 or 4")
-                else:
-                    nums = [int(n) for n in re.findall(r'\d+', condition_str)]
-                    if self.player_count in nums:
-                        is_match = True
-                
-                if is_match:
-                    self.scheme_mods['twists'] = val
-                    self.scheme_mods['twist_note'] = f"(For {condition_str} players)"
-                    explicit_twist_found = True
-                    break
-
-        # 2. STANDARD FORMULAS (Fallback)
-        if not explicit_twist_found:
-            # ... (Paste your existing standard formula logic here: A, B, C, D, E) ...
-            # DEFINITIONS
-            # A. Base +/- Mod (Prioritized): "11 Twists, minus 1 Twist per player"
-            base_mod_match = re.search(r'(\d+)\s+Twists.*?(minus|plus)\s+(\d+)(?:\s+Twists?)?\s+per\s+player', text, re.IGNORECASE)
-            
-            # B. Players + X: "Twists equal to the number of players plus 6"
-            players_plus_match = re.search(r'Twists equal to the number of players plus (\d+)', text, re.IGNORECASE)
-            
-            # C. Mixed: "1 Twist, plus 2 per player"
-            mixed_match = re.search(r'(\d+)\s+Twists?,?\s+plus\s+(\d+)\s+Twists?\s+per\s+player', text, re.IGNORECASE)
-            
-            # D. Pure Multiplier: "2 Twists per player"
-            per_player_each = re.search(r'(\d+)\s+Twists? (?:into each|per) player', text, re.IGNORECASE)
-            
-            # E. Simple Base: "8 Twists"
-            base_twist = re.search(r'(\d+)\s+Twists', text, re.IGNORECASE)
-            
-            # F. X + Players (Phrasing 2 - NEW): "Twists equal to 5 plus the number of players"
-            base_plus_players_match = re.search(r'Twists equal to (\d+) plus (?:the )?number of players', text, re.IGNORECASE)
-
-            # LOGIC CHAIN
-            if base_mod_match:
-                base = int(base_mod_match.group(1))
-                op = base_mod_match.group(2).lower()
-                mod = int(base_mod_match.group(3))
-                
-                if op == 'minus':
-                    self.scheme_mods['twists'] = base - (mod * self.player_count)
-                    self.scheme_mods['twist_note'] = f"({base} - {mod} per player)"
-                else:
-                    self.scheme_mods['twists'] = base + (mod * self.player_count)
-                    self.scheme_mods['twist_note'] = f"({base} + {mod} per player)"
-
-            elif players_plus_match:
-                add = int(players_plus_match.group(1))
-                self.scheme_mods['twists'] = self.player_count + add
-                self.scheme_mods['twist_note'] = f"({self.player_count} players + {add})"
-                
-            elif base_plus_players_match:  # <--- NEW LOGIC
-                base = int(base_plus_players_match.group(1))
-                self.scheme_mods['twists'] = base + self.player_count
-                self.scheme_mods['twist_note'] = f"({base} + {self.player_count} players)"
-                
-            elif mixed_match:
-                base = int(mixed_match.group(1))
-                per_player = int(mixed_match.group(2))
-                self.scheme_mods['twists'] = base + (per_player * self.player_count)
-                self.scheme_mods['twist_note'] = f"({base} + {per_player} per player)"
-                
-            elif per_player_each:
-                count = int(per_player_each.group(1))
-                self.scheme_mods['twists'] = count * self.player_count
-                self.scheme_mods['twist_note'] = f"({count} per player)"
-                
-            elif base_twist:
-                val = int(base_twist.group(1))
-                self.scheme_mods['twists'] = val
-                
-                # Check for separate sentence modifiers (rare fallback)
-                plus_match = re.search(r'plus (\d+)(?: twist| twists)? per player', text, re.IGNORECASE)
-                minus_match = re.search(r'minus (\d+)(?: twist| twists)? per player', text, re.IGNORECASE)
-                
-                if plus_match:
-                    add = int(plus_match.group(1))
-                    self.scheme_mods['twists'] += (add * self.player_count)
-                    self.scheme_mods['twist_note'] = f"({val} + {add} per player)"
-                elif "plus 1 per player" in text.lower():
-                     self.scheme_mods['twists'] += self.player_count
-                     self.scheme_mods['twist_note'] = f"({val} + 1 per player)"
-                     
-                if minus_match:
-                    sub = int(minus_match.group(1))
-                    self.scheme_mods['twists'] -= (sub * self.player_count)
-                    self.scheme_mods['twist_note'] = f"({val} - {sub} per player)"
-                elif "minus 1 twist per player" in text.lower():
-                     self.scheme_mods['twists'] -= self.player_count
-                     self.scheme_mods['twist_note'] = f"({val} - 1 per player)"
-
-        # --- 0. VERSUS TEAMS ---
-        versus_match = re.search(r'(\d+) Heroes of one Team and (\d+) Heroes of another', text, re.IGNORECASE)
-        if versus_match:
-            count_a = int(versus_match.group(1))
-            count_b = int(versus_match.group(2))
-            self.scheme_mods['hero_deck_count'] = count_a + count_b
-            self.scheme_mods['team_versus_counts'] = (count_a, count_b)
-
-        # --- 2. MASTER STRIKES ---
-        ms_match = re.search(r'(\d+)\s+Master Strikes', text, re.IGNORECASE)
-        if ms_match:
-            self.scheme_mods['master_strikes'] = int(ms_match.group(1))
-
-        # --- 3. BYSTANDERS (FIXED) ---
-        if re.search(r'no Bystanders', text, re.IGNORECASE):
-            self.scheme_mods['bystanders_override'] = 0
-        else:
-            # 1. Total Override ("8 total Bystanders")
-            total_bys = re.search(r'(\d+)\s+total\s+Bystanders', text, re.IGNORECASE)
-            if total_bys:
-                self.scheme_mods['bystanders_override'] = int(total_bys.group(1))
-            
-            # 2. Additive Logic (Sentence-by-sentence check)
-            # We split by sentences to ensure we catch conditions like "1-2 players: Add 3."
-            sentences = re.split(r'[.()\n]', text)
-            for s in sentences:
-                s = s.strip()
-                if not s: continue
-                
-                # Check if this sentence adds Bystanders
-                add_match = re.search(r'Add\s+(\d+)\s+(?:extra\s+)?Bystanders', s, re.IGNORECASE)
-                if add_match:
-                    val = int(add_match.group(1))
-                    
-                    # Check for Player Constraint at the start of the sentence
-                    # Matches: "1-2 Players:", "For 3 players:", "If 5 players"
-                    p_match = re.search(r'^(?:(?:For|If)\s+)?(?:only\s+)?([0-9\s\-or]+)\s+players?', s, re.IGNORECASE)
-                    
-                    if p_match:
-                        condition_str = p_match.group(1).strip()
-                        is_match = False
-                        
-                        # Range Check (e.g. "1-2")
-                        if '-' in condition_str:
-                            parts = condition_str.split('-')
-                            if len(parts) == 2 and parts[0].strip().isdigit() and parts[1].strip().isdigit():
-                                low, high = int(parts[0]), int(parts[1])
-                                if low <= self.player_count <= high: is_match = True
-                        # List Check (e.g. "2", "2 or 3")
-                        else:
-                            nums = [int(n) for n in re.findall(r'\d+', condition_str)]
-                            if self.player_count in nums: is_match = True
-                            
-                        # If constraint exists and is NOT met, skip this addition
-                        if not is_match:
-                            continue 
-                            
-                    # If no constraint found, OR constraint met, add the value
-                    self.scheme_mods['bystanders_add'] += val
+        """Applies the compiled Setup rules of a Scheme (see scheme_rules.py).
+
+        The per-player-count numbers come straight from the compiled record;
+        only the steps that depend on the loaded cards or on a random pick are
+        resolved here.
+        """
+        record = scheme_rules.get_scheme_record(scheme)
+        self.scheme_record = record
+
+        # Copy the lists so the shared record is never mutated
+        with self._span("parse: player counts"):
+            for key, val in record['players'][self.player_count].items():
+                self.scheme_mods[key] = list(val) if isinstance(val, list) else val
+
+        for step in record['steps']:
+            with self._span(f"parse: {step['op']}"):
+                self._apply_scheme_step(step)
+
+    def _apply_scheme_step(self, step):
+        op = step['op']
+
+        if op == 'add':
+            self.scheme_mods[step['field']].append(step['value'])
+
+        elif op == 'set':
+            self.scheme_mods[step['field']] = step['value']
+
+        # --- 7b. IMPLICIT INCLUSION (ROBUST V3) ---
+        # e.g. "Always include Party Thor Hero and Intergalactic Party Animals Villain Group."
+        elif op == 'include':
+            # Tries Henchmen, then Villains, then Heroes (see Catalog.resolve_include)
+            key, found = self.catalog.resolve_include(step['name'], self.set_mask)
+            if key == 'henchmen':
+                self.scheme_mods['required_henchmen'].append(found['name'])
+            elif key == 'villains':
+                self.scheme_mods['required_villains'].append(found['group_name'])
+            elif key == 'heroes':
+                self.scheme_mods['required_hero_deck_includes'].append({'name': found['hero'], 'count': 1})
+
+        # --- 8b. KEYWORD GROUP REQUIREMENTS ---
+        # e.g. "Include exactly one Villain Group with 'Rise of The Living Dead'"
+        elif op == 'keyword_villains':
+            keyword = step['keyword']
+            count = step['count']
+
+            # Groups with a card whose abilities have the keyword (see Catalog.abilities)
+            positions = self.catalog.abilities('villains').containing(keyword)
+            candidates = [group['group_name'] for group in self.catalog.select('villains', positions, self.set_mask)]
 
-        # --- 4. HERO DECK SIZE (FIXED v4) ---
-        # Split on '.', '(', ')', or newlines to separate rules so we process them individually
-        sentences = re.split(r'[.()\n]', text)
-        explicit_found = False
-        
-        for s in sentences:
-            s = s.strip()
-            if not s: continue
-
-            # 1. PLAYER CONSTRAINT CHECK
-            # If a sentence starts with "For X players" or "If X players", we verify the count.
-            # If the player count DOES NOT match, we SKIP this sentence entirely.
-            # This prevents "If 2 players: Use 4 Heroes" from triggering on 3 players.
-            p_match = re.search(r'^(?:For|If) (?:only )?([0-9\s\-or]+) players?', s, re.IGNORECASE)
-            if p_match:
-                condition_str = p_match.group(1)
-                is_match = False
-                # Parse Range (e.g. "2-3")
-                if '-' in condition_str:
-                    parts = condition_str.split('-')
-                    if len(parts) == 2 and parts[0].strip().isdigit() and parts[1].strip().isdigit():
-                        low, high = int(parts[0]), int(parts[1])
-                        if low <= self.player_count <= high: is_match = True
-                # Parse List (e.g. "2", "2 or 3")
-                else:
-                    nums = [int(n) for n in re.findall(r'\d+', condition_str)]
-                    if self.player_count in nums: is_match = True
-                
-                if not is_match:
-                    continue # Skip this sentence
-
-            # 2. CHECK FOR ADDITIVE RULES ("Add another Hero", "Add 1 extra Hero")
-            # We explicitly exclude "to/into the Villain Deck" to avoid "Add 8 random cards... to the Villain Deck"
-            add_match = re.search(r'Add\s+(?:an|another|(\d+)|(one|two|three))\s+(?:extra\s+)?Hero(?:es)?(?!\s+(?:to|into|in)\s+(?:the\s+)?Villain Deck)', s, re.IGNORECASE)
-            
-            # 3. CHECK FOR BASE COUNT RULES ("Use 5 Heroes", "6 Heroes", "Hero Deck is 4 Heroes")
-            # We look for "N Heroes" but use Lookbehind/Lookahead to ensure it's not a shuffle/move rule.
-            # (?<!Shuffle\s) -> Not preceded by "Shuffle "
-            # (?!\s+(?:from|to|into)) -> Not followed by " from", " to", " into"
-            # This correctly matches "6 Heroes" but ignores "Shuffle 12 Heroes from..."
-            base_match = re.search(r'(?<!Shuffle\s)(?<!Reveal\s)(?<!Look\s)(?<!Add\s)(?<!\d-)(?<!\d\s)(\d+)\s+Heroes(?!\s+(?:from|to|into))', s, re.IGNORECASE)
-            
-            if add_match:
-                to_add = 1
-                if add_match.group(1): # Digit (e.g. "2")
-                    to_add = int(add_match.group(1))
-                elif add_match.group(2): # Word (e.g. "two")
-                    word_map = {"one": 1, "two": 2, "three": 3}
-                    to_add = word_map.get(add_match.group(2).lower(), 1)
-                
-                # If we haven't found a base count yet, start at standard 5 before adding
-                if self.scheme_mods['hero_deck_count'] == 5 and not explicit_found:
-                     pass 
-                
-                self.scheme_mods['hero_deck_count'] += to_add
-
-            elif base_match:
-                val = int(base_match.group(1))
-                
-                # Safety: Ignore values >= 10 unless explicitly saying "Hero Deck" 
-                # (Prevents accidents with "Shuffle 14 cards")
-                is_explicit = "hero deck" in s.lower()
-                if val >= 10 and not is_explicit: 
-                    continue 
-
-                self.scheme_mods['hero_deck_count'] = val
-                explicit_found = True
-        # --- 5. VILLAIN DECK HEROES (FIXED v2) ---
-        # Pattern A: "includes 14 extra Jean Grey cards"
-        match_a = re.search(r'includes \d+ extra (.*?) cards', text, re.IGNORECASE)
-        
-        # Pattern B: "Add 14 Jean Grey Hero cards to the Villain Deck"
-        match_b = re.search(r'Add \d+ (.*?) Hero cards to the Villain Deck', text, re.IGNORECASE)
-
-        # Pattern C: "cards for any Blade Hero"
-        match_c = re.search(r'cards for (?:any|an) (.*?) Hero', text, re.IGNORECASE)
-
-        # Pattern E: "Add 8 random cards from an extra Hero" (NEW)
-        # Matches: "Add 8 random cards from an extra Hero to the Villain Deck"
-        match_e = re.search(r'Add (\d+) (?:random )?cards from an extra Hero', text, re.IGNORECASE)
-
-        if match_a:
-            self.scheme_mods['villain_deck_heroes'] += 1
-            name = match_a.group(1).strip()
-            if "extra" not in name.lower(): self.scheme_mods['required_villain_deck_heroes'].append(name)
-            
-        elif match_b:
-            self.scheme_mods['villain_deck_heroes'] += 1
-            self.scheme_mods['required_villain_deck_heroes'].append(match_b.group(1).strip())
-            
-        elif match_c:
-             self.scheme_mods['villain_deck_heroes'] += 1
-             name = match_c.group(1).strip()
-             if "extra" not in name.lower(): self.scheme_mods['required_villain_deck_heroes'].append(name)
-
-        elif match_e:
-             self.scheme_mods['villain_deck_heroes'] += 1
-             # Capture the specific quantity (e.g. 8)
-             self.scheme_mods['extra_hero_card_count'] = int(match_e.group(1))
-
-        # Pattern D: Generic Fallback (e.g. "Add an extra Hero to the Villain Deck")
-        # Updated to accept "to the Villain Deck" (not just "into")
-        elif re.search(r'(?:to|into|in) the Villain Deck.*?extra Hero', text, re.IGNORECASE) or \
-             re.search(r'Villain Deck includes.*?extra Hero', text, re.IGNORECASE):
-            self.scheme_mods['villain_deck_heroes'] += 1
-
-        # --- 6. EXTRA GROUPS (FIXED) ---
-        # 1. Check for "Solo" conditional first (Specific)
-        if re.search(r'If playing solo.*?add.*?Villain Group', text, re.IGNORECASE):
-            if self.player_count == 1:
-                self.scheme_mods['extra_villains'] += 1
-        
-        # 2. Check for standard unconditional addition (Generic)
-        # Matches: "Add an extra...", "Add 2 extra...", "Add two extra..."
-        elif re.search(r'Add (?:an|(\d+)|(one|two|three|four)) extra Villain Groups?', text, re.IGNORECASE):
-            m = re.search(r'Add (?:an|(\d+)|(one|two|three|four)) extra Villain Groups?', text, re.IGNORECASE)
-            count = 1
-            if m.group(1): # Digit found (e.g. "2")
-                count = int(m.group(1))
-            elif m.group(2): # Word found (e.g. "two")
-                word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
-                count = word_map.get(m.group(2).lower(), 1)
-            
-            self.scheme_mods['extra_villains'] += count
-            
-        # Henchmen Logic (Updated for quantities)
-        hench_match = re.search(r'Add (?:an|another|(\d+)|(one|two|three|four)) (?:extra )?Henchm[ae]n', text, re.IGNORECASE)
-        if hench_match:
-            count = 1
-            if hench_match.group(1): # Digit found
-                count = int(hench_match.group(1))
-            elif hench_match.group(2): # Number word found
-                word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
-                count = word_map.get(hench_match.group(2).lower(), 1)
-            # If "an" or "another" matched (and groups 1/2 are None), count defaults to 1
-            self.scheme_mods['extra_henchmen'] += count
-            
-        # --- 6b. HENCHMAN GROUP ALIAS (NEW) ---
-        # Matches: "Add an extra Henchman Group ... as 'Xerogen Experiments'"
-        # Note: The count (+1) is handled by the generic regex above. We just capture the name here.
-        alias_match = re.search(r'Add an extra Henchman Group.*?as [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
-        if alias_match:
-            self.scheme_mods['henchman_alias'] = alias_match.group(1).strip()
-
-        # --- 7. NAMED REQUIREMENTS (FIXED) ---
-        # Matches: "Include 10 Sentinels as extra Henchmen" OR "as one of the Backup Adversary groups"
-        # Updated Regex: Accepts "Backup Adversary" (and plural) as synonym for Henchmen
-        matches = re.findall(r'(Include|Add) (?:\d+ )?(.*?) as (?:an? )?(extra )?(?:one of the )?(Henchm[ae]n|Villain|Backup Adversar(?:y|ies))', text, re.IGNORECASE)
-        
-        for action, name, is_extra, gtype in matches:
-            clean_name = name.strip()
-            
-            # Decide if we need to add a slot
-            # We add a slot if it explicitly says "extra" OR "Add" (usually implies extra in this context)
-            should_add_slot = bool(is_extra) or action.lower() == "add"
-            
-            # Check for Henchmen OR Backup Adversaries
-            is_henchman = "hench" in gtype.lower() or "backup" in gtype.lower()
-            
-            if is_henchman:
-                self.scheme_mods['required_henchmen'].append(clean_name)
-                if should_add_slot:
-                    # Only increase if we haven't covered it with the generic counters
-                    if self.scheme_mods['extra_henchmen'] < len(self.scheme_mods['required_henchmen']):
-                         self.scheme_mods['extra_henchmen'] = len(self.scheme_mods['required_henchmen'])
-            else:
-                self.scheme_mods['required_villains'].append(clean_name)
-                if should_add_slot:
-                    if self.scheme_mods['extra_villains'] < len(self.scheme_mods['required_villains']):
-                        self.scheme_mods['extra_villains'] = len(self.scheme_mods['required_villains'])
-       # --- 7b. IMPLICIT INCLUSION (ROBUST V3) ---
-        # Matches: "Always include Party Thor Hero and Intergalactic Party Animals Villain Group."
-        implicit_match = re.search(r'Always include (?:the )?(.*?)(?:\.|$)', text, re.IGNORECASE)
-        if implicit_match:
-            content = implicit_match.group(1)
-            
-            # 1. Robust Split: Handles "," "and" ", and" with any spacing
-            parts = re.split(r',\s*and\s+|\s+and\s+|,\s*', content)
-            
-            for part in parts:
-                name_frag = part.strip()
-                if not name_frag: continue
-                
-                # 2. Clean up generic words with WORD BOUNDARIES (\b)
-                # Removes "Hero", "Villain Group" etc. but only as whole words
-                clean_frag = re.sub(r'\b(?:Villain Groups?|Henchm[ae]n Groups?|Villains?|Henchm[ae]n|Heroes?|Hero)\b', '', name_frag, flags=re.IGNORECASE).strip()
-                
-                # Remove leading "the" if it remains (e.g. "and the Skrulls")
-                clean_frag = re.sub(r'^the\s+', '', clean_frag, flags=re.IGNORECASE).strip()
-                
-                if not clean_frag: clean_frag = name_frag 
-                
-                # Helper: Word-based Fuzzy Match (Fixes "Part" vs "Party" typos)
-                def strict_or_word_match(target_name, search_query):
-                    if not target_name: return False
-                    t_lower = target_name.lower()
-                    q_lower = search_query.lower()
-                    # A. Substring Match (Standard)
-                    if q_lower in t_lower: return True
-                    # B. Word Subset Match (Typo Fallback)
-                    # Checks if all significant words in query exist in target (e.g. "Intergalactic" + "Part" in "Intergalactic Party")
-                    q_words = [w for w in re.findall(r'\w+', q_lower) if len(w) > 2]
-                    if not q_words: return False
-                    matches = 0
-                    for qw in q_words:
-                        if qw in t_lower: matches += 1
-                    # If 75% of query words are present, it's a match
-                    return matches >= len(q_words) * 0.75
-
-                # 3. Try Finding Group/Hero with Fallback Logic
-                
-                # A. Try Henchmen
-                found_h = None
-                for h in self.data['henchmen']:
-                     if strict_or_word_match(h.get('name') or h.get('group_name'), clean_frag):
-                         found_h = h; break
-                if found_h:
-                    self.scheme_mods['required_henchmen'].append(found_h['name'])
-                    continue 
-
-                # B. Try Villains
-                found_v = None
-                for v in self.data['villains']:
-                     if strict_or_word_match(v.get('group_name') or v.get('name'), clean_frag):
-                         found_v = v; break
-                if found_v:
-                    self.scheme_mods['required_villains'].append(found_v['group_name'])
-                    continue
-
-                # C. Try Heroes
-                # Use standard fuzzy first, then custom word match
-                found_hero = self._find_hero_by_name(clean_frag)
-                if not found_hero:
-                    for h in self.data['heroes']:
-                        if strict_or_word_match(h['hero'], clean_frag):
-                            found_hero = h; break
-                
-                if found_hero:
-                    self.scheme_mods['required_hero_deck_includes'].append({'name': found_hero['hero'], 'count': 1})
-        # --- 8. EXPLICIT GROUP REQUIREMENTS (NEW) ---
-        # Matches: "Skrull Villain Group required"
-        req_group = re.search(r'([a-zA-Z\s]+) Villain Group required', text, re.IGNORECASE)
-        if req_group:
-            self.scheme_mods['required_villains'].append(req_group.group(1).strip())
-            
-        # --- 8b. KEYWORD GROUP REQUIREMENTS (FIXED CLEANUP) ---
-        # Matches: "Include exactly one Villain Group with 'Rise of The Living Dead'"
-        # Updated Regex: Handles extra spaces and punctuation inside the quotes
-        keyword_req_match = re.search(r'Include exactly (one|two|three|\d+) Villain Groups? with [\"“\']\s*(.*?)\s*[\"“\”\']', text, re.IGNORECASE)
-        if keyword_req_match:
-            count_str = keyword_req_match.group(1).lower()
-            
-            # AGGRESSIVE CLEANUP: 
-            # 1. Capture raw string (e.g. " Rise of The Living Dead .")
-            # 2. Remove periods completely
-            # 3. Strip whitespace from both ends
-            raw_keyword = keyword_req_match.group(2)
-            keyword = raw_keyword.replace('.', '').strip()
-            
-            # Parse quantity
-            word_map = {"one": 1, "two": 2, "three": 3}
-            count = int(count_str) if count_str.isdigit() else word_map.get(count_str, 1)
-            
-            # Search for candidate groups
-            candidates = []
-            for group in self.data['villains']:
-                has_keyword = False
-                for card in group.get('cards', []):
-                    # Check text inside abilities
-                    for ability in card.get('abilities', []):
-                        if keyword.lower() in ability.lower():
-                            has_keyword = True
-                            break
-                    if has_keyword: break
-                
-                if has_keyword:
-                    candidates.append(group['group_name'])
-            
             # Select and apply
             if candidates:
                 # Filter out ones already required to avoid duplicates
                 available = [c for c in candidates if c not in self.scheme_mods['required_villains']]
-                if not available: available = candidates 
-                
+                if not available: available = candidates
+
                 if len(available) >= count:
-                    chosen = random.sample(available, count)
+                    chosen = self.rng.sample(available, count)
                     self.scheme_mods['required_villains'].extend(chosen)
                 else:
-                    print(f"   [!] Warning: Not enough groups with '{keyword}'. Found: {available}")
+                    self._warn("keyword_villains_short", "Not enough groups with '%(keyword)s'. Found: %(found)s",
+                               keyword=keyword, found=available)
                     self.scheme_mods['required_villains'].extend(available)
             else:
-                print(f"   [!] Warning: No Villain Group found with keyword '{keyword}'.")
+                self._warn("keyword_villains_missing", "No Villain Group found with keyword '%(keyword)s'.", keyword=keyword)
 
-        # --- 9. HEROES MOVED FROM HERO DECK (NEW) ---
-        # Matches: "Shuffle 12 random Heroes from the Hero Deck into the Villain Deck"
-        moved_heroes = re.search(r'Shuffle (\d+) random Heroes from the Hero Deck into the Villain Deck', text, re.IGNORECASE)
-        if moved_heroes:
-            self.scheme_mods['heroes_from_hero_deck'] = int(moved_heroes.group(1))
-            
-        # --- 10. EITHER/OR SELECTION (FIXED) ---
-        # Updated to handle weird quoting (e.g. using open quotes as closing quotes)
-        either_match = re.search(r'Include either (?:the )?[\"“\'](.+?)[\"“\”\'] or [\"“\'](.+?)[\"“\”\'] Villain Group', text, re.IGNORECASE)
-        if either_match:
-            choice = random.choice([either_match.group(1), either_match.group(2)])
+        # --- 10. EITHER/OR SELECTION ---
+        elif op == 'either_villain':
+            choice = self.rng.choice(step['choices'])
             self.scheme_mods['required_villains'].append(choice.strip())
-            
-        # --- 11. CUSTOM DECKS (FIXED) ---
-        # Updated regex to handle "weird" quotes (using open quotes as closers)
-        
-        # A. Infected Deck
-        infected_match = re.search(r'Shuffle together (\d+) Bystanders and (\d+) (.*?) Henchmen as an [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
-        if infected_match:
-            bys_count = infected_match.group(1)
-            hench_count = infected_match.group(2)
-            hench_name_frag = infected_match.group(3).strip()
-            deck_title = infected_match.group(4).strip().rstrip('.') # Strip trailing period if captured
-            
-            hench_obj = self._find_group_by_name(hench_name_frag, 'henchmen')
+
+        # --- 11A. INFECTED DECK ---
+        elif op == 'infected_deck':
+            hench_obj = self._find_group_by_name(step['henchmen'], 'henchmen')
             if hench_obj:
                 full_hench_name = f"{hench_obj['name']} ({hench_obj['set']})"
-                self.scheme_mods['required_henchmen'].append("RESERVED_FOR_CUSTOM") 
+                self.scheme_mods['required_henchmen'].append("RESERVED_FOR_CUSTOM")
             else:
-                full_hench_name = f"{hench_name_frag} (Unknown)"
+                full_hench_name = f"{step['henchmen']} (Unknown)"
 
             self.scheme_mods['custom_deck'] = {
-                "name": deck_title,
-                "lines": [f"{bys_count} Bystanders", f"{hench_count} {full_hench_name}"]
+                "name": step['title'],
+                "lines": [f"{step['bystanders']} Bystanders", f"{step['henchmen_count']} {full_hench_name}"]
             }
 
-        # B. Hulk Deck / Mutation Pile
-        # Regex broadened to handle "Shuffle them into" AND "Put them in a face-up..."
-        hulk_deck_match = re.search(r'Hero with [\"“\'](.*?)[\"“\”\'] in its Hero Name.*?(?:Shuffle|Put) them (?:into|in) (?:a )?(?:face-up )?[\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
-        if hulk_deck_match:
-            keyword = hulk_deck_match.group(1)
-            deck_title = hulk_deck_match.group(2).strip().rstrip('.')
-            
+        # --- 11B. HULK DECK / MUTATION PILE ---
+        elif op == 'named_hero_deck':
+            keyword = step['keyword']
+
             # Find a hero matching the keyword
-            candidates = [h for h in self.data['heroes'] if keyword.lower() in h['hero'].lower()]
+            candidates = self.catalog.select('heroes', self.catalog.names['heroes'].containing(keyword), self.set_mask)
             if candidates:
-                chosen = random.choice(candidates)
+                chosen = self.rng.choice(candidates)
                 self.scheme_mods['banned_heroes'].append(chosen['hero'])
-                
+
                 self.scheme_mods['custom_deck'] = {
-                    "name": deck_title,
+                    "name": step['title'],
                     "lines": [f"14 cards of {chosen['hero']} ({chosen['set']})"]
                 }
-         # C. Dark Loyalty / Standard Additional Hero Deck (NEW)
-        # Matches: "Randomly pick 5 cards... from an additional Hero... form a “Dark Loyalty“ deck"
-        loyalty_match = re.search(r'Randomly pick (\d+) cards.*?from an additional Hero.*?form a [\"“\'](.*?)[\"“\”\'] deck', text, re.IGNORECASE)
-        if loyalty_match:
-            count = int(loyalty_match.group(1))
-            deck_title = loyalty_match.group(2).strip()
-            
+
+        # --- 11C. DARK LOYALTY / ADDITIONAL HERO DECK ---
+        elif op == 'loyalty_deck':
             # Pick a random additional hero
             candidates = [h for h in self.data['heroes'] if h['hero'] not in self.scheme_mods['banned_heroes']]
             if candidates:
-                chosen = random.choice(candidates)
+                chosen = self.rng.choice(candidates)
                 self.scheme_mods['banned_heroes'].append(chosen['hero'])
-                
-                # Check if there is a cost restriction in the text to include in the note
-                note = ""
-                if "cost 5 or less" in text.lower():
-                    note = " (cost 5 or less)"
-                
+
                 self.scheme_mods['custom_deck'] = {
-                    "name": deck_title,
-                    "lines": [f"{count} cards{note} of {chosen['hero']} ({chosen['set']})"]
+                    "name": step['title'],
+                    "lines": [f"{step['count']} cards{step['note']} of {chosen['hero']} ({chosen['set']})"]
                 }
-        # --- D. SHRINK TECH (NEW) ---
-        # Matches: "Set aside all 14 cards of a random extra Hero that has any Size-Changing cards as “Shrink Tech.“"
-        shrink_match = re.search(r'Set aside all 14 cards of a random extra Hero that has any Size-Changing cards as [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
-        if shrink_match:
-            deck_title = shrink_match.group(1).strip().rstrip('.')
-            
-            # Filter for Heroes with "Size-Changing" in their abilities
-            candidates = []
-            for h in self.data['heroes']:
-                if h['hero'] in self.scheme_mods['banned_heroes']: continue
-                
-                has_mechanism = False
-                for card in h.get('cards', []):
-                    # Check text inside abilities
-                    for ability in card.get('abilities', []):
-                        if "Size-Changing" in ability:
-                            has_mechanism = True
-                            break
-                    if has_mechanism: break
-                
-                if has_mechanism: candidates.append(h)
-            
+
+        # --- 11D. SHRINK TECH ---
+        elif op == 'shrink_tech':
+            # Heroes with "Size-Changing" in their abilities (see Catalog.abilities)
+            positions = self.catalog.abilities('heroes').containing("Size-Changing")
+            candidates = [h for h in self.catalog.select('heroes', positions, self.set_mask)
+                          if h['hero'] not in self.scheme_mods['banned_heroes']]
+
             if candidates:
-                chosen = random.choice(candidates)
+                chosen = self.rng.choice(candidates)
                 self.scheme_mods['banned_heroes'].append(chosen['hero'])
                 self.scheme_mods['custom_deck'] = {
-                    "name": deck_title,
+                    "name": step['title'],
                     "lines": [f"14 cards of {chosen['hero']} ({chosen['set']})"]
                 }
             else:
-                print("   [!] Warning: No Heroes with 'Size-Changing' abilities found for Shrink Tech.")
-                
-        # --- E WEDDING HEROES (NEW) ---
-        # Matches: "Set aside two extra Heroes to get married"
-        if re.search(r'Set aside (?:two|2) extra Heroes to get married', text, re.IGNORECASE):
+                self._warn("shrink_tech_no_heroes", "No Heroes with 'Size-Changing' abilities found for Shrink Tech.")
+
+        # --- 11E. WEDDING HEROES ---
+        elif op == 'wedding':
             # Pick 2 random heroes not already banned
             candidates = [h for h in self.data['heroes'] if h['hero'] not in self.scheme_mods['banned_heroes']]
-            
+
             if len(candidates) >= 2:
-                wed_heroes = random.sample(candidates, 2)
+                wed_heroes = self.rng.sample(candidates, 2)
                 self.scheme_mods['wedding_heroes'] = wed_heroes
-                
+
                 # Ban them so they don't appear in the main Hero Deck
                 for h in wed_heroes:
                     self.scheme_mods['banned_heroes'].append(h['hero'])
             else:
-                print("   [!] Warning: Not enough heroes available for Wedding setup.")
-                
-        # --- F. PAST HERO DECK (FIXED) ---
-        # Matches: "plus 4 other Heroes to make a ”Past Hero Deck”"
-        # Regex updated to accept ” as an opening quote
-        past_deck_match = re.search(r'plus (\d+) other Heroes to make a\s*[\"“\”\'](.*?)[\"“\”\']', text, re.IGNORECASE)
-        if past_deck_match:
-            count = int(past_deck_match.group(1))
-            deck_name = past_deck_match.group(2).strip().rstrip('.') # Strip trailing period if inside quotes
-            
+                self._warn("wedding_heroes_short", "Not enough heroes available for Wedding setup.")
+
+        # --- 11F. PAST HERO DECK ---
+        elif op == 'past_deck':
+            count = step['count']
+            deck_name = step['title']
+
             # Pick random heroes not already banned
             candidates = [h for h in self.data['heroes'] if h['hero'] not in self.scheme_mods['banned_heroes']]
-            
+
             if len(candidates) >= count:
-                chosen = random.sample(candidates, count)
-                
+                chosen = self.rng.sample(candidates, count)
+
                 # Ban them so they don't appear in the main Hero Deck
                 for h in chosen:
                     self.scheme_mods['banned_heroes'].append(h['hero'])
-                
+
                 # Register as a Custom Deck for display
                 self.scheme_mods['custom_deck'] = {
                     "name": deck_name,
                     "lines": [f"{h['hero']} ({h['set']})" for h in chosen]
                 }
             else:
-                print(f"   [!] Warning: Not enough heroes available for {deck_name}.")
-                
-        # --- G MONSTER PIT / CUSTOM VILLAIN DECK (NEW) ---
-        # Matches: "Shuffle 8 Monsters Unleashed Villains into a face-down 'Monster Pit' deck."
-        monster_pit_match = re.search(r'Shuffle (\d+) (.*?) Villains into a .*?[\"“\'](.*?)[\"“\”\'] deck', text, re.IGNORECASE)
-        if monster_pit_match:
-            count = int(monster_pit_match.group(1))
-            v_group_name = monster_pit_match.group(2).strip()
-            deck_name = monster_pit_match.group(3).strip()
-            
+                self._warn("named_deck_heroes_short", "Not enough heroes available for %(deck)s.", deck=deck_name)
+
+        # --- 11G. MONSTER PIT / CUSTOM VILLAIN DECK ---
+        elif op == 'monster_pit':
+            v_group_name = step['group']
+            deck_name = step['title']
+
             # Find the villain group
             v_obj = self._find_group_by_name(v_group_name, 'villains')
-            
+
             if v_obj:
                 # Ban it from normal selection
-                self.scheme_mods['banned_villains'].append(v_obj.get('group_name') or v_obj.get('name'))
-                
+                self.scheme_mods['banned_villains'].append(self.catalog.model(v_obj).name)
+
                 # Create Custom Deck entry
                 self.scheme_mods['custom_deck'] = {
                     "name": deck_name,
-                    "lines": [f"{count} cards from {v_obj.get('group_name') or v_obj.get('name')} ({v_obj['set']})"]
+                    "lines": [f"{step['count']} cards from {self.catalog.model(v_obj).name} ({v_obj['set']})"]
                 }
             else:
-                print(f"   [!] Warning: Could not find Villain Group '{v_group_name}' for {deck_name}.")
-                
-        # --- H. ORDERED HERO STACK (NEW) ---
-        # Matches: "Put 14 Adam Warlock Hero cards in a face up stack"
-        ordered_stack_match = re.search(r'Put (\d+) (.*?) Hero cards in a face up stack', text, re.IGNORECASE)
-        if ordered_stack_match:
-            count = int(ordered_stack_match.group(1))
-            hero_name = ordered_stack_match.group(2).strip()
-            
-            # 1. Ban this hero from the main Hero Deck so they don't appear twice
-            self.scheme_mods['banned_heroes'].append(hero_name)
-            
-            # 2. Add to Custom Deck display (appears under Scheme description)
-            self.scheme_mods['custom_deck'] = {
-                "name": f"{hero_name} Stack",
-                "lines": [f"{count} cards of {hero_name} (Ordered by cost)"]
-            }
-        
-        # --- 12. HERO DECK NAME REQUIREMENTS (FIXED) ---
-        # Pattern A: Quotes (e.g. "Use exactly two Heroes with 'Hulk' in their Hero Names")
-        hero_inc_match = re.search(r'Use exactly (\w+) Heroes with [\"“\'](.*?)[\"“\”\'] in their Hero Names', text, re.IGNORECASE)
-        
-        # Pattern B: Explicit Single (e.g. "Exactly one Hero must be a Nova Hero")
-        # Captures the name (e.g. "Nova") before the word "Hero"
-        single_req_match = re.search(r'Exactly one Hero must be a (.*?) Hero(?:[\.\n]|$)', text, re.IGNORECASE)
-        use_as_match = re.search(r'Use (.*?) as one of the Heroes', text, re.IGNORECASE)
-        
-        # Pattern D: Comedic/Informal (e.g. "Use the best Hero in the game: Deadpool!")
-        comedic_match = re.search(r'Use the best Hero.*?: (.*?)(?:!|\.|$)', text, re.IGNORECASE)
-        
-        # Pattern E: "Include exactly X Hero(es) with Y in name" (NEW)
-        # Matches: "Include exactly 1 Hero with Wolverine or Logan in its name"
-        # Captures: Count (Group 1), Name(s) (Group 2)
-        include_exact_match = re.search(r'(?:Include|Use) exactly (\d+) Hero(?:es)? with (.*?) in (?:its|their) (?:Hero )?Name', text, re.IGNORECASE)
-
-        if hero_inc_match:
-            word_map = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
-            count_str = hero_inc_match.group(1).lower()
-            count = word_map.get(count_str, 0)
-            if count == 0 and count_str.isdigit(): count = int(count_str)
-            name_req = hero_inc_match.group(2)
-            if count > 0: self.scheme_mods['required_hero_deck_includes'].append({'name': name_req, 'count': count})
-            
-        elif single_req_match:
-            name_req = single_req_match.group(1).strip()
-            # "Exactly one" implies count is 1
-            self.scheme_mods['required_hero_deck_includes'].append({'name': name_req, 'count': 1})
-        elif use_as_match:
-             name_req = use_as_match.group(1).strip()
-             self.scheme_mods['required_hero_deck_includes'].append({'name': name_req, 'count': 1})
-        elif comedic_match:
-             name_req = comedic_match.group(1).strip()
-             self.scheme_mods['required_hero_deck_includes'].append({'name': name_req, 'count': 1})
-        elif include_exact_match:
-             self.scheme_mods['required_hero_deck_includes'].append({
-                 'name': include_exact_match.group(2).strip(), 
-                 'count': int(include_exact_match.group(1))
-             })
-             
-        
-                
-        # --- 13. BYSTANDERS IN HERO DECK (NEW) ---
-        # 1. Default Rule: "24 Bystanders in the Hero Deck"
-        def_bys = re.search(r'(\d+)\s+Bystanders in the Hero Deck', text, re.IGNORECASE)
-        if def_bys:
-            self.scheme_mods['bystanders_in_hero_deck'] = int(def_bys.group(1))
-            
-        # 2. Specific Override: "(1 player: 12 Bystanders...)"
-        spec_bys = re.search(r'\((\d+)\s+player:\s+(\d+)\s+Bystanders', text, re.IGNORECASE)
-        if spec_bys:
-            req_players = int(spec_bys.group(1))
-            req_count = int(spec_bys.group(2))
-            if self.player_count == req_players:
-                self.scheme_mods['bystanders_in_hero_deck'] = req_count
-        
-        # --- 14. SIDEKICKS IN VILLAIN DECK (NEW) ---
-        # Matches: "Add 10 Sidekicks to the Villain Deck"
-        sidekick_match = re.search(r'Add (\d+) Sidekicks to the Villain Deck', text, re.IGNORECASE)
-        if sidekick_match:
-            self.scheme_mods['sidekicks_in_villain_deck'] = int(sidekick_match.group(1))
-            
-        # --- 15. AMBITION CARDS (NEW) ---
-        # Matches: "Add 10 random Ambition cards to the Villain Deck"
-        ambition_match = re.search(r'Add (\d+) (?:random )?Ambition cards', text, re.IGNORECASE)
-        if ambition_match:
-            self.scheme_mods['ambitions_in_villain_deck'] = int(ambition_match.group(1))
-            
-        # --- 16. OFFICERS IN VILLAIN DECK (NEW) ---
-        # Matches: "Add 12 S.H.I.E.L.D. Officers to the Villain Deck"
-        # We escape the dots in S.H.I.E.L.D. or just look for "Officers" to be safe
-        officer_match = re.search(r'Add (\d+) S\.H\.I\.E\.L\.D\. Officers to the Villain Deck', text, re.IGNORECASE)
-        if officer_match:
-            self.scheme_mods['officers_in_villain_deck'] = int(officer_match.group(1))
-            
-        # --- 17. PLAYER PICKED HEROES (NEW) ---
-        # Matches: "Each player chooses a Hero to be part of the Hero Deck"
-        if re.search(r'Each player chooses a Hero to be part of the Hero Deck', text, re.IGNORECASE):
-            self.scheme_mods['player_picked_heroes'] = self.player_count
-            
-        # --- 18. HERO TEAM REQUIREMENTS (FIXED) ---
-        # Pattern A: "Use at least 1 [spider-friends] Hero"
-        team_req_match = re.search(r'Use at least (\d+) \[?([a-zA-Z0-9\-\s]+)\]? Hero', text, re.IGNORECASE)
-        
-        # Pattern B: "...including at least one [guardians-of-the-galaxy] Hero" (NEW)
-        include_team_match = re.search(r'including at least (one|\d+) \[?([a-zA-Z0-9\-\s]+)\]? Hero', text, re.IGNORECASE)
+                self._warn("villain_group_missing", "Could not find Villain Group '%(group)s' for %(deck)s.",
+                           group=v_group_name, deck=deck_name)
+
+        # --- 23. STACKED HENCHMEN ---
+        # Verify it's a Henchman group before banning (the text also stacks e.g. Twists)
+        elif op == 'stack_henchmen':
+            if self._find_group_by_name(step['name'], 'henchmen'):
+                self.scheme_mods['banned_henchmen'].append(step['name'])
 
-        if team_req_match:
-            count = int(team_req_match.group(1))
-            team_name = team_req_match.group(2).strip().lower()
-            self.scheme_mods['required_teams'].append({'team': team_name, 'count': count})
-            
-        elif include_team_match:
-            count_str = include_team_match.group(1).lower()
-            count = 1 if count_str == 'one' else int(count_str)
-            team_name = include_team_match.group(2).strip().lower()
-            self.scheme_mods['required_teams'].append({'team': team_name, 'count': count})
-        # --- 18b. SPECIFIC TEAM COMPOSITION (House of M style) (FIXED) ---
-        # Matches: "Hero Deck is 4 [x-men] Heroes and 2 non- [x-men] Heroes"
-        split_team_match = re.search(r'Hero Deck is (\d+) \[?([a-zA-Z0-9\-\s]+)\]? Heroes and (\d+)', text, re.IGNORECASE)
-        if split_team_match:
-            count_team = int(split_team_match.group(1))
-            team_name = split_team_match.group(2).strip().lower()
-            count_other = int(split_team_match.group(3))
-            
-            # 1. Update Total Hero Deck Count
-            self.scheme_mods['hero_deck_count'] = count_team + count_other
-            
-            # 2. Add Team Requirement (Forces the 4 X-Men)
-            self.scheme_mods['required_teams'].append({'team': team_name, 'count': count_team})
-            
-            # 3. Ban this team from the remaining slots (Ensures the other 2 are NON-X-Men)
-            self.scheme_mods['banned_teams_from_open_selection'].append(team_name)
-            
-        # --- 19. HENCHMEN IN HERO DECK (NEW) ---
-        # Matches: "Add 6 extra Henchmen from a single Henchman Group to the Hero Deck"
-        hench_hero_match = re.search(r'Add (\d+) (?:extra )?Henchmen.*?to the Hero Deck', text, re.IGNORECASE)
-        if hench_hero_match:
-            self.scheme_mods['henchmen_in_hero_deck_count'] = int(hench_hero_match.group(1))
-        
-        # --- 20. SET ASIDE VILLAIN GROUPS (NEW) ---
-        # Matches: "Set aside the 'Quantum Realm' Villain Group"
-        set_aside_match = re.search(r'Set aside (?:the )?[\"“\'](.+?)[\"“\”\'] Villain Group', text, re.IGNORECASE)
-        if set_aside_match:
-            self.scheme_mods['banned_villains'].append(set_aside_match.group(1).strip())
-        
-        # --- 21. TACTICS IN VILLAIN DECK (NEW) ---
-        # Matches: "Shuffle the Mastermind Tactics into the Villain Deck"
-        if re.search(r'Shuffle (?:the )?Mastermind Tactics into the Villain Deck', text, re.IGNORECASE):
-            self.scheme_mods['tactics_in_villain_deck'] = 4
-        # --- 22. QUANTUM AMBUSH SCHEME (NEW) ---
-        # Matches: "Shuffle its Ambush Scheme into the Villain Deck"
-        if re.search(r'Shuffle its Ambush Scheme into the Villain Deck', text, re.IGNORECASE):
-            self.scheme_mods['quantum_ambush_scheme'] = True
-            
-        # --- 23. STACKED HENCHMEN (NEW) ---
-        # Matches: "Stack 2 Cops per player"
-        # We check if the captured name is actually a Henchman group to avoid banning non-card items (like "Twists").
-        stack_match = re.search(r'Stack \d+ (.*?) per player', text, re.IGNORECASE)
-        if stack_match:
-            name = stack_match.group(1).strip()
-            # Verify it's a Henchman group before banning
-            if self._find_group_by_name(name, 'henchmen'):
-                self.scheme_mods['banned_henchmen'].append(name)
-        
-        # --- 24. DRAINED MASTERMIND (NEW) ---
-        # Matches: "Set aside a second 'Drained' Mastermind"
-        if re.search(r'Set aside a second [\"“\']Drained[\"“\”\'] Mastermind', text, re.IGNORECASE):
-            self.scheme_mods['drained_mastermind_required'] = True
-            
-            # The rule usually says "Add its 'Always Leads' Villains as an extra Villain Group"
-            # We must manually increment the count because the generic parser might miss this specific phrasing
-            if re.search(r'Add its [\"“\']Always Leads[\"“\”\'] Villains as an extra Villain Group', text, re.IGNORECASE):
-                self.scheme_mods['extra_villains'] += 1
-        # --- 25. DOUBLE GROUPS / HALF CARDS (NEW) ---
-        # Matches: "Use double the normal number of Villain and Henchman Groups"
-        if re.search(r'Use double the normal number of Villain and Henchman Groups', text, re.IGNORECASE):
-            self.scheme_mods['double_group_count'] = True
-            self.scheme_mods['half_deck_mechanic'] = True
-            
     def _find_by_ui_name(self, ui_name, item_list, type_key='hero'):
         """Resolves a UI selection string (Name or Name (Set)) to a data object."""
+        key = {'hero': 'heroes', 'villain': 'villains', 'henchman': 'henchmen',
+               'mastermind': 'masterminds', 'scheme': 'schemes'}[type_key]
+        index = self.catalog.names[key]
+        items = self.catalog.data[key]
+
         # Check for Set suffix: "Name (Set)"
         match = re.match(r"(.*?) \((.*?)\)$", ui_name)
         if match:
             target_name = match.group(1)
             target_set = match.group(2)
-            for item in item_list:
-                # Get item name based on type
-                if type_key == 'hero': i_name = item['hero']
-                elif type_key == 'villain': i_name = item.get('group_name') or item.get('name')
-                else: i_name = item.get('name')
-                
-                if i_name == target_name and item.get('set') == target_set:
-                    return item
+            candidates = [
+                items[pos] for pos in index.equal(target_name)
+                if index.raw[pos] == target_name and items[pos].get('set') == target_set
+            ]
         else:
             # Fallback to exact name match (for unique names)
-            for item in item_list:
-                if type_key == 'hero': i_name = item['hero']
-                elif type_key == 'villain': i_name = item.get('group_name') or item.get('name')
-                else: i_name = item.get('name')
-                
-                if i_name == ui_name:
-                    return item
+            candidates = [items[pos] for pos in index.equal(ui_name) if index.raw[pos] == ui_name]
+
+        # Index order matches item_list order, so the first hit still wins.
+        # Membership by identity: the catalog hands out the same dicts, and
+        # comparing them with == would walk all their cards.
+        if not candidates: return None
+        listed = {id(item) for item in item_list}
+        for item in candidates:
+            if id(item) in listed:
+                return item
         return None
 
     def pick_scheme(self):
@@ -1034,12 +411,12 @@ class LegendaryRandomizer:
         if forced_name and forced_name != "Random":
             # Use helper
             scheme = self._find_by_ui_name(forced_name, self.data['schemes'], 'scheme')
-            if not scheme: scheme = random.choice(self.data['schemes'])
+            if not scheme: scheme = self.rng.choice(self.data['schemes'])
         else:
-            scheme = random.choice(self.data['schemes'])
+            scheme = self.rng.choice(self.data['schemes'])
             
         self.setup['scheme'] = scheme
-        self.synergy_tags.extend(self._get_tags(scheme))
+        self.synergy_mask |= self.catalog.model(scheme).tag_mask
         self.setup['special_rules'] = scheme.get('description', [])
         self.parse_scheme_rules(scheme)
 
@@ -1055,38 +432,31 @@ class LegendaryRandomizer:
              mm = self._find_by_ui_name(forced_name, self.data['masterminds'], 'mastermind')
         
         if not mm:
-            mm = random.choice(self.data['masterminds'])
+            mm = self.rng.choice(self.data['masterminds'])
             
         self.setup['mastermind'] = mm
-        self.synergy_tags.extend(self._get_tags(mm))
+        self.synergy_mask |= self.catalog.model(mm).tag_mask
         
         # Initialize empty list for safety
         self.setup['lurking_masterminds'] = []
         
         # 2. Check for "Lurking" Masterminds
-        scheme_text = " ".join(self.setup.get('special_rules', []))
-        lurking_match = re.search(r'Put (\w+) additional Masterminds', scheme_text, re.IGNORECASE)
-        
-        if lurking_match:
-            word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
-            count_str = lurking_match.group(1).lower()
-            count = word_map.get(count_str, 0)
-            if count == 0 and count_str.isdigit(): count = int(count_str)
-                
-            if count > 0:
-                available_mms = [m for m in self.data['masterminds'] if m['name'] != mm['name']]
-                if len(available_mms) < count:
-                    lurking = available_mms
-                else:
-                    lurking = random.sample(available_mms, count)
-                
-                # Store the objects, don't modify the name string here
-                self.setup['lurking_masterminds'] = lurking
+        mm_rules = self.scheme_record['masterminds']
+        count = mm_rules['lurking']
+            
+        if count > 0:
+            available_mms = [m for m in self.data['masterminds'] if m['name'] != mm['name']]
+            if len(available_mms) < count:
+                lurking = available_mms
+            else:
+                lurking = self.rng.sample(available_mms, count)
+            
+            # Store the objects, don't modify the name string here
+            self.setup['lurking_masterminds'] = lurking
         # --- 3. TYRANT MASTERMINDS (NEW) ---
         # Matches: "Choose 3 other Masterminds"
-        tyrant_match = re.search(r'Choose (\d+) other Masterminds', scheme_text, re.IGNORECASE)
-        if tyrant_match:
-            count = int(tyrant_match.group(1))
+        if mm_rules['tyrants']:
+            count = mm_rules['tyrants']
             self.scheme_mods['tyrant_masterminds_count'] = count
             
             # Exclude Main Mastermind
@@ -1099,10 +469,10 @@ class LegendaryRandomizer:
             available = [m for m in self.data['masterminds'] if m['name'] not in used_names]
             
             if len(available) >= count:
-                self.setup['tyrant_masterminds'] = random.sample(available, count)
+                self.setup['tyrant_masterminds'] = self.rng.sample(available, count)
             else:
                 self.setup['tyrant_masterminds'] = available
-                print(f"   [!] Warning: Not enough Masterminds left for Tyrants (Needed {count}).")  
+                self._warn("tyrants_short", "Not enough Masterminds left for Tyrants (Needed %(needed)d).", needed=count)
 
         # --- 4. DRAINED MASTERMIND (NEW) ---
         if self.scheme_mods.get('drained_mastermind_required'):
@@ -1115,7 +485,7 @@ class LegendaryRandomizer:
             available = [m for m in self.data['masterminds'] if m['name'] not in used_names]
             
             if available:
-                drained = random.choice(available)
+                drained = self.rng.choice(available)
                 self.setup['drained_mastermind'] = drained
                 
                 # Handle "Always Leads" Requirement
@@ -1131,7 +501,7 @@ class LegendaryRandomizer:
                         if h_obj:
                             self.scheme_mods['required_henchmen'].append(h_obj['name'])
             else:
-                 print("   [!] Warning: No Masterminds left for Drained Mastermind.")
+                 self._warn("drained_mastermind_missing", "No Masterminds left for Drained Mastermind.")
         
     def pick_villains_and_henchmen(self):
         base = SETUP_RULES.get(self.player_count, SETUP_RULES[2])
@@ -1174,7 +544,7 @@ class LegendaryRandomizer:
                     v_obj = self._find_group_by_name(always_leads, 'villains')
                     if v_obj and v_obj not in selected_villains:
                          # NEW: Check if this group is banned (e.g. set aside for a Custom Deck like Monster Pit)
-                         is_banned = any(b.lower() in (v_obj.get('group_name') or v_obj.get('name') or '').lower() for b in self.scheme_mods['banned_villains'])
+                         is_banned = any(b.lower() in self.catalog.model(v_obj).key_name for b in self.scheme_mods['banned_villains'])
                          
                          if not is_banned:
                              selected_villains.append(v_obj)
@@ -1190,7 +560,7 @@ class LegendaryRandomizer:
             if len(selected_villains) < total_villains_needed:
                 found = self._find_by_ui_name(pick_name, self.data['villains'], 'villain')
                 if found and found not in selected_villains:
-                    is_banned = any(b.lower() in (found.get('group_name') or '').lower() for b in self.scheme_mods['banned_villains'])
+                    is_banned = any(b.lower() in self.catalog.model(found).key_name for b in self.scheme_mods['banned_villains'])
                     if not is_banned:
                         selected_villains.append(found)
 
@@ -1199,18 +569,19 @@ class LegendaryRandomizer:
         remaining = target_count - len(selected_villains)
         
         if remaining > 0:
+            banned = [b.lower() for b in self.scheme_mods['banned_villains']]
             available = [
                 v for v in self.data['villains'] 
                 if v not in selected_villains
-                and not any(b.lower() in (v.get('group_name') or v.get('name') or '').lower() for b in self.scheme_mods['banned_villains'])
+                and not any(b in self.catalog.model(v).key_name for b in banned)
             ]
             if len(available) >= remaining:
-                selected_villains.extend(random.sample(available, remaining))
+                selected_villains.extend(self.rng.sample(available, remaining))
             else:
                 selected_villains.extend(available)
             
         self.setup['villains'] = selected_villains
-        for v in selected_villains: self.synergy_tags.extend(self._get_tags(v))
+        for v in selected_villains: self.synergy_mask |= self.catalog.model(v).tag_mask
 
         # --- HENCHMEN ---
         total_hench_needed = base['henchmen'] + self.scheme_mods['extra_henchmen']
@@ -1243,36 +614,32 @@ class LegendaryRandomizer:
         remaining_h = target_count_h - len(selected_hench)
         
         if remaining_h > 0:
+            banned = [b.lower() for b in self.scheme_mods['banned_henchmen']]
             available = [
                 h for h in self.data['henchmen'] 
                 if h not in selected_hench
-                and not any(b.lower() in (h.get('name') or h.get('group_name') or '').lower() for b in self.scheme_mods['banned_henchmen'])
+                and not any(b in self.catalog.model(h).key_name for b in banned)
             ]
             if len(available) >= remaining_h:
-                selected_hench.extend(random.sample(available, remaining_h))
+                selected_hench.extend(self.rng.sample(available, remaining_h))
             else:
                 selected_hench.extend(available)
             
         self.setup['henchmen'] = selected_hench
         
     def _find_hero_by_name(self, name_fragment):
-        """Fuzzy search for a Hero."""
-        # 1. Exact Match
-        for h in self.data['heroes']:
-            if h.get('hero', '').lower() == name_fragment.lower(): return h
-            
-        # 2. Contains Match
-        for h in self.data['heroes']:
-            if name_fragment.lower() in h.get('hero', '').lower(): return h
-        return None
+        """Fuzzy search for a Hero (exact name first, then contains)."""
+        return self.catalog.find_hero(name_fragment, self.set_mask)
     def pick_heroes(self):
         hero_slots = 5
-        deck = []
+        # Precomputed per-Hero features (see catalog.HeroFeatures)
+        features = self.catalog.hero_features
+        deck = DeckState(features)
         
         # --- PRE-FILL PLAYER CHOICES ---
         if self.scheme_mods.get('player_picked_heroes', 0) > 0:
             for i in range(self.scheme_mods['player_picked_heroes']):
-                deck.append({
+                deck.add({
                     "hero": f"CHOSEN BY PLAYER {i+1}",
                     "set": "Player Choice",
                     "team": "Any",
@@ -1291,133 +658,65 @@ class LegendaryRandomizer:
             # Use helper
             chosen = self._find_by_ui_name(pick_name, available_heroes, 'hero')
             if chosen:
-                deck.append(chosen)
+                deck.add(chosen)
                 available_heroes.remove(chosen)
         
-        # --- HANDLE SPECIFIC HERO INCLUSIONS (Updated) ---
-        for req in self.scheme_mods['required_hero_deck_includes']:
-            req_name = req['name'].lower()
-            search_terms = [t.strip() for t in req_name.split(' or ')]
-            
-            # Check if User Selections (already in deck) satisfy this
-            already_have = 0
-            for h in deck:
-                if h.get('is_placeholder'): continue
-                h_name = h['hero'].lower()
-                if any(term in h_name for term in search_terms):
-                    already_have += 1
-            
-            needed = max(0, req['count'] - already_have)
-            
-            if needed > 0:
-                candidates = []
-                for h in available_heroes:
-                    h_name = h['hero'].lower()
-                    if any(term in h_name for term in search_terms):
-                        candidates.append(h)
-                
-                if len(candidates) >= needed:
-                    chosen = random.sample(candidates, needed)
-                    deck.extend(chosen)
-                    for h in candidates:
-                        if h in available_heroes: available_heroes.remove(h)
-                else:
-                    print(f"   [!] Warning: Not enough heroes matching '{req['name']}'.")
-                    deck.extend(candidates)
-                    for h in candidates:
-                        if h in available_heroes: available_heroes.remove(h)
+        # --- VILLAIN DECK HEROES (reserved first) ---
+        # Named Heroes for the Villain Deck are kept out of the Hero Deck;
+        # the solver leaves enough open Heroes for the other ones.
+        vd_named = []
+        vd_missing = 0
+        for req_name in self.scheme_mods['required_villain_deck_heroes']:
+            found = self._find_hero_by_name(req_name)
+            if found:
+                vd_named.append(found)
+                if found in available_heroes: available_heroes.remove(found)
+            else:
+                vd_missing += 1
+        vd_extra = self.scheme_mods['villain_deck_heroes'] - len(self.scheme_mods['required_villain_deck_heroes'])
+        vd_reserve = vd_missing + max(0, vd_extra)
+
+        # --- HERO CONSTRAINTS ---
+        # Name includes, required teams and versus teams are solved together
+        # (see hero_constraints.py)
+        if (self.scheme_mods['required_hero_deck_includes'] or self.scheme_mods.get('required_teams')
+                or self.scheme_mods['team_versus_counts']):
+            with self._span("solve_hero_constraints"):
+                chosen, excluded = self._solve_hero_constraints(deck, available_heroes, vd_reserve)
+            deck.extend(chosen)
+            available_heroes = [h for h in available_heroes if id(h) not in excluded]
 
-        # --- HANDLE REQUIRED TEAMS (Updated) ---
-        for req in self.scheme_mods.get('required_teams', []):
-            target_team = req['team'].lower()
-            
-            # Check User Selections
-            already_have = 0
-            for h in deck:
-                if h.get('is_placeholder'): continue
-                t = self._get_hero_team(h).lower()
-                if target_team in t:
-                    already_have += 1
-            
-            needed = max(0, req['count'] - already_have)
-            
-            if needed > 0:
-                candidates = [h for h in available_heroes if target_team in self._get_hero_team(h).lower()]
-                
-                if len(candidates) >= needed:
-                    chosen = random.sample(candidates, needed)
-                    deck.extend(chosen)
-                    for h in chosen:
-                        if h in available_heroes: available_heroes.remove(h)
-                else:
-                    deck.extend(candidates)
-                    for h in candidates:
-                        if h in available_heroes: available_heroes.remove(h)
-
-        # --- TEAM VERSUS SETUP ---
-        if self.scheme_mods['team_versus_counts']:
-            count_a, count_b = self.scheme_mods['team_versus_counts']
-            teams = {}
-            for h in available_heroes:
-                t = self._get_hero_team(h)
-                if t == 'Unknown': continue
-                if t not in teams: teams[t] = []
-                teams[t].append(h)
-            
-            valid_teams_a = [t for t, heroes in teams.items() if len(heroes) >= count_a]
-            if len(valid_teams_a) >= 2:
-                team_a_name = random.choice(valid_teams_a)
-                heroes_a = random.sample(teams[team_a_name], count_a)
-                valid_teams_b = [t for t in valid_teams_a if t != team_a_name and len(teams[t]) >= count_b]
-                if valid_teams_b:
-                    team_b_name = random.choice(valid_teams_b)
-                    heroes_b = random.sample(teams[team_b_name], count_b)
-                    deck = heroes_a + heroes_b
-                    for h in deck: 
-                        if h in available_heroes: available_heroes.remove(h)
-                        
         # --- FILTER BANNED TEAMS ---
         if self.scheme_mods.get('banned_teams_from_open_selection'):
             available_heroes = [
                 h for h in available_heroes 
-                if self._get_hero_team(h).lower() not in self.scheme_mods['banned_teams_from_open_selection']
+                if features(h).team.lower() not in self.scheme_mods['banned_teams_from_open_selection']
             ]
         
         # --- SMART MATCHING LOGIC ---
         target_count = self.scheme_mods['hero_deck_count']
         
         # --- NEW: Build Tag Context Report ---
-        active_mechanics = []
-        possible_mechanics = ["Mechanic_Wound", "Mechanic_Rescue", "Mechanic_Artifact", "Gen_KO", "Mechanic_Rise_Dead"]
-        for m in possible_mechanics:
-            if m in self.synergy_tags:
-                active_mechanics.append(m)
+        active_mechanics = [m for m in MECHANIC_TAGS.values() if self._has_tag(m)]
         
         # NEW: Extract Enemy Counters (Triggers from Mastermind/Villains)
-        active_counters = []
-        setup_class_needs = set()
-        setup_team_needs = set()
-        
-        for tag in self.synergy_tags:
-            # Parse tags like "Class_Strength" or "Team_Avengers" from the enriched JSONs
-            if tag.startswith("Class_"):
-                cls = tag.split("_")[1].lower()
-                setup_class_needs.add(cls)
-                active_counters.append(f"Need {cls.title()}")
-            elif tag.startswith("Team_"):
-                # Tag format is "Team_XMen" -> need "xmen" for comparison
-                tm = tag.split("_")[1].lower()
-                setup_team_needs.add(tm)
-                active_counters.append(f"Need {tm}")
+        # Class_ / Team_ tags of the setup, e.g. "Class_Strength" -> "strength",
+        # "Team_XMen" -> "xmen" (see model.TagVocabulary)
+        tags = model.TAGS
+        class_needs = tags.suffixes_of(self.synergy_mask & tags.class_mask)
+        team_needs = tags.suffixes_of(self.synergy_mask & tags.team_mask)
+        setup_class_needs = set(class_needs)
+        setup_team_needs = set(team_needs)
+        active_counters = [f"Need {cls.title()}" for cls in class_needs] + [f"Need {tm}" for tm in team_needs]
 
         # Check Bystander override for Rescue logic
-        if (self.scheme_mods.get('bystanders_override') or 0) > 5 and "Mechanic_Rescue" not in active_mechanics:
+        if (self.scheme_mods.get('bystanders_override') or 0) > 5 and not self._has_tag("Mechanic_Rescue"):
              active_mechanics.append("High Bystander Count (Rescue)")
 
         tag_report = {
             "Scheme": self._get_tags(self.setup['scheme']),
             "Mastermind": self._get_tags(self.setup['mastermind']),
-            "Villains": {v.get('group_name') or v.get('name'): self._get_tags(v) for v in self.setup['villains']},
+            "Villains": {self.catalog.model(v).name: self._get_tags(v) for v in self.setup['villains']},
             "Henchmen": {h['name']: self._get_tags(h) for h in self.setup['henchmen']},
             "Active_Triggers": active_mechanics + active_counters
         }
@@ -1427,60 +726,46 @@ class LegendaryRandomizer:
         # Initialize log storage
         self.setup['synergy_logs'] = []
 
+        # Scores one Hero and explains why. The selection loop scores the whole
+        # pool at once with catalog.HeroMatrix.score, which mirrors these terms.
         def score_hero(hero):
             score = 0
             reasons = [] # Log reasons for debug
             
-            # Combine text for scanning
-            hero_text_blob = ""
-            hero_costs = []
-            for c in hero['cards']:
-                abilities = " ".join(c.get('abilities', []))
-                hero_text_blob += abilities.lower() + " "
-                if c.get('cost'): 
-                    val = int(re.search(r'\d+', str(c['cost'])).group(0)) if re.search(r'\d+', str(c['cost'])) else 0
-                    hero_costs.append(val)
+            f = features(hero)
             
             # A. MECHANIC SYNERGY
-            if "Mechanic_Wound" in self.synergy_tags:
-                if "wound" in hero_text_blob or "heal" in hero_text_blob:
+            if self._has_tag("Mechanic_Wound"):
+                if f.wound:
                     score += 2
                     reasons.append("Wound Management (+2)")
             
             bystander_val = self.scheme_mods.get('bystanders_override') or 0
-            if bystander_val > 5 or "Mechanic_Rescue" in self.synergy_tags:
-                if "bystander" in hero_text_blob or "rescue" in hero_text_blob:
+            if bystander_val > 5 or self._has_tag("Mechanic_Rescue"):
+                if f.rescue:
                     score += 4
                     reasons.append("Bystander Rescue (+4)")
             
-            if "Mechanic_Artifact" in self.synergy_tags:
-                if "artifact" in hero_text_blob:
+            if self._has_tag("Mechanic_Artifact"):
+                if f.artifact:
                     score += 5
                     reasons.append("Artifact Synergy (+5)")
                     
-            if "Gen_KO" in self.synergy_tags:
-                if "ko " in hero_text_blob: 
+            if self._has_tag("Gen_KO"):
+                if f.ko: 
                     score += 2
                     reasons.append("KO/Thinning (+2)")
                     
-            if "Mechanic_Rise_Dead" in self.synergy_tags:
-                if "ko pile" in hero_text_blob or "discard pile" in hero_text_blob:
+            if self._has_tag("Mechanic_Rise_Dead"):
+                if f.graveyard:
                     score += 3
                     reasons.append("Graveyard Interaction (+3)")
 
             # B. CURVE BALANCING
-            current_deck_costs = []
-            for h in deck:
-                if h.get('is_placeholder'): continue
-                for c in h.get('cards', []):
-                     if c.get('cost'):
-                        val = int(re.search(r'\d+', str(c['cost'])).group(0)) if re.search(r'\d+', str(c['cost'])) else 0
-                        current_deck_costs.append(val)
-            
-            deck_avg = sum(current_deck_costs) / len(current_deck_costs) if current_deck_costs else 0
-            cand_avg = sum(hero_costs) / len(hero_costs) if hero_costs else 0
+            deck_avg = deck.avg_cost
+            cand_avg = f.avg_cost
 
-            if not current_deck_costs:
+            if not deck.cost_count:
                 if 3.5 <= cand_avg <= 4.5:
                     score += 2
                     reasons.append("Balanced Starter (+2)")
@@ -1502,36 +787,25 @@ class LegendaryRandomizer:
 
             # --- NEW: ENEMY COUNTERS (Mastermind/Villain Triggers) ---
             # 1. Class Counters
-            hero_classes = set()
-            for c in hero['cards']:
-                for cls in c.get('classes', []):
-                    hero_classes.add(cls.lower())
-            
-            matched_classes = hero_classes.intersection(setup_class_needs)
+            matched_classes = f.classes.intersection(setup_class_needs)
             if matched_classes:
                 score += 3
-                reasons.append(f"Enemy Counter: {', '.join(matched_classes).title()} (+3)")
+                reasons.append(f"Enemy Counter: {', '.join(sorted(matched_classes)).title()} (+3)")
 
             # 2. Team Counters
-            my_team = self._get_hero_team(hero)
-            if my_team != 'Unknown':
-                # Normalization to match the "Team_GuardiansOfTheGalaxy" -> "guardiansofthegalaxy" format
-                clean_my_team = my_team.replace('-', ' ').title().replace(' ', '').lower()
-                if clean_my_team in setup_team_needs:
+            if f.team != 'Unknown':
+                # f.team_key is normalized to the "Team_GuardiansOfTheGalaxy" -> "guardiansofthegalaxy" format
+                if f.team_key in setup_team_needs:
                     score += 3
-                    reasons.append(f"Enemy Counter: {my_team} (+3)")
+                    reasons.append(f"Enemy Counter: {f.team} (+3)")
             # ---------------------------------------------------------
 
             # C. CONDITIONAL TEAM SYNERGY
-            current_teams = [self._get_hero_team(h) for h in deck if not h.get('is_placeholder')]
-            my_team = self._get_hero_team(hero).lower()
+            my_team = f.team.lower()
             
             if my_team != 'unknown':
-                team_trigger_pattern = f"[{my_team}]"
-                requires_team_synergy = team_trigger_pattern in hero_text_blob
-                
-                if my_team in current_teams:
-                    if requires_team_synergy:
+                if my_team in deck.teams:
+                    if f.team_trigger:
                         score += 4
                         reasons.append(f"Team Requirement: {my_team.title()} (+4)")
                     else:
@@ -1539,48 +813,26 @@ class LegendaryRandomizer:
                         reasons.append(f"Team Match: {my_team.title()} (+0.5)")
 
             # D. CLASS SYNERGY (SMART BIDIRECTIONAL)
-            # 1. Analyze Deck State
-            deck_classes = set()
-            deck_needs = set()
-            standard_classes = ["strength", "instinct", "covert", "tech", "ranged"]
-            
-            for h in deck:
-                if h.get('is_placeholder'): continue
-                for c in h.get('cards', []):
-                    # Gather provided classes
-                    for cls in c.get('classes', []):
-                        deck_classes.add(cls.lower())
-                    # Gather required classes (Scan text for [class])
-                    ab_text = " ".join(c.get('abilities', [])).lower()
-                    for s_cls in standard_classes:
-                        if f"[{s_cls}]" in ab_text:
-                            deck_needs.add(s_cls)
+            # 1. Deck State (classes provided / [class] requirements, kept by DeckState)
+            deck_classes = deck.classes
+            deck_needs = deck.needs
             
             # 2. Analyze Candidate
-            cand_classes = set()
-            cand_needs = set()
-            
-            for c in hero['cards']:
-                for cls in c.get('classes', []):
-                    cand_classes.add(cls.lower())
-            
-            # Check Candidate Requirements (using the pre-generated blob)
-            for s_cls in standard_classes:
-                if f"[{s_cls}]" in hero_text_blob:
-                    cand_needs.add(s_cls)
+            cand_classes = f.classes
+            cand_needs = f.needs
             
             # 3. Score
             # Case A: Candidate triggers Deck (Deck needs X, Candidate has X)
             triggers_deck = cand_classes.intersection(deck_needs)
             if triggers_deck:
                 score += 3
-                reasons.append(f"Satisfies Deck Requirement: {', '.join(triggers_deck).title()} (+3)")
+                reasons.append(f"Satisfies Deck Requirement: {', '.join(sorted(triggers_deck)).title()} (+3)")
 
             # Case B: Deck triggers Candidate (Candidate needs Y, Deck has Y)
             triggered_by_deck = cand_needs.intersection(deck_classes)
             if triggered_by_deck:
                 score += 3
-                reasons.append(f"Triggered by Deck: {', '.join(triggered_by_deck).title()} (+3)")
+                reasons.append(f"Triggered by Deck: {', '.join(sorted(triggered_by_deck)).title()} (+3)")
 
             # Case C: Simple Class Match (Stacking)
             # Only applied if no specific triggers are active, to maintain consistency
@@ -1589,19 +841,19 @@ class LegendaryRandomizer:
                     score += 1
                     reasons.append("Class Match (+1)")
                     
-            # Random Noise
-            rng = random.uniform(0, 1.5)
-            score += rng
-            # Rounding for cleaner logs
             return score, reasons
 
 
+        # Everything from here on fills open slots (the optimizer may revisit it)
+        open_from = len(deck)
+        open_pool = list(available_heroes)
+
 # --- SEEDING: Pick 1 Random Hero (User Request) ---
         # We pick one hero completely at random first. 
         # The Smart Matching Logic will then build around this hero (and any required ones).
         if len(deck) < target_count and available_heroes:
-            seed = random.choice(available_heroes)
-            deck.append(seed)
+            seed = self.rng.choice(available_heroes)
+            deck.add(seed)
             available_heroes.remove(seed)
             
             self.setup['synergy_logs'].append({
@@ -1611,23 +863,33 @@ class LegendaryRandomizer:
             })
 
         # --- SELECTION LOOP ---
+        # Each pick scores a random sample of 10 available Heroes (the variety
+        # of the setups comes from the sample) in one batch; ties for the best
+        # score are broken at random.
+        matrix = self.catalog.hero_matrix
+        rows = self.catalog.hero_rows(available_heroes)
+
+        bystander_val = self.scheme_mods.get('bystanders_override') or 0
+        mechanics = {
+            flag: MECHANIC_POINTS[flag] for flag, tag in MECHANIC_TAGS.items()
+            if self._has_tag(tag) or (flag == 'rescue' and bystander_val > 5)
+        }
+
         while len(deck) < target_count and available_heroes:
             sample_size = min(10, len(available_heroes))
-            candidates = random.sample(available_heroes, sample_size)
-            
-            best_candidate = None
-            best_score = -999
-            best_reasons = []
+            candidates = self.rng.sample(range(len(available_heroes)), sample_size)
+            scores = matrix.score(rows[candidates], deck, mechanics, setup_class_needs, setup_team_needs)
+            self.score_evaluations += len(scores) + 1  # batch + the winner's explanation
+            best = scores.max()
+            ties = np.flatnonzero(scores == best)
+            pick = candidates[int(self.rng.choice(ties))]
             
-            for h in candidates:
-                s, r = score_hero(h)
-                if s > best_score:
-                    best_score = s
-                    best_candidate = h
-                    best_reasons = r
+            best_candidate = available_heroes.pop(pick)
+            rows = np.delete(rows, pick)
             
-            deck.append(best_candidate)
-            available_heroes.remove(best_candidate)
+            # Re-score the winner on its own to get the reasons for the log
+            best_score, best_reasons = score_hero(best_candidate)
+            deck.add(best_candidate)
             
             # Save Log
             self.setup['synergy_logs'].append({
@@ -1636,22 +898,48 @@ class LegendaryRandomizer:
                 "reasons": best_reasons
             })
             
-        self.setup['heroes'] = deck
+        # --- WHOLE-DECK OPTIMIZER (optional) ---
+        # Anneals the open picks for the given time budget (see hero_optimizer.py);
+        # optimize_steps also caps the number of steps, so a seed reproduces the deck
+        budget_ms = self.user_selections.get('optimize_ms') or 0
+        if budget_ms and len(deck) > open_from:
+            fixed = deck.heroes[:open_from]
+            greedy = deck.heroes[open_from:]
+            with self._span("optimize_heroes") as span:
+                objective = hero_optimizer.DeckObjective(
+                    self.catalog, DeckState(features), (mechanics, setup_class_needs, setup_team_needs))
+                best, stats = hero_optimizer.improve(objective, fixed, greedy, available_heroes, budget_ms, self.rng,
+                                                     max_steps=self.user_selections.get('optimize_steps'))
+                span.update(stats)
+                self.score_evaluations += objective.evaluations
+
+            if [id(h) for h in best] != [id(h) for h in greedy]:
+                chosen = {id(h) for h in best}
+                available_heroes = [h for h in open_pool if id(h) not in chosen]
+                # Re-explain the picks against the deck as it is rebuilt
+                deck.reset(fixed)
+                self.setup['synergy_logs'] = []
+                for hero in best:
+                    hero_score, reasons = score_hero(hero)
+                    deck.add(hero)
+                    self.setup['synergy_logs'].append({
+                        "hero": hero['hero'],
+                        "score": round(hero_score, 2),
+                        "reasons": reasons
+                    })
+
+        self.setup['heroes'] = deck.heroes
         
         # --- Pick separate heroes for the Villain Deck ---
         self.setup['villain_deck_heroes'] = []
         
-        # 1. Specific
-        for req_name in self.scheme_mods['required_villain_deck_heroes']:
-            found = self._find_hero_by_name(req_name)
-            if found:
-                self.setup['villain_deck_heroes'].append(found)
-                if found in available_heroes: available_heroes.remove(found)
-            else:
-                if available_heroes:
-                    fallback = random.choice(available_heroes)
-                    self.setup['villain_deck_heroes'].append(fallback)
-                    available_heroes.remove(fallback)
+        # 1. Specific (reserved above), a random one for each name not found
+        self.setup['villain_deck_heroes'].extend(vd_named)
+        for _ in range(vd_missing):
+            if available_heroes:
+                fallback = self.rng.choice(available_heroes)
+                self.setup['villain_deck_heroes'].append(fallback)
+                available_heroes.remove(fallback)
 
         # 2. Generic Extras
         filled_count = len(self.setup['villain_deck_heroes'])
@@ -1660,24 +948,100 @@ class LegendaryRandomizer:
         
         if remaining > 0:
             if len(available_heroes) >= remaining:
-                extras = random.sample(available_heroes, remaining)
+                extras = self.rng.sample(available_heroes, remaining)
                 self.setup['villain_deck_heroes'].extend(extras)
 
-    def generate_setup(self):
-        print("4. Generating...")
-        if not self.load_data(): return None
-        
-        self.pick_scheme()
-        self.pick_mastermind()
+    def _solve_hero_constraints(self, deck, pool, reserve):
+        """Picks the Heroes the Scheme requires, all constraints at once.
+
+        Returns (Heroes to add to the deck, ids of the pool Heroes that may
+        not fill open slots). If no Hero Deck satisfies the constraints this
+        is logged and each constraint gets as many Heroes as there are.
+        """
+        features = self.catalog.hero_features
+        position = {id(h): i for i, h in enumerate(pool)}
+        heroes = self.catalog.data['heroes']
+        names = self.catalog.names['heroes']
+
+        # Pool positions by team (as in the data)
+        teams = {}
+        for i, h in enumerate(pool):
+            teams.setdefault(features(h).team, set()).add(i)
+        banned = self.scheme_mods.get('banned_teams_from_open_selection') or []
+        open_members = {i for team, members in teams.items() if team.lower() not in banned for i in members}
+
+        constraints = []
+        # "Exactly N Heroes with <name>": user picks count, matching Heroes never fill open slots
+        for req in self.scheme_mods['required_hero_deck_includes']:
+            terms = [t.strip() for t in req['name'].lower().split(' or ')]
+            have = sum(1 for h in deck if not h.get('is_placeholder') and any(t in h['hero'].lower() for t in terms))
+            members = {position[id(heroes[pos])] for t in terms for pos in names.containing(t) if id(heroes[pos]) in position}
+            constraints.append(hero_constraints.Constraint(
+                f"{req['count']} Heroes with '{req['name']}'", hero_constraints.EXACT, members, req['count'] - have))
+
+        # "At least N [team] Heroes"
+        for req in self.scheme_mods.get('required_teams', []):
+            target_team = req['team'].lower()
+            members = set().union(*(m for team, m in teams.items() if target_team in team.lower()))
+            constraints.append(hero_constraints.Constraint(
+                f"{req['count']} [{target_team}] Heroes", hero_constraints.AT_LEAST, members,
+                req['count'] - deck.team_count(target_team)))
+
+        capacity = self.scheme_mods['hero_deck_count'] - len(deck)
+        versus = self.scheme_mods['team_versus_counts']
+        if versus:
+            # One alternative per ordered pair of teams: exactly count_a of one, count_b of the other
+            count_a, count_b = versus
+            problems = []
+            for team_a, members_a in teams.items():
+                if team_a == 'Unknown' or len(members_a) + deck.teams.get(team_a, 0) < count_a: continue
+                for team_b, members_b in teams.items():
+                    if team_b in ('Unknown', team_a) or len(members_b) + deck.teams.get(team_b, 0) < count_b: continue
+                    problems.append(hero_constraints.Problem(constraints + [
+                        hero_constraints.Constraint(f"{count_a} [{team_a}] Heroes", hero_constraints.EXACT,
+                                                    members_a, count_a - deck.teams.get(team_a, 0)),
+                        hero_constraints.Constraint(f"{count_b} [{team_b}] Heroes", hero_constraints.EXACT,
+                                                    members_b, count_b - deck.teams.get(team_b, 0)),
+                    ], capacity, open_members, reserve))
+            picked, chosen = hero_constraints.choose(problems, self.rng)
+            if picked is not None: constraints = problems[picked].constraints
+        else:
+            chosen = hero_constraints.Problem(constraints, capacity, open_members, reserve).sample(self.rng)
+
+        if chosen is None:
+            labels = [c.label for c in constraints]
+            if versus: labels.append("%d and %d Heroes of two Teams" % versus)
+            self._warn("hero_constraints_infeasible",
+                       "No Hero Deck satisfies: %(constraints)s (%(slots)d slots, %(reserve)d Villain Deck Heroes).",
+                       constraints=labels, slots=capacity, reserve=reserve)
+            chosen = hero_constraints.best_effort(constraints, capacity, self.rng)
+
+        excluded = set(chosen)
+        for c in constraints:
+            if c.kind == hero_constraints.EXACT: excluded.update(c.members)
+        return [pool[i] for i in chosen], {id(pool[i]) for i in excluded}
+
+    def generate_setup(self, seed=None):
+        # Every call starts from a clean setup; data is loaded once per instance.
+        # The first call uses the seed given to __init__, later ones a fresh one.
+        if seed is None and not self.generated: seed = self.seed
+        self.reset(seed)
+        logger.debug("Generating (seed=%s)...", self.seed)
+        if not self.loaded:
+            with self._span("load_data"):
+                if not self.load_data(): return None
+        self.generated += 1
+        
+        with self._span("pick_scheme"): self.pick_scheme()
+        with self._span("pick_mastermind"): self.pick_mastermind()
         
         # --- CHECK FOR MASTERMIND-SPECIFIC TWIST OVERRIDES (NEW) ---
         # Checks for rules like: "If using Lilith: Use 1 Twist total"
-        scheme_text = " ".join(self.setup['special_rules'])
-        cond_twist_match = re.search(r'If using (.*?): Use (\d+) Twists? total', scheme_text, re.IGNORECASE)
+        twist_override = self.scheme_record['masterminds']['twist_override']
         
-        if cond_twist_match:
-            req_mm_name = cond_twist_match.group(1).strip()
-            req_twist_count = int(cond_twist_match.group(2))
+        if twist_override:
+            req_mm_name = twist_override['mastermind']
+            req_twist_count = twist_override['twists']
             
             # Fuzzy match: Check if the required name is part of the current Mastermind's name
             # e.g. "Lilith" matches "Lilith, Mother of Demons"
@@ -1686,11 +1050,14 @@ class LegendaryRandomizer:
             if req_mm_name.lower() in current_mm.lower() or current_mm.lower() in req_mm_name.lower():
                 self.scheme_mods['twists'] = req_twist_count
                 self.scheme_mods['twist_note'] = f"(If using {req_mm_name})"
-                print(f"   [!] Applied Mastermind Override: {req_twist_count} Twists for {current_mm}")
+                logger.info("Applied Mastermind Override: %s Twists for %s", req_twist_count, current_mm)
         
-        self.pick_villains_and_henchmen()
-        self.pick_heroes()
+        with self._span("pick_villains_and_henchmen"): self.pick_villains_and_henchmen()
+        with self._span("pick_heroes") as span:
+            self.pick_heroes()
+            span['score_evaluations'] = self.score_evaluations
         
+        format_start = time.perf_counter()
         base_bystanders = SETUP_RULES.get(self.player_count, SETUP_RULES[2])['bystanders']
         if self.scheme_mods['bystanders_override'] is not None:
             final_bystanders = self.scheme_mods['bystanders_override']
@@ -1712,10 +1079,10 @@ class LegendaryRandomizer:
             candidates = [h for h in self.data['henchmen'] if h['name'] not in used_henchmen_names]
             
             if candidates:
-                chosen = random.choice(candidates)
+                chosen = self.rng.choice(candidates)
                 self.scheme_mods['henchmen_in_hero_deck_obj'] = chosen
             else:
-                print("   [!] Warning: No unique Henchmen groups left for Hero Deck.")
+                self._warn("hero_deck_henchmen_missing", "No unique Henchmen groups left for Hero Deck.")
                 
        # Determine suffixes for Half-Deck mechanic
         v_suffix = ""
@@ -1745,6 +1112,7 @@ class LegendaryRandomizer:
         vd_heroes_formatted = []
 
         result = {
+            "Seed": self.seed,
             "Mastermind": f"{self.setup['mastermind']['name']} ({self.setup['mastermind']['set']})",
             # We now pass the raw list for better UI handling
             "Lurking_Masterminds": [f"{m['name']} ({m['set']})" for m in self.setup.get('lurking_masterminds', [])],
@@ -1763,6 +1131,8 @@ class LegendaryRandomizer:
             "Wedding_Heroes": [f"{h['hero']} ({h['set']})" for h in self.scheme_mods.get('wedding_heroes', [])],
             "Custom_Deck": self.scheme_mods.get('custom_deck'),
             "synergy_logs": self.setup.get('synergy_logs', []),
+            "timings": self.timings,
+            "events": self.events,
             "synergy_overview": self.setup.get('synergy_overview', {}),
             "Tyrant_Masterminds": [f"{m['name']} ({m['set']})" for m in self.setup.get('tyrant_masterminds', [])],
             "Drained_Mastermind": self.setup.get('drained_mastermind'),
@@ -1778,14 +1148,96 @@ class LegendaryRandomizer:
                 "Quantum_Ambush": self.scheme_mods['quantum_ambush_scheme']
             }
         }
+        self.timings.append({"phase": "format_result", "ms": round((time.perf_counter() - format_start) * 1000, 3)})
         return result
 
+# --- BATCH GENERATION (NEW) ---
+def generate_setups(user_sets, player_count, user_selections=None, n=1, seed=None):
+    """Yields n independent setups from one randomizer, loading the data only once.
+
+    With a seed the whole batch is reproducible (each setup gets a seed drawn from it).
+    """
+    seeds = random.Random(seed) if seed is not None else None
+    randomizer = LegendaryRandomizer(user_sets, player_count, user_selections)
+    if not randomizer.load_data(): return
+    for _ in range(n):
+        yield randomizer.generate_setup(seeds.randrange(SEED_RANGE) if seeds else None)
+
+# --- CACHED GENERATION (NEW) ---
+def generate_cached_setup(user_sets, player_count, user_selections=None, seed=None):
+    """Generates one setup, serving repeats of the same request from catalog.setup_cache.
+
+    The cache is shared by all sessions (and the prefetch threads), so every
+    caller gets its own copy of the setup.
+    """
+    if seed is None: seed = random.randrange(SEED_RANGE)
+    key = catalog.setup_key(user_sets, player_count, user_selections, seed)
+    setup = catalog.setup_cache.get(key)
+    if setup is None:
+        setup = LegendaryRandomizer(user_sets, player_count, user_selections, seed).generate_setup()
+        if setup: catalog.setup_cache.put(key, setup)
+    return copy.deepcopy(setup)
+
+# --- PREFETCH (NEW) ---
+# Setups generated ahead in the background for the current sidebar
+# configuration, so a reroll is served without waiting. The worker threads
+# are shared by all sessions; each session keeps its own queue.
+PREFETCH_DEPTH = 3
+prefetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+def _prefetch_setup(user_sets, player_count, user_selections, seed):
+    # Not put in catalog.setup_cache: most prefetched setups are never shown
+    return LegendaryRandomizer(user_sets, player_count, user_selections, seed).generate_setup()
+
+class SetupPrefetcher:
+    """Queue of setups being generated for one sidebar configuration.
+
+    configure() drops the queue when the expansions, player count or manual
+    overrides change (or the data is reloaded); fill() tops it up to `depth`
+    setups with fresh random seeds. A prefetched setup only goes into the
+    shared setup cache once next() serves it, so the speculative ones never
+    push requested setups out of the cache.
+    """
+
+    def __init__(self, depth=PREFETCH_DEPTH):
+        self.depth = depth
+        self.config = None
+        self.args = None
+        self.queue = collections.deque()  # (seed, future), oldest first
+
+    def configure(self, user_sets, player_count, user_selections):
+        config = catalog.setup_key(user_sets, player_count, user_selections, None)
+        if config != self.config:
+            for _, future in self.queue: future.cancel()
+            self.queue.clear()
+            self.config = config
+            self.args = (list(user_sets), player_count, copy.deepcopy(user_selections))
+
+    def fill(self):
+        if self.args is None: return
+        while len(self.queue) < self.depth:
+            seed = random.randrange(SEED_RANGE)
+            self.queue.append((seed, prefetch_pool.submit(_prefetch_setup, *self.args, seed)))
+
+    def next(self):
+        """The oldest queued setup (waiting for it if it is still running), or None if the queue is empty."""
+        while self.queue:
+            seed, future = self.queue.popleft()
+            if future.cancelled(): continue
+            setup = future.result()
+            if not setup: continue
+            # Served: from now on the same request + seed comes from the cache
+            catalog.setup_cache.put(catalog.setup_key(*self.args, seed), setup)
+            return copy.deepcopy(setup)
+        return None
+
 # ==========================================
 # STREAMLIT UI CODE
 # ==========================================
 
 def main():
     st.set_page_config(page_title="Legendary Randomizer", page_icon="🦸", layout="wide")
+    setup_log.configure()
 
     # --- Sidebar: Configuration ---
     st.sidebar.header("⚙️ Setup")
@@ -1794,26 +1246,12 @@ def main():
     players = st.sidebar.slider("Number of Players", min_value=1, max_value=5, value=3)
     
     # --- LOAD RAW DATA & SETS ---
-    raw_data = {}
+    # Decoded once per process and shared by all sessions (see catalog.py)
     all_sets = set()
     
     try:
-        files = {
-            "schemes": "enriched_schemes.json",
-            "masterminds": "enriched_masterminds.json",
-            "villains": "enriched_villains.json",
-            "henchmen": "enriched_henchmen.json",
-            "heroes": "enriched_heroes.json"
-        }
-        for key, filename in files.items():
-            if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    raw_data[key] = data
-                    for item in data:
-                        if item.get("set"):
-                            for s in item["set"].split('/'):
-                                all_sets.add(s.strip())
+        shared = catalog.get_catalog()
+        all_sets.update(shared.all_sets)
     except Exception as e:
         st.error(f"Error loading data: {e}")
 
@@ -1837,43 +1275,11 @@ def main():
         return
 
     # --- FILTER DATA BASED ON SELECTION ---
-    selected_sets_lower = {s.lower() for s in selected_sets}
-    def is_in_selection(item):
-        item_set = item.get('set', '')
-        if not item_set: return False
-        parts = [p.strip().lower() for p in item_set.split('/')]
-        return any(p in selected_sets_lower for p in parts)
-
-    filtered_data = {}
-    filtered_options = {}
-    
-    for key, items in raw_data.items():
-        # 1. Filter items belonging to selected sets
-        valid_items = [i for i in items if is_in_selection(i)]
-        filtered_data[key] = valid_items
-        
-        # 2. Extract names with Set Disambiguation logic
-        # Count occurrences of each name
-        name_counts = {}
-        for item in valid_items:
-            if key == "heroes": n = item['hero']
-            elif key == "villains": n = item.get('group_name') or item.get('name')
-            else: n = item.get('name')
-            name_counts[n] = name_counts.get(n, 0) + 1
-            
-        final_names = []
-        for item in valid_items:
-            if key == "heroes": n = item['hero']
-            elif key == "villains": n = item.get('group_name') or item.get('name')
-            else: n = item.get('name')
-            
-            # If duplicates exist across sets, append (Set Name)
-            if name_counts[n] > 1:
-                final_names.append(f"{n} ({item.get('set', 'Unknown')})")
-            else:
-                final_names.append(n)
-        
-        filtered_options[key] = ["Random"] + sorted(list(set(final_names)))
+    # Items and disambiguated option labels, memoized per expansion selection
+    # (see Catalog.selection), so a dropdown change does not redo them
+    selection = shared.selection(shared.selection_mask(selected_sets))
+    filtered_data = selection.data
+    filtered_options = selection.options
 
     st.sidebar.divider()
     st.sidebar.subheader("🔒 Manual Overrides")
@@ -1885,21 +1291,35 @@ def main():
     def find_option_match(target, options):
         if not target or target == "Unknown": return None
         if target in options: return target
-        target_lower = target.lower()
-        for opt in options:
-            if opt.lower() == target_lower: return opt
-        for opt in options:
-            if opt == "Random": continue
-            if target_lower in opt.lower() or opt.lower() in target_lower:
-                return opt
+        index = catalog.label_index(tuple(options))
+        exact = index.equal(target)
+        if exact: return options[exact[0]]
+        # Either side containing the other, first in option order
+        partial = set(index.containing(target))
+        partial.update(index.contained_in(target))
+        for pos in sorted(partial):
+            if options[pos] == "Random": continue
+            return options[pos]
         return None
 
     # UI: Scheme & Mastermind
-    user_selections['scheme'] = st.sidebar.selectbox("Scheme", filtered_options.get('schemes', ["Random"]))
-    user_selections['mastermind'] = st.sidebar.selectbox("Mastermind", filtered_options.get('masterminds', ["Random"]))
+    # Options the selected expansions can't fully set up are marked (see feasibility.py);
+    # Streamlit can't disable single options, so they stay selectable
+    blocked_schemes = selection.unavailable('schemes', players)
+    blocked_masterminds = selection.unavailable('masterminds', players)
+    user_selections['scheme'] = st.sidebar.selectbox(
+        "Scheme", filtered_options.get('schemes', ["Random"]),
+        format_func=lambda label: f"{label} ⛔" if label in blocked_schemes else label)
+    if user_selections['scheme'] in blocked_schemes:
+        st.sidebar.warning("Not in the selected expansions: " + ", ".join(blocked_schemes[user_selections['scheme']]))
+    user_selections['mastermind'] = st.sidebar.selectbox(
+        "Mastermind", filtered_options.get('masterminds', ["Random"]),
+        format_func=lambda label: f"{label} ⛔" if label in blocked_masterminds else label)
+    if user_selections['mastermind'] in blocked_masterminds:
+        st.sidebar.warning("Not in the selected expansions: " + ", ".join(blocked_masterminds[user_selections['mastermind']]))
     
     # --- PRE-ANALYSIS: CALCULATE DYNAMIC COUNTS & REQUIREMENTS ---
-    # We create a temporary Randomizer to parse the rules of the selected Scheme
+    # Read from the per-catalog table of scheme requirements (see scheme_rules.scheme_requirements)
     
     # Defaults
     base_rules = SETUP_RULES[players]
@@ -1909,41 +1329,52 @@ def main():
     
     locked_villains = []
     locked_henchmen = []
+    # We map abstract requirements (Team/Name) to specific slots
+    hero_slot_constraints = []
 
     if user_selections['scheme'] != "Random":
         # 1. Find Scheme Object
         scheme_obj = next((s for s in filtered_data['schemes'] if s['name'] == user_selections['scheme']), None)
         
         if scheme_obj:
-            # 2. Run Parser (Dry Run)
-            temp_r = LegendaryRandomizer(selected_sets, players)
-            temp_r.data = filtered_data # Inject filtered data directly
-            temp_r.parse_scheme_rules(scheme_obj)
-            
-            # 3. Apply Villain/Henchmen Counts
-            # (Logic copied from pick_villains_and_henchmen)
-            v_needed = base_rules['villains'] + temp_r.scheme_mods['extra_villains']
-            h_needed = base_rules['henchmen'] + temp_r.scheme_mods['extra_henchmen']
-            
-            if temp_r.scheme_mods['double_group_count']:
-                v_needed *= 2
-                h_needed *= 2
-                
-            num_villains = v_needed
-            num_henchmen = h_needed
-            
-            # 4. Apply Hero Count
-            num_heroes = temp_r.scheme_mods['hero_deck_count']
+            reqs = shared.requirements(scheme_obj, players)
+
+            # 2. Villain/Henchmen/Hero Counts
+            num_villains = reqs['villains']
+            num_henchmen = reqs['henchmen']
+            num_heroes = reqs['heroes']
+
+            # Slot counts for every player count, e.g. "1p: 1V / 1H / 5 Heroes"
+            counts = []
+            for p in SETUP_RULES:
+                r = shared.requirements(scheme_obj, p)
+                counts.append(f"{p}p: {r['villains']}V / {r['henchmen']}H / {r['heroes']} Heroes")
+            st.sidebar.caption(" · ".join(counts))
             
-            # 5. Extract Required Groups (Scheme)
+            # 3. Extract Required Groups (Scheme)
             v_opts = filtered_options.get('villains', [])
             h_opts = filtered_options.get('henchmen', [])
-            
-            for req in temp_r.scheme_mods['required_villains']:
+            required_villains = list(reqs['required_villains'])
+            required_henchmen = list(reqs['required_henchmen'])
+            hero_slot_constraints = list(reqs['hero_constraints'])
+
+            # "Always include ..." names depend on the selected expansions;
+            # each goes where the rules list it among the other names
+            included = {'villains': 0, 'henchmen': 0, 'heroes': 0}
+            for inc in reqs['includes']:
+                key, found = shared.resolve_include(inc['name'], selection.mask)
+                if key is None: continue
+                pos = inc[key] + included[key]
+                included[key] += 1
+                if key == 'henchmen': required_henchmen.insert(pos, found['name'])
+                elif key == 'villains': required_villains.insert(pos, found['group_name'])
+                else: hero_slot_constraints.insert(pos, {'type': 'name', 'val': found['hero']})
+            
+            for req in required_villains:
                 m = find_option_match(req, v_opts)
                 if m: locked_villains.append(m)
                 
-            for req in temp_r.scheme_mods['required_henchmen']:
+            for req in required_henchmen:
                 m = find_option_match(req, h_opts)
                 if m: locked_henchmen.append(m)
 
@@ -1963,43 +1394,23 @@ def main():
                 if match_h and match_h not in locked_henchmen:
                     locked_henchmen.append(match_h)
 
-    # --- GATHER HERO CONSTRAINTS ---
-    # We map abstract requirements (Team/Name) to specific slots
-    hero_constraints = []
-    
-    # 1. Specific Includes (e.g. "Name contains Hulk")
-    # We retrieve these from the temp_randomizer if it ran
-    if user_selections['scheme'] != "Random" and 'temp_r' in locals():
-        for req in temp_r.scheme_mods['required_hero_deck_includes']:
-            count = req.get('count', 1)
-            for _ in range(count):
-                hero_constraints.append({'type': 'name', 'val': req['name']})
-                
-        for req in temp_r.scheme_mods['required_teams']:
-            count = req.get('count', 1)
-            for _ in range(count):
-                hero_constraints.append({'type': 'team', 'val': req['team']})
     # --- RENDER DYNAMIC SIDEBAR ---
 
     # Villains
     st.sidebar.markdown(f"**Villains ({num_villains} Groups)**")
     user_selections['villains'] = []
     
-    # Track used names to remove from subsequent dropdowns
+    # Track used option positions to remove from subsequent dropdowns (see Selection.slot_options)
     # Initialize with locked items to ensure they aren't manually picked in earlier open slots if order varies
-    used_villains = {v for v in locked_villains if v}
+    v_positions = selection.positions['villains']
+    used_villains = {v_positions[v] for v in locked_villains if v}
 
     for i in range(num_villains):
-        v_base_opts = filtered_options.get('villains', ["Random"])
-        
         # Identify if this specific slot is locked
         current_lock = locked_villains[i] if i < len(locked_villains) else None
         
         # Filter Options: Allow "Random", the specific lock for THIS slot, or anything not yet used
-        v_opts = [
-            opt for opt in v_base_opts 
-            if opt == "Random" or opt == current_lock or opt not in used_villains
-        ]
+        v_opts = selection.slot_options('villains', used_villains, keep=current_lock)
         
         key = f"v_{i}"
         slot_index = 0
@@ -2016,21 +1427,17 @@ def main():
         if v_pick != "Random": 
             user_selections['villains'].append(v_pick)
             # Add to used list so next dropdowns don't show it
-            used_villains.add(v_pick)
+            used_villains.add(v_positions[v_pick])
 
     # Henchmen
     st.sidebar.markdown(f"**Henchmen ({num_henchmen} Groups)**")
     user_selections['henchmen'] = []
-    used_henchmen = {h for h in locked_henchmen if h}
+    h_positions = selection.positions['henchmen']
+    used_henchmen = {h_positions[h] for h in locked_henchmen if h}
 
     for i in range(num_henchmen):
-        h_base_opts = filtered_options.get('henchmen', ["Random"])
         current_lock = locked_henchmen[i] if i < len(locked_henchmen) else None
-        
-        h_opts = [
-            opt for opt in h_base_opts 
-            if opt == "Random" or opt == current_lock or opt not in used_henchmen
-        ]
+        h_opts = selection.slot_options('henchmen', used_henchmen, keep=current_lock)
         
         key = f"h_{i}"
         slot_index = 0
@@ -2046,88 +1453,79 @@ def main():
         
         if h_pick != "Random": 
             user_selections['henchmen'].append(h_pick)
-            used_henchmen.add(h_pick)
+            used_henchmen.add(h_positions[h_pick])
 
     # Heroes
     st.sidebar.markdown(f"**Heroes ({num_heroes} Heroes)**")
     user_selections['heroes'] = []
+    hero_positions = selection.positions['heroes']
     used_heroes = set()
 
-    # Create a lookup for hero data to check teams/names efficiently
-    hero_lookup = {h['hero']: h for h in filtered_data['heroes']}
-
     for i in range(num_heroes):
-        hero_base_opts = filtered_options.get('heroes', ["Random"])
-        
         # Check for constraints on this slot
-        constraint = hero_constraints[i] if i < len(hero_constraints) else None
+        constraint = hero_slot_constraints[i] if i < len(hero_slot_constraints) else None
         
         label = f"Hero {i+1}"
-        filtered_opts = []
+        allowed = None  # No constraint -> All options
         
         if constraint:
             if constraint['type'] == 'team':
                 req_team = constraint['val'].lower()
                 label += f" ({req_team.title()} Required)"
-                # Filter: Include Random + Heroes with matching team
-                for opt in hero_base_opts:
-                    if opt == "Random":
-                        filtered_opts.append(opt)
-                        continue
-                    
-                    h_obj = hero_lookup.get(opt)
-                    if h_obj:
-                        # Helper to find team (using same logic as class)
-                        h_team = "Unknown"
-                        if h_obj.get('cards'): h_team = h_obj['cards'][0].get('team', 'Unknown')
-                        
-                        if req_team in h_team.lower():
-                            filtered_opts.append(opt)
+                # Heroes with matching team (team index)
+                allowed = selection.team_positions(req_team)
                             
             elif constraint['type'] == 'name':
-                req_name_frag = constraint['val'].lower()
                 label += f" (Name: '{constraint['val']}')"
-                # Filter: Include Random + Heroes matching name fragment
-                for opt in hero_base_opts:
-                    if opt == "Random":
-                        filtered_opts.append(opt)
-                        continue
-                    
-                    # Split fragment by " or " logic if present
-                    fragments = [f.strip() for f in req_name_frag.split(' or ')]
-                    if any(f in opt.lower() for f in fragments):
-                        filtered_opts.append(opt)
-        else:
-            # No constraint -> All options
-            filtered_opts = hero_base_opts
+                # Heroes matching the name fragment(s), split by " or "
+                allowed = selection.name_positions('heroes', constraint['val'])
 
-        # Final Filter: Remove used heroes (unless it's the constraint satisfied by Random)
-        final_opts = [
-            opt for opt in filtered_opts 
-            if opt == "Random" or opt not in used_heroes
-        ]
-        
-        # If filtering left us with nothing (e.g. no Avengers in selected sets), fallback
-        if not final_opts: final_opts = ["Random"]
+        # Remove used heroes; "Random" always stays (it may satisfy the constraint)
+        final_opts = selection.slot_options('heroes', used_heroes, allowed)
 
         hero_pick = st.sidebar.selectbox(label, final_opts, key=f"hero_{i}")
         
         if hero_pick != "Random": 
             user_selections['heroes'].append(hero_pick)
-            used_heroes.add(hero_pick)
+            used_heroes.add(hero_positions[hero_pick])
+
+    # --- SEED (NEW) ---
+    # Same seed + same options = same setup (shareable, served from the cache)
+    seed_text = st.sidebar.text_input("🌱 Seed (optional)", value="").strip()
+    seed = None
+    if seed_text:
+        if seed_text.isdigit():
+            seed = int(seed_text)
+        else:
+            st.sidebar.warning("Seed must be a whole number. Using a random one.")
+
+    # --- HERO DECK OPTIMIZER (NEW) ---
+    # Time budget for improving the greedy Hero Deck as a whole (see hero_optimizer.py)
+    optimize_ms = st.sidebar.slider("🧠 Hero Deck optimizer (ms)", min_value=0, max_value=500, value=0, step=25,
+                                    help="0 = off. Searches whole Hero Decks for better synergy within this time "
+                                         "(about 1 ms per step). How far the search gets depends on the machine, "
+                                         "so a seed gives the same deck again only while it is cached.")
+    if optimize_ms: user_selections['optimize_ms'] = optimize_ms
 
     # --- Main Area ---
     st.title("🦸 Legendary Setup Randomizer")
     
+    # Rerolls without a seed are served from this session's prefetch queue,
+    # which is dropped whenever the configuration above changes
+    prefetch = st.session_state.setdefault('prefetch', SetupPrefetcher())
+    prefetch.configure(selected_sets, players, user_selections)
+
     if st.button("🎲 Generate New Setup", type="primary", use_container_width=True):
-        run_randomizer(selected_sets, players, user_selections)
+        run_randomizer(selected_sets, players, user_selections, seed, prefetch if seed is None else None)
 
-def run_randomizer(selected_sets, players, user_selections):
+def run_randomizer(selected_sets, players, user_selections, seed=None, prefetch=None):
     with st.spinner('Consulting the Multiverse...'):
         try:
-            # Pass user_selections to the class
-            randomizer = LegendaryRandomizer(selected_sets, players, user_selections)
-            setup = randomizer.generate_setup()
+            # A prefetched setup if there is one; repeats of the same request +
+            # seed are served from the result cache
+            setup = prefetch.next() if prefetch else None
+            if setup is None:
+                setup = generate_cached_setup(selected_sets, players, user_selections, seed)
             
             if setup:
                 display_results(setup)
@@ -2137,7 +1535,12 @@ def run_randomizer(selected_sets, players, user_selections):
             st.error(f"An error occurred: {e}")
             st.code(traceback.format_exc())
 
+    # Generate the next rerolls while this one is being read
+    if prefetch: prefetch.fill()
+
 def display_results(setup):
+    st.caption(f"Seed: {setup['Seed']}")
+
     # --- 1. Mastermind & Scheme ---
     col1, col2 = st.columns(2)
     with col1:
@@ -2174,7 +1577,7 @@ def display_results(setup):
                 st.error(f"- {line}")
 
 # --- NEW DEBUG SECTION ---
-    if SHOW_SYNERGY_DEBUG and setup.get('synergy_logs'):
+    if SHOW_SYNERGY_DEBUG and (setup.get('synergy_logs') or setup.get('timings')):
         st.divider()
         with st.expander("🔍 Synergy Debug Report", expanded=False):
         
@@ -2208,6 +1611,15 @@ def display_results(setup):
                     st.caption("• Random Selection / Low Synergy")
                 st.divider()
 
+            # --- PHASE TIMINGS (NEW) ---
+            if setup.get('timings'):
+                st.markdown("### ⏱️ Phase Timings")
+                for span in setup['timings']:
+                    extra = f" ({span['score_evaluations']} score evaluations)" if 'score_evaluations' in span else ""
+                    if 'steps' in span:
+                        extra = f" ({span['steps']} steps, synergy {span['greedy_score']} -> {span['best_score']})"
+                    st.caption(f"- `{span['phase']}`: {span['ms']:.2f} ms{extra}")
+
     # --- 2. Villains & Henchmen ---
     col3, col4 = st.columns(2)
     with col3:
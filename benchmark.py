@@ -0,0 +1,175 @@
+"""Offline benchmark for LegendaryRandomizer.generate_setup.
+
+Times every phase of a setup for each player count (1-5) against fixed
+expansion mixes, using fixed seeds so runs are comparable:
+
+  load        - load_data (filtering the shared catalog for the mix)
+  scheme      - pick_scheme, including...
+  parse       - ...the parse_scheme_rules sections on their own
+  mastermind  - pick_mastermind
+  villains    - pick_villains_and_henchmen
+  heroes      - pick_heroes
+  format      - building the result dict
+  total       - the whole generate_setup call
+
+Phase times come from the spans generate_setup returns in result["timings"].
+
+The report is JSON: p50/p90/p99/mean/max in milliseconds per phase plus
+setups per second, per (mix, player count). Pass --baseline with an older
+report to fail (exit 1) when a p50 total got slower than --tolerance allows.
+
+Usage: python benchmark.py [--runs 200] [--mixes core mid all]
+                           [--out report.json] [--baseline old.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+import catalog
+import scheme_rules
+from app import LegendaryRandomizer
+
+MIXES = {
+    "core": ["Core Set"],
+    "mid": ["Core Set", "Dark City", "Fantastic Four", "Paint the Town Red",
+            "Guardians of the Galaxy", "Fear Itself", "Secret Wars, Volume 1",
+            "Civil War", "X-Men", "Villains"],
+    "all": None,  # every expansion in the catalog
+}
+PLAYER_COUNTS = (1, 2, 3, 4, 5)
+# First warmup seed; far above any timed seed (0..runs-1)
+WARMUP_SEEDS = 1_000_000_000
+# report phase -> span name in result["timings"] ("parse" sums the "parse: ..." spans)
+PHASES = {
+    "load": "load_data",
+    "scheme": "pick_scheme",
+    "parse": "parse:",
+    "mastermind": "pick_mastermind",
+    "villains": "pick_villains_and_henchmen",
+    "heroes": "pick_heroes",
+    "format": "format_result",
+}
+
+
+def _phase_times(timings):
+    times = {}
+    for phase, name in PHASES.items():
+        spans = [s['ms'] for s in timings if s['phase'] == name or (name.endswith(':') and s['phase'].startswith(name))]
+        if spans: times[phase] = sum(spans)
+    return times
+
+
+def _summary(samples):
+    if not samples: return None
+    values = np.asarray(samples)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": round(p50, 4), "p90": round(p90, 4), "p99": round(p99, 4),
+            "mean": round(values.mean(), 4), "max": round(values.max(), 4)}
+
+
+def run_case(user_sets, player_count, runs, warmup=5):
+    """Generates `runs` setups (seeds 0..runs-1) and returns per-phase stats."""
+    samples = {phase: [] for phase in PHASES}
+    samples["total"] = []
+    failed = 0
+
+    # Warmup runs use their own seeds, so the timed seeds start cold
+    for seed in range(WARMUP_SEEDS, WARMUP_SEEDS + warmup):
+        try:
+            LegendaryRandomizer(user_sets, player_count, seed=seed).generate_setup()
+        except Exception:
+            pass
+
+    for seed in range(runs):
+        randomizer = LegendaryRandomizer(user_sets, player_count, seed=seed)
+        start = time.perf_counter()
+        try:
+            result = randomizer.generate_setup()
+        except Exception:
+            result = None
+        elapsed = (time.perf_counter() - start) * 1000
+        if not result:
+            failed += 1
+            continue
+        samples["total"].append(elapsed)
+        for phase, ms in _phase_times(result['timings']).items():
+            samples[phase].append(ms)
+
+    total_s = sum(samples["total"]) / 1000
+    return {
+        "runs": runs,
+        "failed": failed,
+        "throughput_per_s": round(len(samples["total"]) / total_s, 2) if total_s else 0,
+        "phases": {phase: _summary(values) for phase, values in samples.items()},
+    }
+
+
+def run_benchmark(mixes=("core", "mid", "all"), runs=200, players=PLAYER_COUNTS):
+    # Cold costs: decoding the JSON files and reading the compiled Scheme rules
+    start = time.perf_counter()
+    catalog.load_catalog()
+    decode_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    scheme_rules.load_compiled_schemes()
+    rules_ms = (time.perf_counter() - start) * 1000
+
+    shared = catalog.get_catalog()
+    cases = []
+    for mix in mixes:
+        user_sets = MIXES[mix] or sorted(shared.all_sets)
+        for p in players:
+            case = {"mix": mix, "players": p}
+            case.update(run_case(user_sets, p, runs))
+            cases.append(case)
+            total = case["phases"]["total"] or {}
+            print(f"{mix:>5} / {p}p: p50 {total.get('p50', 0):8.3f} ms, "
+                  f"{case['throughput_per_s']:9.1f} setups/s", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "cold": {"decode_ms": round(decode_ms, 3), "compiled_rules_ms": round(rules_ms, 3)},
+        "cases": cases,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returns the cases whose p50 total is more than `tolerance` slower."""
+    old = {(c["mix"], c["players"]): c for c in baseline["cases"]}
+    regressions = []
+    for case in report["cases"]:
+        before = old.get((case["mix"], case["players"]))
+        if not before or not before["phases"]["total"] or not case["phases"]["total"]: continue
+        was, now = before["phases"]["total"]["p50"], case["phases"]["total"]["p50"]
+        if now > was * (1 + tolerance):
+            regressions.append(f"{case['mix']} / {case['players']}p: p50 {was:.3f} -> {now:.3f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Legendary randomizer")
+    parser.add_argument("--runs", type=int, default=200, help="timed setups per case")
+    parser.add_argument("--mixes", nargs="+", default=list(MIXES), choices=list(MIXES))
+    parser.add_argument("--players", type=int, nargs="+", default=list(PLAYER_COUNTS))
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.mixes, args.runs, args.players)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f: baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions: sys.exit(1)
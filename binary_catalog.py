@@ -0,0 +1,379 @@
+"""Compact binary form of the enriched JSON files.
+
+`python binary_catalog.py` converts the enriched_*.json files into
+BINARY_FILE. load() memory-maps it and hands out each category as
+LazyItems: an item is only decoded (and then kept) when it is first
+accessed, so e.g. Villain Groups outside the selected expansions are never
+built. A field such as "set", "hero" or the team of a Hero's first card
+can be read without decoding the rest of the item (LazyItems.column).
+
+Layout (little-endian):
+
+  header    MAGIC, FORMAT_VERSION
+  stamp     the (mtime_ns, size) of every source file
+  strings   every distinct string once (keys and values), with an offset
+            table; decoded on first use
+  items     per category an offset table plus one record per item
+
+A record is its field count followed by (key id, value length, value) per
+field. Values are tagged: None / bools / ints / floats / string ids /
+lists / dicts, plus "number strings" - a digit string such as the "3" of
+"cost": "3" is stored as a varint instead of a string id, only to keep the
+file small. It is handed back as the same string, so items decode exactly
+as json.load() builds them and stats are still parsed by model.parse_number.
+
+The file is only used while its stamp matches the JSON files; catalog.py
+falls back to the JSON files otherwise.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+
+BINARY_FILE = "catalog.bin"
+
+MAGIC = b"LGCAT\0\0\0"
+# Bump this whenever the layout below changes so old files are ignored
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sI")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_F64 = struct.Struct("<d")
+
+# Value tags
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_NUMSTR, T_LIST, T_DICT = range(9)
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80: return n, pos
+        shift += 7
+
+
+def _is_number_string(s):
+    # Only strings that survive int() -> str() unchanged ("3", not "03" or "3+")
+    return s.isdigit() and s.isascii() and str(int(s)) == s
+
+
+class _Writer:
+    def __init__(self):
+        self.strings = {}
+
+    def intern(self, s):
+        sid = self.strings.get(s)
+        if sid is None:
+            sid = self.strings[s] = len(self.strings)
+        return sid
+
+    def value(self, v, out):
+        if v is None:
+            out.append(T_NONE)
+        elif v is True:
+            out.append(T_TRUE)
+        elif v is False:
+            out.append(T_FALSE)
+        elif isinstance(v, int):
+            out.append(T_INT)
+            _varint(v << 1 if v >= 0 else (-v << 1) - 1, out)  # zigzag
+        elif isinstance(v, float):
+            out.append(T_FLOAT)
+            out += _F64.pack(v)
+        elif isinstance(v, str):
+            if _is_number_string(v):
+                out.append(T_NUMSTR)
+                _varint(int(v), out)
+            else:
+                out.append(T_STR)
+                _varint(self.intern(v), out)
+        elif isinstance(v, list):
+            out.append(T_LIST)
+            _varint(len(v), out)
+            for x in v: self.value(x, out)
+        elif isinstance(v, dict):
+            out.append(T_DICT)
+            _varint(len(v), out)
+            for k, x in v.items():
+                _varint(self.intern(k), out)
+                self.value(x, out)
+        else:
+            raise TypeError(f"Cannot encode {type(v).__name__}")
+
+    def record(self, item):
+        out = bytearray()
+        _varint(len(item), out)
+        for k, v in item.items():
+            encoded = bytearray()
+            self.value(v, encoded)
+            _varint(self.intern(k), out)
+            _varint(len(encoded), out)
+            out += encoded
+        return bytes(out)
+
+
+def build(data, stamp, target=BINARY_FILE):
+    """Writes {key: list of items} plus the source stamp to target."""
+    writer = _Writer()
+    keys = list(data)
+    key_ids = [writer.intern(k) for k in keys]
+    records = {key: [writer.record(item) for item in data[key]] for key in keys}
+
+    body = bytearray()
+    # --- stamp ---
+    _varint(len(stamp), body)
+    for entry in stamp:
+        mtime, size = entry if entry else (0, 0)
+        body += _U64.pack(mtime) + _U64.pack(size)
+
+    # --- strings ---
+    blobs = [s.encode('utf-8') for s in writer.strings]
+    _varint(len(blobs), body)
+    offset = 0
+    for blob in blobs:
+        body += _U32.pack(offset)
+        offset += len(blob)
+    body += _U32.pack(offset)
+    for blob in blobs: body += blob
+
+    # --- categories ---
+    _varint(len(keys), body)
+    for key, key_id in zip(keys, key_ids):
+        _varint(key_id, body)
+        _varint(len(records[key]), body)
+        offset = 0
+        for rec in records[key]:
+            body += _U32.pack(offset)
+            offset += len(rec)
+        body += _U32.pack(offset)
+        for rec in records[key]: body += rec
+
+    tmp = target + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+        f.write(body)
+    os.replace(tmp, target)
+
+
+class _Strings:
+    """The string table, decoded one string at a time."""
+
+    def __init__(self, buf, pos):
+        self.buf = buf
+        self.count, pos = _read_varint(buf, pos)
+        self.offsets = pos
+        self.base = pos + (self.count + 1) * 4
+        self.end = self.base + _U32.unpack_from(buf, pos + self.count * 4)[0]
+        self._cache = [None] * self.count
+
+    def __getitem__(self, sid):
+        s = self._cache[sid]
+        if s is None:
+            start, stop = struct.unpack_from("<II", self.buf, self.offsets + sid * 4)
+            s = self._cache[sid] = str(self.buf[self.base + start:self.base + stop], 'utf-8')
+        return s
+
+
+def _skip(buf, pos):
+    """Position after the value at pos, without decoding it."""
+    tag = buf[pos]
+    pos += 1
+    if tag in (T_STR, T_NUMSTR, T_INT):
+        return _read_varint(buf, pos)[1]
+    if tag == T_LIST:
+        n, pos = _read_varint(buf, pos)
+        for _ in range(n): pos = _skip(buf, pos)
+        return pos
+    if tag == T_DICT:
+        n, pos = _read_varint(buf, pos)
+        for _ in range(n):
+            pos = _skip(buf, _read_varint(buf, pos)[1])
+        return pos
+    if tag == T_FLOAT: return pos + 8
+    if tag in (T_NONE, T_TRUE, T_FALSE): return pos
+    raise ValueError(f"Bad value tag {tag} at {pos - 1}")
+
+
+def _lookup(buf, pos, path, strings):
+    """The value at `path` (dict keys / list indexes) inside the value at pos, None if absent."""
+    for step in path:
+        tag = buf[pos]
+        n, pos = _read_varint(buf, pos + 1) if tag in (T_LIST, T_DICT) else (0, pos)
+        if tag == T_LIST and isinstance(step, int) and 0 <= step < n:
+            for _ in range(step): pos = _skip(buf, pos)
+        elif tag == T_DICT and isinstance(step, str):
+            for _ in range(n):
+                kid, pos = _read_varint(buf, pos)
+                if strings[kid] == step: break
+                pos = _skip(buf, pos)
+            else:
+                return None
+        else:
+            return None
+    return _decode(buf, pos, strings)[0]
+
+
+def _decode(buf, pos, strings):
+    tag = buf[pos]
+    pos += 1
+    if tag == T_STR:
+        sid, pos = _read_varint(buf, pos)
+        return strings[sid], pos
+    if tag == T_NUMSTR:
+        n, pos = _read_varint(buf, pos)
+        return str(n), pos
+    if tag == T_LIST:
+        n, pos = _read_varint(buf, pos)
+        out = []
+        for _ in range(n):
+            v, pos = _decode(buf, pos, strings)
+            out.append(v)
+        return out, pos
+    if tag == T_DICT:
+        n, pos = _read_varint(buf, pos)
+        out = {}
+        for _ in range(n):
+            kid, pos = _read_varint(buf, pos)
+            out[strings[kid]], pos = _decode(buf, pos, strings)
+        return out, pos
+    if tag == T_NONE: return None, pos
+    if tag == T_TRUE: return True, pos
+    if tag == T_FALSE: return False, pos
+    if tag == T_INT:
+        n, pos = _read_varint(buf, pos)
+        return (n >> 1) ^ -(n & 1), pos
+    if tag == T_FLOAT:
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    raise ValueError(f"Bad value tag {tag} at {pos - 1}")
+
+
+class LazyItems:
+    """Read-only sequence of the items of one category.
+
+    Each item is decoded on first access and the same dict is returned
+    afterwards (the catalog keys per-item data by id(); `positions` maps the
+    id() of every item decoded so far to its position).
+    """
+
+    def __init__(self, buf, offsets, count, strings):
+        self.buf = buf
+        self.strings = strings
+        self.offsets = offsets
+        self.base = offsets + (count + 1) * 4
+        self.end = self.base + _U32.unpack_from(buf, offsets + count * 4)[0]
+        self._items = [None] * count
+        self.positions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _start(self, i):
+        return self.base + _U32.unpack_from(self.buf, self.offsets + i * 4)[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        item = self._items[i]
+        if item is None:
+            if i < 0: i += len(self)
+            # Threads share the items: decode each one exactly once
+            with self._lock:
+                item = self._items[i]
+                if item is None:
+                    buf, strings = self.buf, self.strings
+                    n, pos = _read_varint(buf, self._start(i))
+                    item = {}
+                    for _ in range(n):
+                        kid, pos = _read_varint(buf, pos)
+                        _, pos = _read_varint(buf, pos)
+                        item[strings[kid]], pos = _decode(buf, pos, strings)
+                    self._items[i] = item
+                    self.positions[id(item)] = i
+        return item
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, field, *path):
+        """`field` of every item (None if absent), without decoding the items.
+
+        path goes further into the value, e.g. column('cards', 0, 'team').
+        """
+        buf, strings = self.buf, self.strings
+        values = []
+        for i in range(len(self)):
+            n, pos = _read_varint(buf, self._start(i))
+            value = None
+            for _ in range(n):
+                kid, pos = _read_varint(buf, pos)
+                size, pos = _read_varint(buf, pos)
+                if strings[kid] == field:
+                    value = _lookup(buf, pos, path, strings)
+                    break
+                pos += size
+            values.append(value)
+        return values
+
+
+def load(stamp, path=BINARY_FILE):
+    """{key: LazyItems} if path holds a current catalog for stamp, else None."""
+    try:
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION: return None
+        pos = _HEADER.size
+
+        n, pos = _read_varint(buf, pos)
+        stored = []
+        for _ in range(n):
+            mtime, size = _U64.unpack_from(buf, pos)[0], _U64.unpack_from(buf, pos + 8)[0]
+            stored.append((mtime, size) if (mtime, size) != (0, 0) else None)
+            pos += 16
+        if tuple(stored) != tuple(stamp): return None
+
+        strings = _Strings(buf, pos)
+        pos = strings.end
+
+        data = {}
+        n, pos = _read_varint(buf, pos)
+        for _ in range(n):
+            kid, pos = _read_varint(buf, pos)
+            count, pos = _read_varint(buf, pos)
+            items = LazyItems(buf, pos, count, strings)
+            data[strings[kid]] = items
+            pos = items.end
+        return data
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    import catalog
+
+    stamp = catalog._file_stamp()
+    data = {}
+    for key, filename in catalog.DATA_FILES.items():
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                data[key] = json.load(f)
+    build(data, stamp)
+    total = sum(len(items) for items in data.values())
+    print(f"Wrote {total} items from {len(data)} files into {BINARY_FILE} ({os.path.getsize(BINARY_FILE)} bytes)")
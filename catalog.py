@@ -0,0 +1,775 @@
+"""Process-wide card catalog.
+
+The enriched JSON files are decoded once per process and shared by every
+Streamlit session and every LegendaryRandomizer. Because this is an imported
+module (not the Streamlit script itself) the cached catalog survives reruns.
+It is reloaded only when one of the files changes on disk.
+
+Treat everything handed out by the catalog as read-only: the same dicts are
+shared between all sessions.
+"""
+import collections
+import functools
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+import binary_catalog
+import feasibility
+import model
+import scheme_rules
+from setup_log import logger
+
+DATA_FILES = {
+    "heroes": "enriched_heroes.json",
+    "masterminds": "enriched_masterminds.json",
+    "villains": "enriched_villains.json",
+    "henchmen": "enriched_henchmen.json",
+    "schemes": "enriched_schemes.json"
+}
+
+
+def item_name(key, item):
+    """Display name of a catalog item (heroes and villain groups differ)."""
+    if key == "heroes": return item['hero']
+    if key == "villains": return item.get('group_name') or item.get('name')
+    return item.get('name') or item.get('group_name')
+
+
+def _column(items, field, *path):
+    """`field` of every item, path going further into it (e.g. 'cards', 0, 'team');
+    None if absent. LazyItems read it without decoding the items."""
+    if isinstance(items, binary_catalog.LazyItems): return items.column(field, *path)
+    values = []
+    for item in items:
+        value = item.get(field)
+        for step in path:
+            try:
+                value = value[step]
+            except (KeyError, IndexError, TypeError):
+                value = None
+        values.append(value)
+    return values
+
+
+def _names(key, items):
+    """item_name() of every item, read column-wise."""
+    if key == "heroes": return _column(items, 'hero')
+    name, group = _column(items, 'name'), _column(items, 'group_name')
+    if key == "villains": return [g or n for n, g in zip(name, group)]
+    return [n or g for n, g in zip(name, group)]
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """Case-insensitive lookups over a fixed list of names.
+
+    All queries return positions into the original list in ascending order,
+    so "first match" keeps meaning the same thing as a linear scan.
+    Substring queries are narrowed with a trigram index and then verified.
+    """
+
+    def __init__(self, names):
+        self.raw = tuple(names)
+        self.lower = tuple((n or '').lower() for n in self.raw)
+
+        self.exact = {}     # lowercased name -> [positions]
+        self.trigrams = {}  # trigram -> {positions of names containing it}
+        self.anchors = {}   # first trigram -> [positions], for contained_in()
+        self.short = []     # names too short to have a trigram
+        for pos, name in enumerate(self.lower):
+            self.exact.setdefault(name, []).append(pos)
+            for tri in _trigrams(name):
+                self.trigrams.setdefault(tri, set()).add(pos)
+            if len(name) >= 3:
+                self.anchors.setdefault(name[:3], []).append(pos)
+            else:
+                self.short.append(pos)
+
+    def equal(self, name):
+        """Positions whose name equals `name` (ignoring case)."""
+        return self.exact.get(name.lower(), [])
+
+    def containing(self, fragment):
+        """Positions whose name contains `fragment` (ignoring case)."""
+        frag = fragment.lower()
+        if len(frag) < 3:
+            return [pos for pos, name in enumerate(self.lower) if frag in name]
+
+        postings = []
+        for tri in _trigrams(frag):
+            found = self.trigrams.get(tri)
+            if not found: return []
+            postings.append(found)
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return sorted(pos for pos in candidates if frag in self.lower[pos])
+
+    def contained_in(self, text):
+        """Positions whose name is a substring of `text` (ignoring case)."""
+        text = text.lower()
+        candidates = set(self.short)
+        for tri in _trigrams(text):
+            candidates.update(self.anchors.get(tri, ()))
+        return sorted(pos for pos in candidates if self.lower[pos] in text)
+
+    def word_match(self, query):
+        """Typo-tolerant match: 75% of the query's words (3+ letters) appear in the name.
+
+        e.g. "Intergalactic Part Animals" still finds "Intergalactic Party Animals".
+        """
+        q_words = [w for w in re.findall(r'\w+', query.lower()) if len(w) > 2]
+        if not q_words: return []
+        hits = {}
+        for qw in q_words:
+            for pos in self.containing(qw):
+                hits[pos] = hits.get(pos, 0) + 1
+        return sorted(pos for pos, n in hits.items() if n >= len(q_words) * 0.75)
+
+
+_ABILITY_TOKEN = re.compile(r"[\w'-]+")
+
+
+def ability_tokens(text):
+    """Normalized tokens of ability text: lowercase words, "Size-Changing" stays one token."""
+    return _ABILITY_TOKEN.findall(text.lower())
+
+
+class AbilityIndex:
+    """Inverted index from ability tokens to the cards of one category.
+
+    Built from the models of Heroes / Villain Groups: every token of a card's
+    abilities points to (item position, card index). A keyword or phrase
+    ("Ambush", "Size-Changing", "Rise of the Living Dead") matches whole
+    tokens, ignoring case and punctuation; a phrase intersects the postings
+    of its tokens and is then checked to be contiguous in one ability.
+    """
+
+    def __init__(self, models):
+        self.cards = {}  # token -> {(item position, card index)}
+        self.texts = {}  # (item position, card index) -> " token token " per ability
+        for pos, item in enumerate(models):
+            for ci, card in enumerate(item.cards):
+                texts = []
+                for ability in card.abilities:
+                    tokens = ability_tokens(ability)
+                    for tok in tokens:
+                        self.cards.setdefault(tok, set()).add((pos, ci))
+                    texts.append(f" {' '.join(tokens)} ")
+                self.texts[(pos, ci)] = tuple(texts)
+        self._queries = {}  # phrase -> matching cards, memoized
+
+    def cards_with(self, phrase):
+        """Sorted (item position, card index) of the cards with the phrase."""
+        found = self._queries.get(phrase)
+        if found is not None: return found
+        tokens = ability_tokens(phrase)
+        postings = [self.cards.get(tok, ()) for tok in tokens]
+        if not tokens or not all(postings):
+            found = ()
+        else:
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            if len(tokens) > 1:
+                needle = f" {' '.join(tokens)} "
+                candidates = {c for c in candidates if any(needle in text for text in self.texts[c])}
+            found = tuple(sorted(candidates))
+        self._queries[phrase] = found
+        return found
+
+    def containing(self, phrase):
+        """Sorted positions of the items with a card that has the phrase."""
+        return sorted({pos for pos, _ in self.cards_with(phrase)})
+
+
+STANDARD_CLASSES = ("strength", "instinct", "covert", "tech", "ranged")
+
+
+class HeroFeatures:
+    """Everything score_hero needs about one Hero, computed once at load."""
+
+    __slots__ = ("costs", "avg_cost", "classes", "needs", "team", "team_key",
+                 "team_trigger", "wound", "rescue", "artifact", "ko", "graveyard")
+
+    def __init__(self, hero):
+        # hero is a model.Hero. Same text blob the scorer used to build:
+        # every card's abilities, lowercased
+        blob = "".join(" ".join(c.abilities).lower() + " " for c in hero.cards)
+
+        self.costs = tuple(c.cost for c in hero.cards if c.cost is not None)
+        self.avg_cost = sum(self.costs) / len(self.costs) if self.costs else 0
+        self.classes = frozenset(cls for c in hero.cards for cls in c.classes)
+        # Classes this Hero's cards are triggered by, e.g. "[tech]"
+        self.needs = frozenset(cls for cls in STANDARD_CLASSES if f"[{cls}]" in blob)
+
+        self.team = hero.team
+        # "guardians-of-the-galaxy" -> "guardiansofthegalaxy" (matches the Team_ tags)
+        self.team_key = hero.team_key
+        self.team_trigger = self.team != 'Unknown' and f"[{self.team.lower()}]" in blob
+
+        # Mechanic keywords
+        self.wound = "wound" in blob or "heal" in blob
+        self.rescue = "bystander" in blob or "rescue" in blob
+        self.artifact = "artifact" in blob
+        self.ko = "ko " in blob
+        self.graveyard = "ko pile" in blob or "discard pile" in blob
+
+
+class HeroMatrix:
+    """HeroFeatures as NumPy columns (one row per catalog Hero) for batch scoring.
+
+    score() applies the same terms as pick_heroes.score_hero, minus the
+    random noise, to many Heroes at once. Rows are filled on first use (see
+    Catalog.hero_rows), so a Hero is only decoded once it is scored; class
+    bits and team ids are handed out as the rows come in.
+    """
+
+    def __init__(self, size):
+        self.class_bits = {cls: 1 << i for i, cls in enumerate(STANDARD_CLASSES)}
+        self.team_ids = {}
+        self.team_key_ids = {}
+
+        self.filled = np.zeros(size, dtype=bool)
+        self.avg_cost = np.zeros(size, dtype=float)
+        self.classes = np.zeros(size, dtype=np.int64)
+        self.needs = np.zeros(size, dtype=np.int64)
+        self.team = np.zeros(size, dtype=np.int64)
+        self.team_key = np.zeros(size, dtype=np.int64)
+        self.known_team = np.zeros(size, dtype=bool)
+        self.team_trigger = np.zeros(size, dtype=bool)
+        self.flags = {
+            flag: np.zeros(size, dtype=bool)
+            for flag in ("wound", "rescue", "artifact", "ko", "graveyard")
+        }
+
+    def fill(self, row, f):
+        """Sets one row from the Hero's HeroFeatures."""
+        for cls in sorted(f.classes):
+            self.class_bits.setdefault(cls, 1 << len(self.class_bits))
+        self.avg_cost[row] = f.avg_cost
+        self.classes[row] = self.class_mask(f.classes)
+        self.needs[row] = self.class_mask(f.needs)
+        self.team[row] = self.team_ids.setdefault(f.team.lower(), len(self.team_ids))
+        self.team_key[row] = self.team_key_ids.setdefault(f.team_key, len(self.team_key_ids))
+        self.known_team[row] = f.team != 'Unknown'
+        self.team_trigger[row] = f.team_trigger
+        for flag, column in self.flags.items():
+            column[row] = getattr(f, flag)
+        self.filled[row] = True
+
+    def class_mask(self, classes):
+        mask = 0
+        for cls in classes:
+            mask |= self.class_bits.get(cls, 0)
+        return mask
+
+    def score(self, rows, deck, mechanics, class_needs, team_needs):
+        """Synergy score of every row against the current deck.
+
+        deck is the pick_heroes DeckState, mechanics a {flag: points} dict of
+        the active mechanic bonuses, class_needs / team_needs the Class_ and
+        Team_ triggers of the Mastermind and Villains.
+        """
+        score = np.zeros(len(rows))
+
+        # A. MECHANIC SYNERGY
+        for flag, points in mechanics.items():
+            score += self.flags[flag][rows] * points
+
+        # B. CURVE BALANCING
+        cand_avg = self.avg_cost[rows]
+        if not deck.cost_count:
+            score += 2 * ((cand_avg >= 3.5) & (cand_avg <= 4.5))
+        elif deck.avg_cost > 4.2:
+            score += 4 * (cand_avg < 3.5) - 2 * (cand_avg > 4.5)
+        elif deck.avg_cost < 3.0:
+            score += 3 * (cand_avg > 4.0)
+        else:
+            score += 1 * ((cand_avg >= 3.0) & (cand_avg <= 4.0))
+
+        # ENEMY COUNTERS
+        classes = self.classes[rows]
+        known = self.known_team[rows]
+        score += 3 * ((classes & self.class_mask(class_needs)) != 0)
+        team_need_ids = [self.team_key_ids[t] for t in team_needs if t in self.team_key_ids]
+        score += 3 * (np.isin(self.team_key[rows], team_need_ids) & known)
+
+        # C. CONDITIONAL TEAM SYNERGY
+        deck_team_ids = [self.team_ids[t] for t in deck.teams if t in self.team_ids]
+        in_deck = np.isin(self.team[rows], deck_team_ids) & known
+        score += np.where(self.team_trigger[rows], 4, 0.5) * in_deck
+
+        # D. CLASS SYNERGY (SMART BIDIRECTIONAL)
+        deck_classes = self.class_mask(deck.classes)
+        triggers_deck = (classes & self.class_mask(deck.needs)) != 0
+        triggered_by_deck = (self.needs[rows] & deck_classes) != 0
+        score += 3 * triggers_deck + 3 * triggered_by_deck
+        score += 1 * (~triggers_deck & ~triggered_by_deck & ((classes & deck_classes) != 0))
+        return score
+
+
+@functools.lru_cache(maxsize=32)
+def label_index(labels):
+    """NameIndex over a tuple of UI option labels, reused across reruns."""
+    return NameIndex(labels)
+
+
+# Expansion selections whose sidebar options each catalog keeps
+SELECTION_CACHE_SIZE = 32
+
+
+class Catalog:
+    """Immutable snapshot of all enriched data files."""
+
+    def __init__(self, data, missing, stamp):
+        # {key: tuple of item dicts}, or binary_catalog.LazyItems that decode
+        # an item on first access
+        self.data = {
+            key: items if isinstance(items, binary_catalog.LazyItems) else tuple(items)
+            for key, items in data.items()
+        }
+        # Keys whose file could not be found
+        self.missing = tuple(missing)
+        self.stamp = stamp
+
+        item_sets = {key: _column(items, 'set') for key, items in self.data.items()}
+        all_sets = set()
+        for sets in item_sets.values():
+            for item_set in sets:
+                if item_set:
+                    for s in item_set.split('/'):
+                        all_sets.add(s.strip())
+        self.all_sets = tuple(sorted(all_sets))
+
+        # --- EXPANSION INDEX ---
+        # Every expansion gets one bit; every item carries the OR of the bits
+        # of its (possibly "A/B") set string, in the same order as self.data.
+        self.set_bits = {}
+        for s in self.all_sets:
+            self.set_bits.setdefault(s.lower(), 1 << len(self.set_bits))
+        self.set_masks = {
+            key: tuple(self._set_mask(item_set) for item_set in sets)
+            for key, sets in item_sets.items()
+        }
+
+        # --- NAME INDEX ---
+        self.names = {key: NameIndex(_names(key, items)) for key, items in self.data.items()}
+
+        # --- ITEM POSITIONS ---
+        # {key: {id(item): position}}. LazyItems add an item once it is decoded,
+        # so nothing below decodes items up front: every per-item structure
+        # is built on first use and LazyItems stay lazy.
+        self._positions = {
+            key: items.positions if isinstance(items, binary_catalog.LazyItems)
+            else {id(item): pos for pos, item in enumerate(items)}
+            for key, items in self.data.items()
+        }
+
+        # --- ITEM MODELS ---
+        # Keyed by id() since the item dicts are shared and never copied.
+        # Built on first use (see model()).
+        self._models = {}
+        self._models_lock = threading.Lock()
+
+        # --- HERO FEATURES ---
+        # Built per Hero on first use (see hero_features()); the HeroMatrix
+        # row of a Hero is filled when it is first scored (see hero_rows())
+        self._hero_features = {}
+        self._features_lock = threading.Lock()
+        self.hero_matrix = HeroMatrix(len(self.data.get('heroes', ())))
+        self._matrix_lock = threading.Lock()
+        # --- ABILITY INDEX ---
+        # Categories with cards; built on first query (see abilities()) so a
+        # lazily loaded category is only decoded when a rule needs its text
+        self._abilities = {}
+        self._abilities_lock = threading.Lock()
+
+        # Team (as in the data, see model.Hero) -> Hero positions, read from
+        # every Hero's first card
+        self.hero_teams = {}
+        for pos, team in enumerate(_column(self.data.get('heroes', ()), 'cards', 0, 'team')):
+            self.hero_teams.setdefault(team or 'Unknown', []).append(pos)
+
+        # --- SCHEME REQUIREMENTS ---
+        # Slot counts / locked picks of a Scheme for every player count, for
+        # the sidebar; computed per Scheme on first use (see requirements())
+        self._requirements = {}
+        self._requirements_lock = threading.Lock()
+        # Feasibility checks per (id(item), player count), compiled on first use (see checks())
+        self._checks = {}
+        self._checks_lock = threading.Lock()
+
+        # Sidebar option lists per expansion selection (see selection())
+        self._selections = ResultCache(maxsize=SELECTION_CACHE_SIZE)
+
+    def hero_features(self, hero):
+        """The HeroFeatures of a Hero (built once per catalog Hero)."""
+        features = self._hero_features.get(id(hero))
+        if features is not None: return features
+        if id(hero) not in self._positions.get('heroes', {}):
+            # Not a catalog Hero (e.g. built by hand) - compute on the fly
+            return HeroFeatures(self.model(hero))
+        with self._features_lock:
+            features = self._hero_features.get(id(hero))
+            if features is None:
+                features = self._hero_features[id(hero)] = HeroFeatures(self.model(hero))
+        return features
+
+    def _key_of(self, item):
+        """Category of a catalog item, None for any other dict."""
+        for key, positions in self._positions.items():
+            if id(item) in positions: return key
+        return None
+
+    def model(self, item):
+        """The model.Item of an item dict (built once per catalog item)."""
+        found = self._models.get(id(item))
+        if found is not None: return found
+        key = self._key_of(item)
+        if key is None:
+            # Not a catalog item (e.g. built by hand) - build on the fly
+            return model.MODELS[model.guess_key(item)](item)
+        # Prefetch threads share the catalog: build each model exactly once
+        with self._models_lock:
+            found = self._models.get(id(item))
+            if found is None:
+                found = self._models[id(item)] = model.MODELS[key](item)
+        return found
+
+    def abilities(self, key):
+        """The AbilityIndex of 'heroes' or 'villains'."""
+        index = self._abilities.get(key)
+        if index is None:
+            with self._abilities_lock:
+                index = self._abilities.get(key)
+                if index is None:
+                    index = self._abilities[key] = AbilityIndex([self.model(item) for item in self.items(key)])
+        return index
+
+    def hero_rows(self, heroes):
+        """HeroMatrix rows of catalog Heroes, in the given order (filled on first use)."""
+        positions = self._positions['heroes']
+        rows = np.array([positions[id(h)] for h in heroes], dtype=np.int64)
+        matrix = self.hero_matrix
+        if not matrix.filled[rows].all():
+            with self._matrix_lock:
+                for row, hero in zip(rows, heroes):
+                    if not matrix.filled[row]: matrix.fill(row, self.hero_features(hero))
+        return rows
+
+    def _set_mask(self, item_set_str):
+        mask = 0
+        if item_set_str:
+            for s in item_set_str.split('/'):
+                mask |= self.set_bits.get(s.strip().lower(), 0)
+        return mask
+
+    def items(self, key):
+        return self.data.get(key, ())
+
+    def select(self, key, positions, mask):
+        """Items at `positions` that belong to the expansions in mask."""
+        items = self.data[key]
+        masks = self.set_masks[key]
+        return [items[pos] for pos in positions if masks[pos] & mask]
+
+    def first(self, key, positions, mask):
+        """First item at `positions` inside the selection, or None."""
+        items = self.data[key]
+        masks = self.set_masks[key]
+        for pos in positions:
+            if masks[pos] & mask: return items[pos]
+        return None
+
+    def find_fuzzy(self, key, name_fragment, mask):
+        """Substring match, falling back to a word-based match (fixes "Part" vs "Party" typos)."""
+        index = self.names[key]
+        positions = set(index.containing(name_fragment))
+        positions.update(index.word_match(name_fragment))
+        return self.first(key, sorted(positions), mask)
+
+    def find_hero(self, name_fragment, mask):
+        """Hero named exactly name_fragment, else the first one containing it."""
+        index = self.names['heroes']
+        found = self.first('heroes', index.equal(name_fragment), mask)
+        if found: return found
+        return self.first('heroes', index.containing(name_fragment), mask)
+
+    def resolve_include(self, name_fragment, mask):
+        """Resolves an "Always include ..." fragment to (key, item) or (None, None).
+
+        Henchmen are tried first, then Villain Groups, then Heroes.
+        """
+        for key in ('henchmen', 'villains'):
+            found = self.find_fuzzy(key, name_fragment, mask)
+            if found: return key, found
+        found = self.find_hero(name_fragment, mask) or self.find_fuzzy('heroes', name_fragment, mask)
+        if found: return 'heroes', found
+        return None, None
+
+    def requirements(self, scheme, player_count):
+        """scheme_rules.scheme_requirements() of a Scheme, computed for every
+        player count the first time a catalog Scheme is asked for."""
+        if id(scheme) not in self._positions.get('schemes', {}):
+            # Not a catalog Scheme - compute on the fly
+            return scheme_rules.scheme_requirements(scheme_rules.get_scheme_record(scheme), player_count)
+        table = self._requirements.get(id(scheme))
+        if table is None:
+            with self._requirements_lock:
+                table = self._requirements.get(id(scheme))
+                if table is None:
+                    table = self._requirements[id(scheme)] = scheme_rules.requirements_table(
+                        scheme_rules.get_scheme_record(scheme))
+        return table[player_count]
+
+    def checks(self, key, item, player_count):
+        """The feasibility checks of a Scheme (per player count) or Mastermind."""
+        cache_key = (id(item), player_count if key == 'schemes' else None)
+        found = self._checks.get(cache_key)
+        if found is None:
+            with self._checks_lock:
+                found = self._checks.get(cache_key)
+                if found is None:
+                    if key == 'schemes':
+                        found = feasibility.scheme_checks(self, item, player_count)
+                    else:
+                        found = feasibility.mastermind_checks(self, item)
+                    self._checks[cache_key] = found
+        return found
+
+    def problems(self, key, item, player_count, mask):
+        """Labels of the checks of an item the expansions in mask fail."""
+        return self.selection(mask).problems(key, player_count).get(id(item), [])
+
+    def selection_mask(self, set_names):
+        """Bitmask for a list of expansion names (case-insensitive)."""
+        mask = 0
+        for s in set_names:
+            mask |= self.set_bits.get(s.strip().lower(), 0)
+        return mask
+
+    def filter(self, key, mask):
+        """Items of one category that belong to any expansion in mask."""
+        items = self.data.get(key, ())
+        # Indexed, so lazily loaded items outside the selection stay undecoded
+        return [items[pos] for pos, m in enumerate(self.set_masks.get(key, ())) if m & mask]
+
+    def selection(self, mask):
+        """The items and sidebar option labels of an expansion selection.
+
+        Memoized by mask, so reruns that only touch a dropdown reuse them.
+        """
+        view = self._selections.get(mask)
+        if view is None:
+            view = Selection(self, mask)
+            self._selections.put(mask, view)
+        return view
+
+
+class Selection:
+    """Read-only view of the catalog for one expansion selection.
+
+    data:    {key: tuple of items in the selection}
+    options: {key: ("Random", *sorted labels)}, where a name that occurs in
+             more than one selected set is shown as "Name (Set)"
+
+    Sidebar slots are filtered by option position (see slot_options), using
+    a team index over the Hero options and label_index() for name fragments.
+    """
+
+    def __init__(self, catalog, mask):
+        self.catalog = catalog
+        self.mask = mask
+        self.data = {}
+        self.options = {}
+        self.positions = {}  # {key: {label: position in options}}
+        self.labeled = {}    # {key: {label: item}}, first item per label
+        for key in catalog.data:
+            items = tuple(catalog.filter(key, mask))
+            self.data[key] = items
+
+            names = [item_name(key, item) for item in items]
+            name_counts = collections.Counter(names)
+            labeled = {}
+            for n, item in zip(names, items):
+                label = f"{n} ({item.get('set', 'Unknown')})" if name_counts[n] > 1 else n
+                labeled.setdefault(label, item)
+            self.options[key] = ("Random",) + tuple(sorted(labeled))
+            self.positions[key] = {label: pos for pos, label in enumerate(self.options[key])}
+            self.labeled[key] = labeled
+
+        # --- HERO TEAM INDEX ---
+        # Lowercased team -> positions of the Hero options on it
+        self.hero_teams = {}
+        for label, hero in self.labeled.get('heroes', {}).items():
+            team = catalog.hero_features(hero).team.lower()
+            self.hero_teams.setdefault(team, []).append(self.positions['heroes'][label])
+
+        self._problems = {}  # {(key, player count): {id(item): labels}}
+        self._problems_lock = threading.Lock()
+
+    def team_positions(self, team_fragment):
+        """Hero option positions whose team contains the fragment (e.g. "x-men")."""
+        frag = team_fragment.lower()
+        found = set()
+        for team, positions in self.hero_teams.items():
+            if frag in team: found.update(positions)
+        return found
+
+    def name_positions(self, key, name_fragment):
+        """Option positions whose label contains any " or "-separated fragment."""
+        index = label_index(self.options[key])
+        found = set()
+        for frag in name_fragment.lower().split(' or '):
+            found.update(index.containing(frag.strip()))
+        found.discard(0)  # "Random"
+        return found
+
+    def problems(self, key, player_count):
+        """{id(item): labels of failed checks} of the selected Schemes or
+        Masterminds that can't be fully set up (see feasibility.py)."""
+        found = self._problems.get((key, player_count))
+        if found is None:
+            with self._problems_lock:
+                found = self._problems.get((key, player_count))
+                if found is None:
+                    found = {}
+                    for item in self.data.get(key, ()):
+                        checks = self.catalog.checks(key, item, player_count)
+                        failed = [c.label for c in checks if not c.met(self.catalog, self)]
+                        if failed: found[id(item)] = failed
+                    self._problems[(key, player_count)] = found
+        return found
+
+    def unavailable(self, key, player_count):
+        """{option label: labels of failed checks}, for the sidebar."""
+        problems = self.problems(key, player_count)
+        return {label: problems[id(item)] for label, item in self.labeled.get(key, {}).items() if id(item) in problems}
+
+    def slot_options(self, key, used, allowed=None, keep=None):
+        """Options of one sidebar slot: "Random" plus the allowed positions
+        (default: all) that are not in `used`, except `keep`."""
+        options = self.options[key]
+        keep_pos = self.positions[key].get(keep)
+        if allowed is None:
+            allowed = range(1, len(options))
+        else:
+            allowed = sorted(allowed)
+        return ["Random"] + [options[pos] for pos in allowed if pos not in used or pos == keep_pos]
+
+
+def _file_stamp():
+    stamp = []
+    for filename in DATA_FILES.values():
+        try:
+            info = os.stat(filename)
+            stamp.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _read_json(files):
+    """{key: list of items} of the JSON data files."""
+    data = {}
+    for key, filename in files.items():
+        with open(filename, 'r', encoding='utf-8') as f:
+            data[key] = json.load(f)
+    return data
+
+
+def load_catalog(sets=None):
+    """Reads all data files from disk. Prefer get_catalog().
+
+    Uses the memory-mapped binary_catalog.BINARY_FILE while it is current
+    (see `python binary_catalog.py`), the JSON files otherwise.
+
+    With sets, only the items of those expansions are kept, read straight
+    from the JSON files (e.g. while editing them). Such a catalog only knows
+    those expansions and is not the shared one.
+    """
+    stamp = _file_stamp()
+    missing = [key for key, filename in DATA_FILES.items() if not os.path.exists(filename)]
+    present = {key: filename for key, filename in DATA_FILES.items() if key not in missing}
+
+    if sets is not None:
+        # The C decoder reads all five files in less time than scanning the
+        # text for each item's "set" in Python took, so decode, then filter
+        wanted = {s.strip().lower() for s in sets}
+        data = {
+            key: [item for item in items if any(s.lower() in wanted for s in model.split_sets(item.get('set')))]
+            for key, items in _read_json(present).items()
+        }
+        return Catalog(data, missing, stamp)
+
+    data = binary_catalog.load(stamp)
+    if data is not None:
+        logger.debug("Loaded catalog from %s", binary_catalog.BINARY_FILE)
+        return Catalog(data, missing, stamp)
+
+    return Catalog(_read_json(present), missing, stamp)
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the shared catalog, reloading it if any data file changed."""
+    global _catalog
+    stamp = _file_stamp()
+    catalog = _catalog
+    if catalog is not None and catalog.stamp == stamp:
+        return catalog
+
+    with _lock:
+        # Another session may have reloaded while we waited
+        if _catalog is None or _catalog.stamp != _file_stamp():
+            _catalog = load_catalog()
+        return _catalog
+
+
+# --- GENERATED SETUP CACHE (NEW) ---
+class ResultCache:
+    """Small thread-safe LRU shared by all sessions. Cached setups are read-only."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None: self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def setup_key(user_sets, player_count, user_selections, seed):
+    """Cache key of a generate request. "Random" / empty picks are dropped, so
+    equivalent requests share an entry. The data stamp keeps reloads apart."""
+    picks = []
+    for key, value in sorted((user_selections or {}).items()):
+        if isinstance(value, list): value = tuple(value)
+        if value and value != "Random": picks.append((key, value))
+    sets = frozenset(s.lower().strip() for s in user_sets)
+    return (get_catalog().stamp, sets, player_count, tuple(picks), seed)
+
+
+setup_cache = ResultCache()
@@ -0,0 +1,166 @@
+"""Can a Scheme or Mastermind be set up with the selected expansions?
+
+The checks of an item are compiled once per catalog (Catalog.checks) into
+catalog positions: "at least N of these Villain Groups / Heroes". Checking a
+selection is then only counting positions whose expansion bits hit the
+selection mask, and Selection.problems() keeps the answers for every
+Scheme / Mastermind option, so the sidebar can flag them on each rerun.
+
+A check failing means the randomizer would come up short: a missing group,
+too few matching Heroes, "Not enough groups with '<keyword>'", ...
+"""
+import scheme_rules
+
+
+class CountCheck:
+    """At least `count` of the items at `positions` ({key: positions}) are selected."""
+
+    __slots__ = ("label", "positions", "count")
+
+    def __init__(self, label, positions, count=1):
+        self.label = label
+        self.positions = {key: tuple(sorted(p)) for key, p in positions.items()}
+        self.count = count
+
+    def met(self, catalog, selection):
+        found = 0
+        for key, positions in self.positions.items():
+            masks = catalog.set_masks[key]
+            for pos in positions:
+                if masks[pos] & selection.mask:
+                    found += 1
+                    if found >= self.count: return True
+        return found >= self.count
+
+
+class SizeCheck:
+    """At least `count` items of a category are selected (e.g. enough Heroes to fill the Hero Deck)."""
+
+    __slots__ = ("label", "key", "count")
+
+    def __init__(self, label, key, count):
+        self.label = label
+        self.key = key
+        self.count = count
+
+    def met(self, catalog, selection):
+        return len(selection.data.get(self.key, ())) >= self.count
+
+
+class VersusCheck:
+    """Two different teams with count_a and count_b selected Heroes."""
+
+    __slots__ = ("label", "teams", "count_a", "count_b")
+
+    def __init__(self, label, teams, count_a, count_b):
+        self.label = label
+        self.teams = [tuple(p) for team, p in teams.items() if team != 'Unknown']  # Hero positions per team
+        self.count_a = count_a
+        self.count_b = count_b
+
+    def met(self, catalog, selection):
+        masks = catalog.set_masks['heroes']
+        sizes = sorted((sum(1 for pos in p if masks[pos] & selection.mask) for p in self.teams), reverse=True)
+        if len(sizes) < 2: return False
+        return sizes[0] >= max(self.count_a, self.count_b) and sizes[1] >= min(self.count_a, self.count_b)
+
+
+def group_positions(catalog, key, name):
+    """Positions _find_group_by_name can return: the exact name, else the singular contained."""
+    index = catalog.names[key]
+    return set(index.equal(name)) | set(index.containing(name.rstrip('s')))
+
+
+def fuzzy_positions(catalog, key, fragment):
+    """Positions Catalog.find_fuzzy can return."""
+    index = catalog.names[key]
+    return set(index.containing(fragment)) | set(index.word_match(fragment))
+
+
+def hero_name_positions(catalog, name):
+    """Heroes whose name contains one of the " or "-separated terms."""
+    index = catalog.names['heroes']
+    return {pos for term in name.lower().split(' or ') for pos in index.containing(term.strip())}
+
+
+def _count(count, singular, plural):
+    return f"{count} {singular if count == 1 else plural}"
+
+
+def _matchable(checks):
+    """Drops name checks no expansion could meet: the rules text was not a
+    card name (e.g. "its “Always Leads“ Villains"), so nothing to warn about."""
+    return [c for c in checks if not isinstance(c, CountCheck) or any(c.positions.values())]
+
+
+def scheme_checks(catalog, scheme, player_count):
+    """The checks of one Scheme at one player count."""
+    record = scheme_rules.get_scheme_record(scheme)
+    reqs = catalog.requirements(scheme, player_count)
+    checks = []
+
+    for step in record['steps']:
+        op = step['op']
+        if op == 'add' and step['field'] == 'required_villains':
+            checks.append(CountCheck(f"Villain Group '{step['value']}'",
+                                     {'villains': group_positions(catalog, 'villains', step['value'])}))
+        elif op == 'add' and step['field'] == 'required_henchmen':
+            checks.append(CountCheck(f"Henchman Group '{step['value']}'",
+                                     {'henchmen': group_positions(catalog, 'henchmen', step['value'])}))
+        elif op == 'add' and step['field'] == 'required_hero_deck_includes':
+            req = step['value']
+            checks.append(CountCheck(f"{_count(req['count'], 'Hero', 'Heroes')} with '{req['name']}'",
+                                     {'heroes': hero_name_positions(catalog, req['name'])}, req['count']))
+        elif op == 'include':
+            checks.append(CountCheck(f"'{step['name']}'", {
+                key: fuzzy_positions(catalog, key, step['name']) for key in ('henchmen', 'villains', 'heroes')
+            }))
+        elif op == 'keyword_villains':
+            checks.append(CountCheck(f"{_count(step['count'], 'Villain Group', 'Villain Groups')} with '{step['keyword']}'",
+                                     {'villains': catalog.abilities('villains').containing(step['keyword'])},
+                                     step['count']))
+        elif op == 'either_villain':
+            positions = set()
+            for choice in step['choices']:
+                positions |= group_positions(catalog, 'villains', choice.strip())
+            checks.append(CountCheck(f"Villain Group '{' or '.join(step['choices'])}'", {'villains': positions}))
+        elif op == 'infected_deck':
+            checks.append(CountCheck(f"Henchman Group '{step['henchmen']}'",
+                                     {'henchmen': group_positions(catalog, 'henchmen', step['henchmen'])}))
+        elif op == 'monster_pit':
+            checks.append(CountCheck(f"Villain Group '{step['group']}'",
+                                     {'villains': group_positions(catalog, 'villains', step['group'])}))
+        elif op == 'named_hero_deck':
+            checks.append(CountCheck(f"a Hero with '{step['keyword']}'",
+                                     {'heroes': catalog.names['heroes'].containing(step['keyword'])}))
+        elif op == 'shrink_tech':
+            checks.append(CountCheck("a Hero with 'Size-Changing'",
+                                     {'heroes': catalog.abilities('heroes').containing("Size-Changing")}))
+
+    # Slot counts
+    for key, singular, plural in (('villains', 'Villain Group', 'Villain Groups'),
+                                  ('henchmen', 'Henchman Group', 'Henchman Groups'),
+                                  ('heroes', 'Hero', 'Heroes')):
+        checks.append(SizeCheck(_count(reqs[key], singular, plural), key, reqs[key]))
+
+    # Hero Deck teams (name constraints are covered by the steps above)
+    mods = record['players'][player_count]
+    for req in mods.get('required_teams') or ():
+        target = req['team'].lower()
+        positions = set().union(*(p for team, p in catalog.hero_teams.items() if target in team.lower()))
+        count = req.get('count', 1)
+        checks.append(CountCheck(f"{_count(count, f'[{target}] Hero', f'[{target}] Heroes')}", {'heroes': positions}, count))
+
+    versus = mods.get('team_versus_counts')
+    if versus:
+        checks.append(VersusCheck(f"{versus[0]} and {versus[1]} Heroes of two Teams", catalog.hero_teams, *versus))
+    return _matchable(checks)
+
+
+def mastermind_checks(catalog, mastermind):
+    """A Mastermind needs the group it always leads."""
+    lead = mastermind.get('always_leads')
+    if not lead or lead == 'Unknown': return []
+    return _matchable([CountCheck(f"'{lead}', the group it always leads", {
+        key: group_positions(catalog, key, lead) for key in ('villains', 'henchmen')
+    })])
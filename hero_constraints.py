@@ -0,0 +1,173 @@
+"""Hero Deck constraint solving.
+
+pick_heroes hands all Hero constraints of a setup to one Problem:
+
+  - AT_LEAST constraints: "Use at least 1 [spider-friends] Hero"
+  - EXACT constraints: "Use exactly two Heroes with 'Hulk'", the two teams
+    of a versus Scheme. Heroes matching one are also kept out of the open
+    slots.
+  - capacity: the Hero Deck slots left after the user's picks
+  - open slots: every slot the constraints leave free is later filled by
+    the synergy scorer from the "open" Heroes (not on a banned team, not
+    matching an EXACT constraint), and `reserve` more open Heroes must be
+    left for the Villain Deck.
+
+A solution is a set of Heroes that meets every constraint and is
+irredundant (dropping any of its Heroes breaks a constraint). Heroes that
+match the same constraints and are equally open are interchangeable, so
+the solver groups them and enumerates how many to take from each group.
+A pick-count vector stands for prod(C(group size, count)) Hero sets.
+Picking a vector by that weight, then Heroes uniformly inside each group,
+draws uniformly from all solutions. An empty enumeration proves that
+there is none.
+
+Constraints only see Hero positions in a candidate pool (ints); building
+the member sets from the catalog indexes is up to the caller.
+"""
+from math import comb
+
+AT_LEAST = "at_least"
+EXACT = "exact"
+
+
+class Constraint:
+    __slots__ = ("label", "kind", "members", "need")
+
+    def __init__(self, label, kind, members, need):
+        self.label = label
+        self.kind = kind
+        self.members = frozenset(members)  # pool positions that satisfy it
+        self.need = max(0, need)           # Heroes still needed (user picks already counted)
+
+    def __repr__(self):
+        return f"Constraint({self.label!r}, {self.kind}, need={self.need}, {len(self.members)} candidates)"
+
+
+class Problem:
+    """All solutions of one constraint set, counted up front.
+
+    open_members: pool positions that may fill open slots
+    """
+
+    def __init__(self, constraints, capacity, open_members, reserve=0):
+        self.constraints = [c for c in constraints if c.need or c.kind == EXACT]
+        self.capacity = capacity
+        self.reserve = reserve
+
+        # Members of an EXACT constraint never fill open slots
+        open_members = set(open_members)
+        for c in self.constraints:
+            if c.kind == EXACT: open_members -= c.members
+        self.open_total = len(open_members)
+
+        # Group the relevant Heroes by (constraint bits, is open)
+        groups = {}
+        for pos in set().union(*(c.members for c in self.constraints)):
+            bits = 0
+            for i, c in enumerate(self.constraints):
+                if pos in c.members: bits |= 1 << i
+            groups.setdefault((bits, pos in open_members), []).append(pos)
+        # Sorted so the enumeration (and with it a seeded draw) is reproducible
+        self.groups = [(bits, is_open, sorted(members)) for (bits, is_open), members in sorted(groups.items())]
+
+        self.solutions = []  # [(weight, counts per group)]
+        self._enumerate()
+        self.total = sum(weight for weight, _ in self.solutions)
+
+    def _enumerate(self):
+        constraints = self.constraints
+        groups = self.groups
+        needs = [c.need for c in constraints]
+        exact = [c.kind == EXACT for c in constraints]
+
+        # Most Heroes a group can contribute to each constraint from here on
+        supply = [[0] * len(constraints) for _ in range(len(groups) + 1)]
+        for g in range(len(groups) - 1, -1, -1):
+            bits, _, members = groups[g]
+            for i in range(len(constraints)):
+                supply[g][i] = supply[g + 1][i] + (len(members) if bits >> i & 1 else 0)
+
+        coverage = [0] * len(constraints)
+        counts = [0] * len(groups)
+
+        def walk(g, total, open_used):
+            for i, need in enumerate(needs):
+                if coverage[i] + supply[g][i] < need: return
+            if g == len(groups):
+                self._accept(counts, coverage, total, open_used)
+                return
+
+            bits, is_open, members = groups[g]
+            # An irredundant solution takes at most max(need) from a group
+            top = min(len(members), max(needs[i] for i in range(len(needs)) if bits >> i & 1))
+            for n in range(top + 1):
+                if total + n > self.capacity: break
+                if any(exact[i] and bits >> i & 1 and coverage[i] + n > needs[i] for i in range(len(needs))):
+                    break
+                for i in range(len(needs)):
+                    if bits >> i & 1: coverage[i] += n
+                counts[g] = n
+                walk(g + 1, total + n, open_used + (n if is_open else 0))
+                for i in range(len(needs)):
+                    if bits >> i & 1: coverage[i] -= n
+            counts[g] = 0
+
+        walk(0, 0, 0)
+
+    def _accept(self, counts, coverage, total, open_used):
+        needs = [c.need for c in self.constraints]
+        for i, c in enumerate(self.constraints):
+            if coverage[i] < c.need: return
+            if c.kind == EXACT and coverage[i] != c.need: return
+        # Irredundant: every group used holds a Hero some constraint can't spare
+        for (bits, _, _), n in zip(self.groups, counts):
+            if n and not any(bits >> i & 1 and coverage[i] == needs[i] for i in range(len(needs))):
+                return
+        # The open slots and the Villain Deck reserve still have to be filled
+        if self.open_total - open_used < (self.capacity - total) + self.reserve: return
+
+        weight = 1
+        for (_, _, members), n in zip(self.groups, counts):
+            weight *= comb(len(members), n)
+        self.solutions.append((weight, tuple(counts)))
+
+    @property
+    def feasible(self):
+        return self.total > 0
+
+    def sample(self, rng):
+        """A uniformly random solution as sorted pool positions, or None."""
+        if not self.total: return None
+        pick = rng.randrange(self.total)
+        for weight, counts in self.solutions:
+            if pick < weight: break
+            pick -= weight
+        chosen = []
+        for (_, _, members), n in zip(self.groups, counts):
+            if n: chosen.extend(rng.sample(members, n))
+        return sorted(chosen)
+
+
+def choose(problems, rng):
+    """Draws uniformly from the union of several alternative problems (e.g.
+    one per team pairing of a versus Scheme). Returns (index, positions) or
+    (None, None) if none is feasible."""
+    total = sum(p.total for p in problems)
+    if not total: return None, None
+    pick = rng.randrange(total)
+    for index, problem in enumerate(problems):
+        if pick < problem.total: return index, problem.sample(rng)
+        pick -= problem.total
+    return None, None
+
+
+def best_effort(constraints, capacity, rng):
+    """Fallback for an infeasible set: per constraint, as many of the still
+    needed Heroes as there are (the old greedy passes)."""
+    chosen = []
+    for c in constraints:
+        have = sum(1 for pos in chosen if pos in c.members)
+        candidates = sorted(c.members.difference(chosen))
+        take = min(max(0, c.need - have), len(candidates), capacity - len(chosen))
+        if take > 0: chosen.extend(rng.sample(candidates, take))
+    return sorted(chosen)
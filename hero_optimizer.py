@@ -0,0 +1,113 @@
+"""Whole-deck Hero optimization under a time budget.
+
+pick_heroes fills the open Hero Deck slots greedily: every pick is the best
+Hero of a random sample against the deck so far, so an early pick is never
+revisited. With an optimizer budget the greedy deck is then improved by
+simulated annealing over the open picks:
+
+  - objective: the synergy of the whole deck, every Hero scored with the
+    score_hero terms (HeroMatrix.score) against the rest of the deck
+  - move: swap one open pick for a Hero of the open pool, one of the `top`
+    best against the rest of the deck or, with probability `explore`, any
+  - the fixed Heroes (player picks, Scheme constraint picks) never move and
+    the pool only holds Heroes allowed in open slots, so every deck visited
+    meets the Scheme constraints
+
+improve() runs until the budget (milliseconds of wall-clock time) is spent
+and returns the best deck seen, which is never worse than the greedy one it
+starts from. A step costs about a millisecond with the full catalog. The
+number of steps then depends on the machine, so a seed only reproduces the
+same deck through the setup cache, or when max_steps runs out before the
+time does: the temperature is then cooled over the steps, not the time.
+"""
+import math
+import time
+
+import numpy as np
+
+# Starting temperature; cooled linearly to ~0 over the budget
+START_TEMPERATURE = 2.0
+
+
+class DeckObjective:
+    """Total synergy of a Hero Deck, each Hero scored against all the others.
+
+    scoring is (mechanics, class_needs, team_needs) as passed to
+    HeroMatrix.score; deck is a scratch pick_heroes DeckState.
+    """
+
+    def __init__(self, catalog, deck, scoring):
+        self.catalog = catalog
+        self.matrix = catalog.hero_matrix
+        self.deck = deck
+        self.scoring = scoring
+        self.evaluations = 0
+
+    def rows(self, heroes):
+        return self.catalog.hero_rows(heroes)
+
+    def score_rows(self, rows, others):
+        """HeroMatrix scores of rows against a deck of `others`."""
+        self.deck.reset(others)
+        self.evaluations += len(rows)
+        return self.matrix.score(rows, self.deck, *self.scoring)
+
+    def __call__(self, heroes):
+        total = 0.0
+        for i, hero in enumerate(heroes):
+            if hero.get('is_placeholder'): continue
+            total += float(self.score_rows(self.rows([hero]), heroes[:i] + heroes[i + 1:])[0])
+        return total
+
+
+def improve(objective, fixed, picks, pool, budget_ms, rng, max_steps=None, top=5, explore=0.1):
+    """Anneals the open picks for budget_ms (and at most max_steps). Returns (best picks, stats).
+
+    fixed: Heroes that stay (placeholders included), picks: the greedy open
+    picks, pool: the other Heroes allowed in open slots.
+    """
+    start = time.perf_counter()
+    budget = budget_ms / 1000.0
+    deadline = start + budget
+
+    current = list(picks)
+    pool = list(pool)
+    pool_rows = objective.rows(pool) if pool else np.zeros(0, dtype=np.int64)
+    current_score = objective(fixed + current)
+    greedy_score = best_score = current_score
+    best = list(current)
+
+    steps = accepted = 0
+    while current and pool and (max_steps is None or steps < max_steps):
+        now = time.perf_counter()
+        if now >= deadline: break
+        done = steps / max_steps if max_steps else (now - start) / budget
+        temperature = START_TEMPERATURE * (1 - done) + 1e-3
+
+        i = rng.randrange(len(current))
+        if rng.random() < explore:
+            j = rng.randrange(len(pool))
+        else:
+            others = fixed + current[:i] + current[i + 1:]
+            scores = objective.score_rows(pool_rows, others)
+            j = int(rng.choice(np.argsort(-scores, kind='stable')[:top]))
+
+        proposal = current[:i] + [pool[j]] + current[i + 1:]
+        score = objective(fixed + proposal)
+        steps += 1
+        delta = score - current_score
+        if delta >= 0 or rng.random() < math.exp(delta / temperature):
+            accepted += 1
+            pool[j], current = current[i], proposal
+            pool_rows[j] = objective.rows([pool[j]])[0]
+            current_score = score
+            if score > best_score:
+                best, best_score = list(current), score
+
+    stats = {
+        "steps": steps,
+        "accepted": accepted,
+        "greedy_score": round(greedy_score, 2),
+        "best_score": round(best_score, 2),
+    }
+    return best, stats
@@ -0,0 +1,212 @@
+"""Typed, slotted models of the catalog items.
+
+The randomizer and the UI keep working on the raw item dicts (they are what
+the catalog hands out and what results are built from). A model is the
+parsed view of one dict, built once and reused: normalized names, numeric
+fields parsed from strings such as "3+" and the tags flattened into a
+tuple. Get them through Catalog.model(item).
+
+Tags are also interned to bit positions (see TAGS), and every model carries
+the bitset of its tags as tag_mask, so tag checks are integer operations.
+"""
+import re
+import threading
+
+_NUMBER = re.compile(r'\d+')
+
+
+def parse_number(value):
+    """(number, plus) of a card stat: "3+" -> (3, True), "5*" -> (5, False).
+
+    None / "" -> (None, False); text without digits -> (0, False).
+    """
+    if value is None or value == "": return None, False
+    text = str(value)
+    m = _NUMBER.search(text)
+    return (int(m.group(0)) if m else 0), text.rstrip().endswith('+')
+
+
+def flatten_tags(obj):
+    """All tags of an item or card, category by category (duplicates kept)."""
+    tags = []
+    for category_tags in (obj.get('tags') or {}).values():
+        tags.extend(category_tags)
+    return tuple(tags)
+
+
+class TagVocabulary:
+    """Process-wide interning of tag names to bit positions.
+
+    A tag gets the next free bit the first time it is seen; a set of tags is
+    an int with those bits set. Class_ / Team_ tags are also collected in
+    class_mask / team_mask with their lowercased suffix ("Class_Tech" ->
+    "tech", "Team_XMen" -> "xmen").
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.suffixes = []
+        self.class_mask = 0
+        self.team_mask = 0
+        self._lock = threading.Lock()
+
+    def bit(self, tag):
+        tag_id = self.ids.get(tag)
+        if tag_id is None:
+            with self._lock:
+                tag_id = self.ids.get(tag)
+                if tag_id is None:
+                    tag_id = len(self.names)
+                    self.names.append(tag)
+                    parts = tag.split("_")
+                    self.suffixes.append(parts[1].lower() if len(parts) > 1 else "")
+                    if tag.startswith("Class_"): self.class_mask |= 1 << tag_id
+                    elif tag.startswith("Team_"): self.team_mask |= 1 << tag_id
+                    self.ids[tag] = tag_id
+        return 1 << tag_id
+
+    def mask(self, tags):
+        mask = 0
+        for tag in tags:
+            mask |= self.bit(tag)
+        return mask
+
+    def positions(self, mask):
+        """Bit positions set in mask, lowest first."""
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def tags(self, mask):
+        """Tag names in mask, in interning order."""
+        return [self.names[i] for i in self.positions(mask)]
+
+    def suffixes_of(self, mask):
+        """Lowercased suffixes of the tags in mask, e.g. the classes of Class_ tags."""
+        return [self.suffixes[i] for i in self.positions(mask)]
+
+
+TAGS = TagVocabulary()
+
+
+def team_tag_key(team):
+    """"guardians-of-the-galaxy" -> "GuardiansOfTheGalaxy" (as in the Team_ tags)."""
+    return team.replace('-', ' ').title().replace(' ', '')
+
+
+def split_sets(item_set):
+    """("A", "B") for a set string "A/B"."""
+    return tuple(s.strip() for s in (item_set or '').split('/') if s.strip())
+
+
+class Item:
+    """Fields every catalog item has."""
+
+    __slots__ = ("raw", "name", "key_name", "set", "sets", "tags", "tag_mask")
+
+    def __init__(self, raw, name):
+        self.raw = raw
+        self.name = name or ''
+        self.key_name = self.name.lower()
+        self.set = raw.get('set') or ''
+        self.sets = split_sets(self.set)
+        self.tags = flatten_tags(raw)
+        self.tag_mask = TAGS.mask(self.tags)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, {self.set!r})"
+
+
+class Card:
+    """One card of a Hero or Villain Group."""
+
+    __slots__ = ("raw", "name", "cost", "cost_plus", "attack", "attack_plus",
+                 "recruit", "recruit_plus", "vp", "quantity", "classes", "team",
+                 "abilities", "tags", "tag_mask")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.name = raw.get('title') or raw.get('name') or ''
+        self.cost, self.cost_plus = parse_number(raw.get('cost'))
+        self.attack, self.attack_plus = parse_number(raw.get('attack'))
+        self.recruit, self.recruit_plus = parse_number(raw.get('recruit'))
+        self.vp = parse_number(raw.get('vp'))[0]
+        self.quantity = parse_number(raw.get('quantity'))[0]
+        self.classes = tuple(cls.lower() for cls in raw.get('classes') or ())
+        self.team = raw.get('team') or None
+        self.abilities = tuple(raw.get('abilities') or ())
+        self.tags = flatten_tags(raw)
+        self.tag_mask = TAGS.mask(self.tags)
+
+
+class Hero(Item):
+    __slots__ = ("cards", "team", "team_key", "hero_tags", "hero_tag_mask")
+
+    def __init__(self, raw):
+        super().__init__(raw, raw.get('hero'))
+        self.cards = tuple(Card(c) for c in raw.get('cards') or ())
+        # The first card's team stands for the Hero ('Unknown' if it has none)
+        self.team = (self.cards[0].team if self.cards else None) or 'Unknown'
+        self.team_key = team_tag_key(self.team).lower()
+        # Team_ tag plus the tags of every card, without duplicates
+        tags = {t for card in self.cards for t in card.tags}
+        if self.team != 'Unknown': tags.add(f"Team_{team_tag_key(self.team)}")
+        self.hero_tags = tuple(sorted(tags))
+        self.hero_tag_mask = TAGS.mask(self.hero_tags)
+
+
+class VillainGroup(Item):
+    __slots__ = ("cards",)
+
+    def __init__(self, raw):
+        super().__init__(raw, raw.get('group_name') or raw.get('name'))
+        self.cards = tuple(Card(c) for c in raw.get('cards') or ())
+
+
+class Henchmen(Item):
+    __slots__ = ("vp", "attack", "attack_plus", "abilities")
+
+    def __init__(self, raw):
+        super().__init__(raw, raw.get('name') or raw.get('group_name'))
+        self.vp = parse_number(raw.get('vp'))[0]
+        self.attack, self.attack_plus = parse_number(raw.get('attack'))
+        self.abilities = tuple(raw.get('abilities') or ())
+
+
+class Mastermind(Item):
+    __slots__ = ("vp", "attack", "attack_plus", "always_leads", "abilities")
+
+    def __init__(self, raw):
+        super().__init__(raw, raw.get('name'))
+        self.vp = parse_number(raw.get('vp'))[0]
+        self.attack, self.attack_plus = parse_number(raw.get('attack'))
+        self.always_leads = raw.get('always_leads') or None
+        self.abilities = tuple(raw.get('abilities') or ())
+
+
+class Scheme(Item):
+    __slots__ = ("description",)
+
+    def __init__(self, raw):
+        super().__init__(raw, raw.get('name'))
+        self.description = tuple(raw.get('description') or ())
+
+
+MODELS = {
+    "heroes": Hero,
+    "villains": VillainGroup,
+    "henchmen": Henchmen,
+    "masterminds": Mastermind,
+    "schemes": Scheme,
+}
+
+
+def guess_key(raw):
+    """Catalog category of an item dict that is not from the catalog."""
+    if 'hero' in raw: return "heroes"
+    if 'group_name' in raw: return "villains"
+    if 'description' in raw: return "schemes"
+    if 'always_leads' in raw or 'tactics' in raw: return "masterminds"
+    return "henchmen"
@@ -0,0 +1,913 @@
+"""Offline compiler for Scheme setup rules.
+
+Every Scheme description is turned into a structured rule record once and
+cached in COMPILED_FILE, keyed by the description text. The record holds:
+
+  - "players": per player count (1-5), the mods that differ from
+               default_scheme_mods()
+  - "steps":   ordered list edits that need the loaded card data or real
+               randomness (either/or groups, wedding heroes, ...). These are
+               replayed at runtime by LegendaryRandomizer.parse_scheme_rules.
+  - "masterminds": Lurking / Tyrant / conditional Twist rules read by
+               pick_mastermind and generate_setup.
+
+The cache stores a hash of the source file (plus COMPILER_VERSION) and is
+rebuilt automatically when either changes. Run `python scheme_rules.py` to
+rebuild it by hand.
+"""
+import hashlib
+import json
+import os
+import re
+
+from setup_log import logger
+
+SCHEMES_FILE = "enriched_schemes.json"
+COMPILED_FILE = "compiled_schemes.json"
+
+# Bump this whenever the parsing logic below changes so old caches are dropped
+COMPILER_VERSION = 2
+
+SETUP_RULES = {
+    1: {"villains": 1, "henchmen": 1, "bystanders": 1, "heroes": 5},
+    2: {"villains": 2, "henchmen": 1, "bystanders": 2, "heroes": 5},
+    3: {"villains": 3, "henchmen": 1, "bystanders": 8, "heroes": 5},
+    4: {"villains": 3, "henchmen": 2, "bystanders": 8, "heroes": 5},
+    5: {"villains": 4, "henchmen": 2, "bystanders": 12, "heroes": 6}
+}
+
+
+def default_scheme_mods(player_count):
+    """Baseline scheme modifiers before any Scheme text is applied."""
+    return {
+        "twists": 8,
+        "twist_note": "",
+        "master_strikes": 5,
+        "bystanders_override": None,
+        "bystanders_add": 0,
+        "extra_villains": 0,
+        "extra_henchmen": 0,
+        "required_villains": [],
+        "required_henchmen": [],
+        # Dynamically set base hero count (5 for 1-4p, 6 for 5p)
+        "hero_deck_count": SETUP_RULES[player_count]["heroes"],
+        "villain_deck_heroes": 0,
+        "required_villain_deck_heroes": [],
+        "heroes_from_hero_deck": 0,
+        "team_versus_counts": None,
+        "custom_deck": None,
+        "banned_heroes": [],
+        "required_hero_deck_includes": [],
+        "bystanders_in_hero_deck": 0,
+        "tyrant_masterminds_count": 0,
+        "sidekicks_in_villain_deck": 0,
+        "ambitions_in_villain_deck": 0,
+        "officers_in_villain_deck": 0,
+        "player_picked_heroes": 0,
+        "required_teams": [],
+        "henchmen_in_hero_deck_count": 0,
+        "henchmen_in_hero_deck_obj": None,
+        "banned_villains": [],
+        "banned_henchmen": [],
+        "tactics_in_villain_deck": 0,
+        "quantum_ambush_scheme": False,
+        "henchman_alias": None,
+        "wedding_heroes": [],
+        "banned_teams_from_open_selection": [],
+        "drained_mastermind_required": False,
+        "extra_hero_card_count": None,
+        "double_group_count": False,
+        "half_deck_mechanic": False
+    }
+
+
+def _players_match(condition_str, player_count):
+    """Checks a "2-3" / "1 or 4" style player condition."""
+    # Range Check (e.g. "2-3")
+    if '-' in condition_str:
+        parts = condition_str.split('-')
+        if len(parts) == 2 and parts[0].strip().isdigit() and parts[1].strip().isdigit():
+            low, high = int(parts[0]), int(parts[1])
+            return low <= player_count <= high
+        return False
+    # List Check (e.g. "1 or 4")
+    nums = [int(n) for n in re.findall(r'\d+', condition_str)]
+    return player_count in nums
+
+
+def _compile_for_players(text, player_count):
+    """Runs the regex rules for one player count.
+
+    Returns (mods, steps). Scalar results are written straight into mods;
+    anything that touches the card data or needs a random pick is emitted
+    as a step instead, in the same order the sections run.
+    """
+    mods = default_scheme_mods(player_count)
+    steps = []
+    # Names appended by the pure sections, used for the slot math in section 7
+    req_villains = []
+    req_henchmen = []
+
+    # --- 0. VILLAIN COUNT OVERRIDES (NEW) ---
+    # Matches: "1-2 players: Use 3 Villain Groups"
+    # Must run BEFORE Twist Math so we know the total Villain count for "Per Reality" logic
+    v_override_match = re.search(r'(?:For\s+)?(\d+)(?:-(\d+))?\s+players:?.*?Use (\d+) Villain Groups', text, re.IGNORECASE)
+    if v_override_match:
+        low = int(v_override_match.group(1))
+        high = int(v_override_match.group(2)) if v_override_match.group(2) else low
+        target = int(v_override_match.group(3))
+
+        if low <= player_count <= high:
+            # Calculate how many extras we need to reach the target
+            base_v = SETUP_RULES.get(player_count, {}).get('villains', 2)
+            diff = target - base_v
+            if diff > 0:
+                mods['extra_villains'] = diff
+
+    # --- 1. TWIST MATH (FIXED PRIORITIES) ---
+    explicit_twist_found = False
+
+    # A. PER REALITY CHECK (Highest Priority - Nexus Scheme)
+    # Matches: "Add 2 Twists to each Reality"
+    reality_twist = re.search(r'Add (\d+) Twists to each Reality', text, re.IGNORECASE)
+    if reality_twist:
+        per_reality = int(reality_twist.group(1))
+
+        # Total Villains = Base + Extra (calculated in Section 0)
+        base_v = SETUP_RULES.get(player_count, {}).get('villains', 2)
+        total_v = base_v + mods['extra_villains']
+
+        mods['twists'] = per_reality * total_v
+        mods['twist_note'] = f"({per_reality} per Reality x {total_v} Realities)"
+        explicit_twist_found = True
+
+    # B. SPECIFIC OVERRIDES (Ranges or Lists)
+    # Matches patterns like: "2 players: 9 Twists", "1 or 4 players: 10 Twists"
+    if not explicit_twist_found:
+        specific_matches = re.finditer(r'(?:For\s+)?([0-9\s\-,or]+?)\s+players:?.*?(?:use\s*)?(\d+)\s+Twists', text, re.IGNORECASE)
+
+        for m in specific_matches:
+            condition_str = m.group(1).strip()
+            val = int(m.group(2))
+
+            if _players_match(condition_str, player_count):
+                mods['twists'] = val
+                mods['twist_note'] = f"(For {condition_str} players)"
+                explicit_twist_found = True
+                break
+
+    # 2. STANDARD FORMULAS (Fallback)
+    if not explicit_twist_found:
+        # A. Base +/- Mod (Prioritized): "11 Twists, minus 1 Twist per player"
+        base_mod_match = re.search(r'(\d+)\s+Twists.*?(minus|plus)\s+(\d+)(?:\s+Twists?)?\s+per\s+player', text, re.IGNORECASE)
+
+        # B. Players + X: "Twists equal to the number of players plus 6"
+        players_plus_match = re.search(r'Twists equal to the number of players plus (\d+)', text, re.IGNORECASE)
+
+        # C. Mixed: "1 Twist, plus 2 per player"
+        mixed_match = re.search(r'(\d+)\s+Twists?,?\s+plus\s+(\d+)\s+Twists?\s+per\s+player', text, re.IGNORECASE)
+
+        # D. Pure Multiplier: "2 Twists per player"
+        per_player_each = re.search(r'(\d+)\s+Twists? (?:into each|per) player', text, re.IGNORECASE)
+
+        # E. Simple Base: "8 Twists"
+        base_twist = re.search(r'(\d+)\s+Twists', text, re.IGNORECASE)
+
+        # F. X + Players (Phrasing 2): "Twists equal to 5 plus the number of players"
+        base_plus_players_match = re.search(r'Twists equal to (\d+) plus (?:the )?number of players', text, re.IGNORECASE)
+
+        # LOGIC CHAIN
+        if base_mod_match:
+            base = int(base_mod_match.group(1))
+            op = base_mod_match.group(2).lower()
+            mod = int(base_mod_match.group(3))
+
+            if op == 'minus':
+                mods['twists'] = base - (mod * player_count)
+                mods['twist_note'] = f"({base} - {mod} per player)"
+            else:
+                mods['twists'] = base + (mod * player_count)
+                mods['twist_note'] = f"({base} + {mod} per player)"
+
+        elif players_plus_match:
+            add = int(players_plus_match.group(1))
+            mods['twists'] = player_count + add
+            mods['twist_note'] = f"({player_count} players + {add})"
+
+        elif base_plus_players_match:
+            base = int(base_plus_players_match.group(1))
+            mods['twists'] = base + player_count
+            mods['twist_note'] = f"({base} + {player_count} players)"
+
+        elif mixed_match:
+            base = int(mixed_match.group(1))
+            per_player = int(mixed_match.group(2))
+            mods['twists'] = base + (per_player * player_count)
+            mods['twist_note'] = f"({base} + {per_player} per player)"
+
+        elif per_player_each:
+            count = int(per_player_each.group(1))
+            mods['twists'] = count * player_count
+            mods['twist_note'] = f"({count} per player)"
+
+        elif base_twist:
+            val = int(base_twist.group(1))
+            mods['twists'] = val
+
+            # Check for separate sentence modifiers (rare fallback)
+            plus_match = re.search(r'plus (\d+)(?: twist| twists)? per player', text, re.IGNORECASE)
+            minus_match = re.search(r'minus (\d+)(?: twist| twists)? per player', text, re.IGNORECASE)
+
+            if plus_match:
+                add = int(plus_match.group(1))
+                mods['twists'] += (add * player_count)
+                mods['twist_note'] = f"({val} + {add} per player)"
+            elif "plus 1 per player" in text.lower():
+                mods['twists'] += player_count
+                mods['twist_note'] = f"({val} + 1 per player)"
+
+            if minus_match:
+                sub = int(minus_match.group(1))
+                mods['twists'] -= (sub * player_count)
+                mods['twist_note'] = f"({val} - {sub} per player)"
+            elif "minus 1 twist per player" in text.lower():
+                mods['twists'] -= player_count
+                mods['twist_note'] = f"({val} - 1 per player)"
+
+    # --- 0. VERSUS TEAMS ---
+    versus_match = re.search(r'(\d+) Heroes of one Team and (\d+) Heroes of another', text, re.IGNORECASE)
+    if versus_match:
+        count_a = int(versus_match.group(1))
+        count_b = int(versus_match.group(2))
+        mods['hero_deck_count'] = count_a + count_b
+        mods['team_versus_counts'] = (count_a, count_b)
+
+    # --- 2. MASTER STRIKES ---
+    ms_match = re.search(r'(\d+)\s+Master Strikes', text, re.IGNORECASE)
+    if ms_match:
+        mods['master_strikes'] = int(ms_match.group(1))
+
+    # --- 3. BYSTANDERS (FIXED) ---
+    if re.search(r'no Bystanders', text, re.IGNORECASE):
+        mods['bystanders_override'] = 0
+    else:
+        # 1. Total Override ("8 total Bystanders")
+        total_bys = re.search(r'(\d+)\s+total\s+Bystanders', text, re.IGNORECASE)
+        if total_bys:
+            mods['bystanders_override'] = int(total_bys.group(1))
+
+        # 2. Additive Logic (Sentence-by-sentence check)
+        # We split by sentences to ensure we catch conditions like "1-2 players: Add 3."
+        sentences = re.split(r'[.()\n]', text)
+        for s in sentences:
+            s = s.strip()
+            if not s: continue
+
+            # Check if this sentence adds Bystanders
+            add_match = re.search(r'Add\s+(\d+)\s+(?:extra\s+)?Bystanders', s, re.IGNORECASE)
+            if add_match:
+                val = int(add_match.group(1))
+
+                # Check for Player Constraint at the start of the sentence
+                # Matches: "1-2 Players:", "For 3 players:", "If 5 players"
+                p_match = re.search(r'^(?:(?:For|If)\s+)?(?:only\s+)?([0-9\s\-or]+)\s+players?', s, re.IGNORECASE)
+
+                # If constraint exists and is NOT met, skip this addition
+                if p_match and not _players_match(p_match.group(1).strip(), player_count):
+                    continue
+
+                # If no constraint found, OR constraint met, add the value
+                mods['bystanders_add'] += val
+
+    # --- 4. HERO DECK SIZE (FIXED v4) ---
+    # Split on '.', '(', ')', or newlines to separate rules so we process them individually
+    sentences = re.split(r'[.()\n]', text)
+
+    for s in sentences:
+        s = s.strip()
+        if not s: continue
+
+        # 1. PLAYER CONSTRAINT CHECK
+        # If a sentence starts with "For X players" or "If X players", we verify the count.
+        # This prevents "If 2 players: Use 4 Heroes" from triggering on 3 players.
+        p_match = re.search(r'^(?:For|If) (?:only )?([0-9\s\-or]+) players?', s, re.IGNORECASE)
+        if p_match and not _players_match(p_match.group(1), player_count):
+            continue # Skip this sentence
+
+        # 2. CHECK FOR ADDITIVE RULES ("Add another Hero", "Add 1 extra Hero")
+        # We explicitly exclude "to/into the Villain Deck" to avoid "Add 8 random cards... to the Villain Deck"
+        add_match = re.search(r'Add\s+(?:an|another|(\d+)|(one|two|three))\s+(?:extra\s+)?Hero(?:es)?(?!\s+(?:to|into|in)\s+(?:the\s+)?Villain Deck)', s, re.IGNORECASE)
+
+        # 3. CHECK FOR BASE COUNT RULES ("Use 5 Heroes", "6 Heroes", "Hero Deck is 4 Heroes")
+        # (?<!Shuffle\s) -> Not preceded by "Shuffle "
+        # (?!\s+(?:from|to|into)) -> Not followed by " from", " to", " into"
+        base_match = re.search(r'(?<!Shuffle\s)(?<!Reveal\s)(?<!Look\s)(?<!Add\s)(?<!\d-)(?<!\d\s)(\d+)\s+Heroes(?!\s+(?:from|to|into))', s, re.IGNORECASE)
+
+        if add_match:
+            to_add = 1
+            if add_match.group(1): # Digit (e.g. "2")
+                to_add = int(add_match.group(1))
+            elif add_match.group(2): # Word (e.g. "two")
+                word_map = {"one": 1, "two": 2, "three": 3}
+                to_add = word_map.get(add_match.group(2).lower(), 1)
+
+            mods['hero_deck_count'] += to_add
+
+        elif base_match:
+            val = int(base_match.group(1))
+
+            # Safety: Ignore values >= 10 unless explicitly saying "Hero Deck"
+            # (Prevents accidents with "Shuffle 14 cards")
+            is_explicit = "hero deck" in s.lower()
+            if val >= 10 and not is_explicit:
+                continue
+
+            mods['hero_deck_count'] = val
+
+    # A versus Hero Deck holds both teams ("3 Heroes of one Team and 3 Heroes of
+    # another" also matches the base count rule above as "3 Heroes")
+    if mods['team_versus_counts']:
+        mods['hero_deck_count'] = max(mods['hero_deck_count'], sum(mods['team_versus_counts']))
+
+    # --- 5. VILLAIN DECK HEROES (FIXED v2) ---
+    # Pattern A: "includes 14 extra Jean Grey cards"
+    match_a = re.search(r'includes \d+ extra (.*?) cards', text, re.IGNORECASE)
+
+    # Pattern B: "Add 14 Jean Grey Hero cards to the Villain Deck"
+    match_b = re.search(r'Add \d+ (.*?) Hero cards to the Villain Deck', text, re.IGNORECASE)
+
+    # Pattern C: "cards for any Blade Hero"
+    match_c = re.search(r'cards for (?:any|an) (.*?) Hero', text, re.IGNORECASE)
+
+    # Pattern E: "Add 8 random cards from an extra Hero to the Villain Deck"
+    match_e = re.search(r'Add (\d+) (?:random )?cards from an extra Hero', text, re.IGNORECASE)
+
+    if match_a:
+        mods['villain_deck_heroes'] += 1
+        name = match_a.group(1).strip()
+        if "extra" not in name.lower(): mods['required_villain_deck_heroes'].append(name)
+
+    elif match_b:
+        mods['villain_deck_heroes'] += 1
+        mods['required_villain_deck_heroes'].append(match_b.group(1).strip())
+
+    elif match_c:
+        mods['villain_deck_heroes'] += 1
+        name = match_c.group(1).strip()
+        if "extra" not in name.lower(): mods['required_villain_deck_heroes'].append(name)
+
+    elif match_e:
+        mods['villain_deck_heroes'] += 1
+        # Capture the specific quantity (e.g. 8)
+        mods['extra_hero_card_count'] = int(match_e.group(1))
+
+    # Pattern D: Generic Fallback (e.g. "Add an extra Hero to the Villain Deck")
+    elif re.search(r'(?:to|into|in) the Villain Deck.*?extra Hero', text, re.IGNORECASE) or \
+         re.search(r'Villain Deck includes.*?extra Hero', text, re.IGNORECASE):
+        mods['villain_deck_heroes'] += 1
+
+    # --- 6. EXTRA GROUPS (FIXED) ---
+    # 1. Check for "Solo" conditional first (Specific)
+    if re.search(r'If playing solo.*?add.*?Villain Group', text, re.IGNORECASE):
+        if player_count == 1:
+            mods['extra_villains'] += 1
+
+    # 2. Check for standard unconditional addition (Generic)
+    # Matches: "Add an extra...", "Add 2 extra...", "Add two extra..."
+    else:
+        m = re.search(r'Add (?:an|(\d+)|(one|two|three|four)) extra Villain Groups?', text, re.IGNORECASE)
+        if m:
+            count = 1
+            if m.group(1): # Digit found (e.g. "2")
+                count = int(m.group(1))
+            elif m.group(2): # Word found (e.g. "two")
+                word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
+                count = word_map.get(m.group(2).lower(), 1)
+
+            mods['extra_villains'] += count
+
+    # Henchmen Logic (Updated for quantities)
+    hench_match = re.search(r'Add (?:an|another|(\d+)|(one|two|three|four)) (?:extra )?Henchm[ae]n', text, re.IGNORECASE)
+    if hench_match:
+        count = 1
+        if hench_match.group(1): # Digit found
+            count = int(hench_match.group(1))
+        elif hench_match.group(2): # Number word found
+            word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
+            count = word_map.get(hench_match.group(2).lower(), 1)
+        # If "an" or "another" matched (and groups 1/2 are None), count defaults to 1
+        mods['extra_henchmen'] += count
+
+    # --- 6b. HENCHMAN GROUP ALIAS (NEW) ---
+    # Matches: "Add an extra Henchman Group ... as 'Xerogen Experiments'"
+    # Note: The count (+1) is handled by the generic regex above. We just capture the name here.
+    alias_match = re.search(r'Add an extra Henchman Group.*?as [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
+    if alias_match:
+        mods['henchman_alias'] = alias_match.group(1).strip()
+
+    # --- 7. NAMED REQUIREMENTS (FIXED) ---
+    # Matches: "Include 10 Sentinels as extra Henchmen" OR "as one of the Backup Adversary groups"
+    # Accepts "Backup Adversary" (and plural) as synonym for Henchmen
+    matches = re.findall(r'(Include|Add) (?:\d+ )?(.*?) as (?:an? )?(extra )?(?:one of the )?(Henchm[ae]n|Villain|Backup Adversar(?:y|ies))', text, re.IGNORECASE)
+
+    for action, name, is_extra, gtype in matches:
+        clean_name = name.strip()
+
+        # We add a slot if it explicitly says "extra" OR "Add" (usually implies extra in this context)
+        should_add_slot = bool(is_extra) or action.lower() == "add"
+
+        # Check for Henchmen OR Backup Adversaries
+        is_henchman = "hench" in gtype.lower() or "backup" in gtype.lower()
+
+        if is_henchman:
+            req_henchmen.append(clean_name)
+            steps.append({"op": "add", "field": "required_henchmen", "value": clean_name})
+            if should_add_slot:
+                # Only increase if we haven't covered it with the generic counters
+                if mods['extra_henchmen'] < len(req_henchmen):
+                    mods['extra_henchmen'] = len(req_henchmen)
+        else:
+            req_villains.append(clean_name)
+            steps.append({"op": "add", "field": "required_villains", "value": clean_name})
+            if should_add_slot:
+                if mods['extra_villains'] < len(req_villains):
+                    mods['extra_villains'] = len(req_villains)
+
+    # --- 7b. IMPLICIT INCLUSION (ROBUST V3) ---
+    # Matches: "Always include Party Thor Hero and Intergalactic Party Animals Villain Group."
+    # The names are cleaned here; matching them to Henchmen/Villains/Heroes happens at runtime.
+    implicit_match = re.search(r'Always include (?:the )?(.*?)(?:\.|$)', text, re.IGNORECASE)
+    if implicit_match:
+        content = implicit_match.group(1)
+
+        # 1. Robust Split: Handles "," "and" ", and" with any spacing
+        parts = re.split(r',\s*and\s+|\s+and\s+|,\s*', content)
+
+        for part in parts:
+            name_frag = part.strip()
+            if not name_frag: continue
+
+            # 2. Clean up generic words with WORD BOUNDARIES (\b)
+            clean_frag = re.sub(r'\b(?:Villain Groups?|Henchm[ae]n Groups?|Villains?|Henchm[ae]n|Heroes?|Hero)\b', '', name_frag, flags=re.IGNORECASE).strip()
+
+            # Remove leading "the" if it remains (e.g. "and the Skrulls")
+            clean_frag = re.sub(r'^the\s+', '', clean_frag, flags=re.IGNORECASE).strip()
+
+            if not clean_frag: clean_frag = name_frag
+
+            steps.append({"op": "include", "name": clean_frag})
+
+    # --- 8. EXPLICIT GROUP REQUIREMENTS (NEW) ---
+    # Matches: "Skrull Villain Group required"
+    req_group = re.search(r'([a-zA-Z\s]+) Villain Group required', text, re.IGNORECASE)
+    if req_group:
+        steps.append({"op": "add", "field": "required_villains", "value": req_group.group(1).strip()})
+
+    # --- 8b. KEYWORD GROUP REQUIREMENTS (FIXED CLEANUP) ---
+    # Matches: "Include exactly one Villain Group with 'Rise of The Living Dead'"
+    keyword_req_match = re.search(r'Include exactly (one|two|three|\d+) Villain Groups? with [\"“\']\s*(.*?)\s*[\"“\”\']', text, re.IGNORECASE)
+    if keyword_req_match:
+        count_str = keyword_req_match.group(1).lower()
+
+        # Remove periods completely and strip whitespace from both ends
+        keyword = keyword_req_match.group(2).replace('.', '').strip()
+
+        word_map = {"one": 1, "two": 2, "three": 3}
+        count = int(count_str) if count_str.isdigit() else word_map.get(count_str, 1)
+        steps.append({"op": "keyword_villains", "keyword": keyword, "count": count})
+
+    # --- 9. HEROES MOVED FROM HERO DECK (NEW) ---
+    # Matches: "Shuffle 12 random Heroes from the Hero Deck into the Villain Deck"
+    moved_heroes = re.search(r'Shuffle (\d+) random Heroes from the Hero Deck into the Villain Deck', text, re.IGNORECASE)
+    if moved_heroes:
+        mods['heroes_from_hero_deck'] = int(moved_heroes.group(1))
+
+    # --- 10. EITHER/OR SELECTION (FIXED) ---
+    # Handles weird quoting (e.g. using open quotes as closing quotes)
+    either_match = re.search(r'Include either (?:the )?[\"“\'](.+?)[\"“\”\'] or [\"“\'](.+?)[\"“\”\'] Villain Group', text, re.IGNORECASE)
+    if either_match:
+        steps.append({"op": "either_villain", "choices": [either_match.group(1), either_match.group(2)]})
+
+    # --- 11. CUSTOM DECKS (FIXED) ---
+    # A. Infected Deck
+    infected_match = re.search(r'Shuffle together (\d+) Bystanders and (\d+) (.*?) Henchmen as an [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
+    if infected_match:
+        steps.append({
+            "op": "infected_deck",
+            "bystanders": infected_match.group(1),
+            "henchmen_count": infected_match.group(2),
+            "henchmen": infected_match.group(3).strip(),
+            "title": infected_match.group(4).strip().rstrip('.') # Strip trailing period if captured
+        })
+
+    # B. Hulk Deck / Mutation Pile
+    # Handles "Shuffle them into" AND "Put them in a face-up..."
+    hulk_deck_match = re.search(r'Hero with [\"“\'](.*?)[\"“\”\'] in its Hero Name.*?(?:Shuffle|Put) them (?:into|in) (?:a )?(?:face-up )?[\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
+    if hulk_deck_match:
+        steps.append({
+            "op": "named_hero_deck",
+            "keyword": hulk_deck_match.group(1),
+            "title": hulk_deck_match.group(2).strip().rstrip('.')
+        })
+
+    # C. Dark Loyalty / Standard Additional Hero Deck (NEW)
+    # Matches: "Randomly pick 5 cards... from an additional Hero... form a “Dark Loyalty“ deck"
+    loyalty_match = re.search(r'Randomly pick (\d+) cards.*?from an additional Hero.*?form a [\"“\'](.*?)[\"“\”\'] deck', text, re.IGNORECASE)
+    if loyalty_match:
+        # Check if there is a cost restriction in the text to include in the note
+        note = ""
+        if "cost 5 or less" in text.lower():
+            note = " (cost 5 or less)"
+        steps.append({
+            "op": "loyalty_deck",
+            "count": int(loyalty_match.group(1)),
+            "title": loyalty_match.group(2).strip(),
+            "note": note
+        })
+
+    # D. SHRINK TECH (NEW)
+    # Matches: "Set aside all 14 cards of a random extra Hero that has any Size-Changing cards as “Shrink Tech.“"
+    shrink_match = re.search(r'Set aside all 14 cards of a random extra Hero that has any Size-Changing cards as [\"“\'](.*?)[\"“\”\']', text, re.IGNORECASE)
+    if shrink_match:
+        steps.append({"op": "shrink_tech", "title": shrink_match.group(1).strip().rstrip('.')})
+
+    # E. WEDDING HEROES (NEW)
+    # Matches: "Set aside two extra Heroes to get married"
+    if re.search(r'Set aside (?:two|2) extra Heroes to get married', text, re.IGNORECASE):
+        steps.append({"op": "wedding"})
+
+    # F. PAST HERO DECK (FIXED)
+    # Matches: "plus 4 other Heroes to make a ”Past Hero Deck”" (accepts ” as an opening quote)
+    past_deck_match = re.search(r'plus (\d+) other Heroes to make a\s*[\"“\”\'](.*?)[\"“\”\']', text, re.IGNORECASE)
+    if past_deck_match:
+        steps.append({
+            "op": "past_deck",
+            "count": int(past_deck_match.group(1)),
+            "title": past_deck_match.group(2).strip().rstrip('.') # Strip trailing period if inside quotes
+        })
+
+    # G. MONSTER PIT / CUSTOM VILLAIN DECK (NEW)
+    # Matches: "Shuffle 8 Monsters Unleashed Villains into a face-down 'Monster Pit' deck."
+    monster_pit_match = re.search(r'Shuffle (\d+) (.*?) Villains into a .*?[\"“\'](.*?)[\"“\”\'] deck', text, re.IGNORECASE)
+    if monster_pit_match:
+        steps.append({
+            "op": "monster_pit",
+            "count": int(monster_pit_match.group(1)),
+            "group": monster_pit_match.group(2).strip(),
+            "title": monster_pit_match.group(3).strip()
+        })
+
+    # H. ORDERED HERO STACK (NEW)
+    # Matches: "Put 14 Adam Warlock Hero cards in a face up stack"
+    ordered_stack_match = re.search(r'Put (\d+) (.*?) Hero cards in a face up stack', text, re.IGNORECASE)
+    if ordered_stack_match:
+        count = int(ordered_stack_match.group(1))
+        hero_name = ordered_stack_match.group(2).strip()
+
+        # 1. Ban this hero from the main Hero Deck so they don't appear twice
+        steps.append({"op": "add", "field": "banned_heroes", "value": hero_name})
+
+        # 2. Add to Custom Deck display (appears under Scheme description)
+        steps.append({"op": "set", "field": "custom_deck", "value": {
+            "name": f"{hero_name} Stack",
+            "lines": [f"{count} cards of {hero_name} (Ordered by cost)"]
+        }})
+
+    # --- 12. HERO DECK NAME REQUIREMENTS (FIXED) ---
+    # Pattern A: Quotes (e.g. "Use exactly two Heroes with 'Hulk' in their Hero Names")
+    hero_inc_match = re.search(r'Use exactly (\w+) Heroes with [\"“\'](.*?)[\"“\”\'] in their Hero Names', text, re.IGNORECASE)
+
+    # Pattern B: Explicit Single (e.g. "Exactly one Hero must be a Nova Hero")
+    single_req_match = re.search(r'Exactly one Hero must be a (.*?) Hero(?:[\.\n]|$)', text, re.IGNORECASE)
+    use_as_match = re.search(r'Use (.*?) as one of the Heroes', text, re.IGNORECASE)
+
+    # Pattern D: Comedic/Informal (e.g. "Use the best Hero in the game: Deadpool!")
+    comedic_match = re.search(r'Use the best Hero.*?: (.*?)(?:!|\.|$)', text, re.IGNORECASE)
+
+    # Pattern E: "Include exactly 1 Hero with Wolverine or Logan in its name"
+    include_exact_match = re.search(r'(?:Include|Use) exactly (\d+) Hero(?:es)? with (.*?) in (?:its|their) (?:Hero )?Name', text, re.IGNORECASE)
+
+    hero_req = None
+    if hero_inc_match:
+        word_map = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+        count_str = hero_inc_match.group(1).lower()
+        count = word_map.get(count_str, 0)
+        if count == 0 and count_str.isdigit(): count = int(count_str)
+        if count > 0: hero_req = {'name': hero_inc_match.group(2), 'count': count}
+    elif single_req_match:
+        # "Exactly one" implies count is 1
+        hero_req = {'name': single_req_match.group(1).strip(), 'count': 1}
+    elif use_as_match:
+        hero_req = {'name': use_as_match.group(1).strip(), 'count': 1}
+    elif comedic_match:
+        hero_req = {'name': comedic_match.group(1).strip(), 'count': 1}
+    elif include_exact_match:
+        hero_req = {'name': include_exact_match.group(2).strip(), 'count': int(include_exact_match.group(1))}
+
+    if hero_req:
+        steps.append({"op": "add", "field": "required_hero_deck_includes", "value": hero_req})
+
+    # --- 13. BYSTANDERS IN HERO DECK (NEW) ---
+    # 1. Default Rule: "24 Bystanders in the Hero Deck"
+    def_bys = re.search(r'(\d+)\s+Bystanders in the Hero Deck', text, re.IGNORECASE)
+    if def_bys:
+        mods['bystanders_in_hero_deck'] = int(def_bys.group(1))
+
+    # 2. Specific Override: "(1 player: 12 Bystanders...)"
+    spec_bys = re.search(r'\((\d+)\s+player:\s+(\d+)\s+Bystanders', text, re.IGNORECASE)
+    if spec_bys:
+        if player_count == int(spec_bys.group(1)):
+            mods['bystanders_in_hero_deck'] = int(spec_bys.group(2))
+
+    # --- 14. SIDEKICKS IN VILLAIN DECK (NEW) ---
+    # Matches: "Add 10 Sidekicks to the Villain Deck"
+    sidekick_match = re.search(r'Add (\d+) Sidekicks to the Villain Deck', text, re.IGNORECASE)
+    if sidekick_match:
+        mods['sidekicks_in_villain_deck'] = int(sidekick_match.group(1))
+
+    # --- 15. AMBITION CARDS (NEW) ---
+    # Matches: "Add 10 random Ambition cards to the Villain Deck"
+    ambition_match = re.search(r'Add (\d+) (?:random )?Ambition cards', text, re.IGNORECASE)
+    if ambition_match:
+        mods['ambitions_in_villain_deck'] = int(ambition_match.group(1))
+
+    # --- 16. OFFICERS IN VILLAIN DECK (NEW) ---
+    # Matches: "Add 12 S.H.I.E.L.D. Officers to the Villain Deck"
+    officer_match = re.search(r'Add (\d+) S\.H\.I\.E\.L\.D\. Officers to the Villain Deck', text, re.IGNORECASE)
+    if officer_match:
+        mods['officers_in_villain_deck'] = int(officer_match.group(1))
+
+    # --- 17. PLAYER PICKED HEROES (NEW) ---
+    # Matches: "Each player chooses a Hero to be part of the Hero Deck"
+    if re.search(r'Each player chooses a Hero to be part of the Hero Deck', text, re.IGNORECASE):
+        mods['player_picked_heroes'] = player_count
+
+    # --- 18. HERO TEAM REQUIREMENTS (FIXED) ---
+    # Pattern A: "Use at least 1 [spider-friends] Hero"
+    team_req_match = re.search(r'Use at least (\d+) \[?([a-zA-Z0-9\-\s]+)\]? Hero', text, re.IGNORECASE)
+
+    # Pattern B: "...including at least one [guardians-of-the-galaxy] Hero"
+    include_team_match = re.search(r'including at least (one|\d+) \[?([a-zA-Z0-9\-\s]+)\]? Hero', text, re.IGNORECASE)
+
+    if team_req_match:
+        count = int(team_req_match.group(1))
+        team_name = team_req_match.group(2).strip().lower()
+        mods['required_teams'].append({'team': team_name, 'count': count})
+
+    elif include_team_match:
+        count_str = include_team_match.group(1).lower()
+        count = 1 if count_str == 'one' else int(count_str)
+        team_name = include_team_match.group(2).strip().lower()
+        mods['required_teams'].append({'team': team_name, 'count': count})
+
+    # --- 18b. SPECIFIC TEAM COMPOSITION (House of M style) (FIXED) ---
+    # Matches: "Hero Deck is 4 [x-men] Heroes and 2 non- [x-men] Heroes"
+    split_team_match = re.search(r'Hero Deck is (\d+) \[?([a-zA-Z0-9\-\s]+)\]? Heroes and (\d+)', text, re.IGNORECASE)
+    if split_team_match:
+        count_team = int(split_team_match.group(1))
+        team_name = split_team_match.group(2).strip().lower()
+        count_other = int(split_team_match.group(3))
+
+        # 1. Update Total Hero Deck Count
+        mods['hero_deck_count'] = count_team + count_other
+
+        # 2. Add Team Requirement (Forces the 4 X-Men)
+        mods['required_teams'].append({'team': team_name, 'count': count_team})
+
+        # 3. Ban this team from the remaining slots (Ensures the other 2 are NON-X-Men)
+        mods['banned_teams_from_open_selection'].append(team_name)
+
+    # --- 19. HENCHMEN IN HERO DECK (NEW) ---
+    # Matches: "Add 6 extra Henchmen from a single Henchman Group to the Hero Deck"
+    hench_hero_match = re.search(r'Add (\d+) (?:extra )?Henchmen.*?to the Hero Deck', text, re.IGNORECASE)
+    if hench_hero_match:
+        mods['henchmen_in_hero_deck_count'] = int(hench_hero_match.group(1))
+
+    # --- 20. SET ASIDE VILLAIN GROUPS (NEW) ---
+    # Matches: "Set aside the 'Quantum Realm' Villain Group"
+    set_aside_match = re.search(r'Set aside (?:the )?[\"“\'](.+?)[\"“\”\'] Villain Group', text, re.IGNORECASE)
+    if set_aside_match:
+        steps.append({"op": "add", "field": "banned_villains", "value": set_aside_match.group(1).strip()})
+
+    # --- 21. TACTICS IN VILLAIN DECK (NEW) ---
+    # Matches: "Shuffle the Mastermind Tactics into the Villain Deck"
+    if re.search(r'Shuffle (?:the )?Mastermind Tactics into the Villain Deck', text, re.IGNORECASE):
+        mods['tactics_in_villain_deck'] = 4
+
+    # --- 22. QUANTUM AMBUSH SCHEME (NEW) ---
+    # Matches: "Shuffle its Ambush Scheme into the Villain Deck"
+    if re.search(r'Shuffle its Ambush Scheme into the Villain Deck', text, re.IGNORECASE):
+        mods['quantum_ambush_scheme'] = True
+
+    # --- 23. STACKED HENCHMEN (NEW) ---
+    # Matches: "Stack 2 Cops per player"
+    # Only banned at runtime if the name is actually a Henchman group (not e.g. "Twists").
+    stack_match = re.search(r'Stack \d+ (.*?) per player', text, re.IGNORECASE)
+    if stack_match:
+        steps.append({"op": "stack_henchmen", "name": stack_match.group(1).strip()})
+
+    # --- 24. DRAINED MASTERMIND (NEW) ---
+    # Matches: "Set aside a second 'Drained' Mastermind"
+    if re.search(r'Set aside a second [\"“\']Drained[\"“\”\'] Mastermind', text, re.IGNORECASE):
+        mods['drained_mastermind_required'] = True
+
+        # The rule usually says "Add its 'Always Leads' Villains as an extra Villain Group"
+        if re.search(r'Add its [\"“\']Always Leads[\"“\”\'] Villains as an extra Villain Group', text, re.IGNORECASE):
+            mods['extra_villains'] += 1
+
+    # --- 25. DOUBLE GROUPS / HALF CARDS (NEW) ---
+    # Matches: "Use double the normal number of Villain and Henchman Groups"
+    if re.search(r'Use double the normal number of Villain and Henchman Groups', text, re.IGNORECASE):
+        mods['double_group_count'] = True
+        mods['half_deck_mechanic'] = True
+
+    return mods, steps
+
+
+def _compile_mastermind_rules(text):
+    """Scheme rules that are applied while picking the Mastermind."""
+    rules = {"lurking": 0, "tyrants": 0, "twist_override": None}
+
+    # Lurking: "Put two additional Masterminds..."
+    lurking_match = re.search(r'Put (\w+) additional Masterminds', text, re.IGNORECASE)
+    if lurking_match:
+        word_map = {"one": 1, "two": 2, "three": 3, "four": 4}
+        count_str = lurking_match.group(1).lower()
+        count = word_map.get(count_str, 0)
+        if count == 0 and count_str.isdigit(): count = int(count_str)
+        rules['lurking'] = count
+
+    # Tyrants: "Choose 3 other Masterminds"
+    tyrant_match = re.search(r'Choose (\d+) other Masterminds', text, re.IGNORECASE)
+    if tyrant_match:
+        rules['tyrants'] = int(tyrant_match.group(1))
+
+    # Mastermind-specific Twists: "If using Lilith: Use 1 Twist total"
+    cond_twist_match = re.search(r'If using (.*?): Use (\d+) Twists? total', text, re.IGNORECASE)
+    if cond_twist_match:
+        rules['twist_override'] = {
+            "mastermind": cond_twist_match.group(1).strip(),
+            "twists": int(cond_twist_match.group(2))
+        }
+    return rules
+
+
+def compile_scheme_text(text):
+    """Compiles one Scheme description into its rule record."""
+    players = {}
+    steps = []
+    for p in SETUP_RULES:
+        # The steps never depend on the player count, so any pass will do
+        mods, steps = _compile_for_players(text, p)
+        # Only keep what differs from the baseline the randomizer starts with
+        defaults = default_scheme_mods(p)
+        players[p] = {k: v for k, v in mods.items() if v != defaults[k]}
+    return {
+        "players": players,
+        "steps": steps,
+        "masterminds": _compile_mastermind_rules(text)
+    }
+
+
+def scheme_text(scheme):
+    return " ".join(scheme.get('description', []))
+
+
+def _source_hash(path):
+    h = hashlib.sha256(f"v{COMPILER_VERSION}:".encode())
+    with open(path, 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def _from_json(records):
+    """JSON turns the player keys into strings and tuples into lists."""
+    for record in records.values():
+        players = {}
+        for p, mods in record['players'].items():
+            if mods.get('team_versus_counts'):
+                mods['team_versus_counts'] = tuple(mods['team_versus_counts'])
+            players[int(p)] = mods
+        record['players'] = players
+    return records
+
+
+def compile_schemes(source=SCHEMES_FILE, target=COMPILED_FILE):
+    """Offline compile step: rebuilds the rule cache for every Scheme."""
+    with open(source, 'r', encoding='utf-8') as f:
+        schemes = json.load(f)
+
+    records = {}
+    for scheme in schemes:
+        text = scheme_text(scheme)
+        if text not in records:
+            records[text] = compile_scheme_text(text)
+
+    payload = {"source_hash": _source_hash(source), "schemes": records}
+    try:
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+    except OSError as e:
+        logger.warning("Could not write %s: %s", target, e)
+    return records
+
+
+def load_compiled_schemes(source=SCHEMES_FILE, target=COMPILED_FILE):
+    """Returns the compiled records, recompiling if the cache is stale."""
+    if os.path.exists(target):
+        try:
+            with open(target, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('source_hash') == _source_hash(source):
+                return _from_json(payload['schemes'])
+        except (OSError, ValueError, KeyError):
+            pass
+    return compile_schemes(source, target)
+
+
+# Process-wide cache: {text: record}, reloaded when the Schemes file changes
+_compiled = {}
+_compiled_stamp = None
+
+
+def get_scheme_record(scheme):
+    """Looks up the compiled rule record for a Scheme object."""
+    global _compiled, _compiled_stamp
+    try:
+        info = os.stat(SCHEMES_FILE)
+        stamp = (info.st_mtime_ns, info.st_size)
+    except OSError:
+        stamp = None
+
+    if stamp and stamp != _compiled_stamp:
+        _compiled = load_compiled_schemes()
+        _compiled_stamp = stamp
+
+    text = scheme_text(scheme)
+    record = _compiled.get(text)
+    if record is None:
+        # Scheme not in the file (e.g. edited in memory) - compile on the fly
+        record = compile_scheme_text(text)
+        _compiled[text] = record
+    return record
+
+
+def scheme_requirements(record, player_count):
+    """Sidebar pre-analysis of a compiled record for one player count.
+
+    Returns the Villain / Henchman / Hero slot counts, the groups the rules
+    lock by name and the Hero slot constraints. "include" fragments are
+    returned unresolved since they depend on the selected expansions, each
+    with the number of Villain / Henchman / Hero names the rules list before
+    it, so a resolved name keeps its place in rule order. Steps that pick at
+    random (either/or, keyword groups, ...) lock nothing.
+    """
+    mods = default_scheme_mods(player_count)
+    mods.update(record['players'][player_count])
+    base = SETUP_RULES[player_count]
+
+    villains = base['villains'] + mods['extra_villains']
+    henchmen = base['henchmen'] + mods['extra_henchmen']
+    if mods['double_group_count']:
+        villains *= 2
+        henchmen *= 2
+
+    reqs = {
+        "villains": villains,
+        "henchmen": henchmen,
+        "heroes": mods['hero_deck_count'],
+        "required_villains": [],
+        "required_henchmen": [],
+        "includes": [],
+        "hero_constraints": [],
+    }
+    hero_includes = []
+    for step in record['steps']:
+        if step['op'] == 'include':
+            reqs['includes'].append({
+                "name": step['name'],
+                "villains": len(reqs['required_villains']),
+                "henchmen": len(reqs['required_henchmen']),
+                "heroes": sum(req.get('count', 1) for req in hero_includes),
+            })
+        elif step['op'] == 'add' and step['field'] in ('required_villains', 'required_henchmen'):
+            reqs[step['field']].append(step['value'])
+        elif step['op'] == 'add' and step['field'] == 'required_hero_deck_includes':
+            hero_includes.append(step['value'])
+
+    # One constraint per Hero slot, names first (as pick_heroes fills them)
+    for req in hero_includes:
+        reqs['hero_constraints'].extend({'type': 'name', 'val': req['name']} for _ in range(req.get('count', 1)))
+    for req in mods['required_teams']:
+        reqs['hero_constraints'].extend({'type': 'team', 'val': req['team']} for _ in range(req.get('count', 1)))
+    return reqs
+
+
+def requirements_table(record):
+    """{player_count: scheme_requirements()} of a compiled record."""
+    return {p: scheme_requirements(record, p) for p in SETUP_RULES}
+
+
+if __name__ == "__main__":
+    compiled = compile_schemes()
+    print(f"Compiled {len(compiled)} Schemes into {COMPILED_FILE}")
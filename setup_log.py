@@ -0,0 +1,65 @@
+"""Structured logging for the randomizer.
+
+Everything goes through the "legendary" logger with %-style arguments, so a
+message is only formatted when a handler actually emits it. Nothing reaches
+stdout/stderr unless configure() (or the host program) attaches a handler.
+
+Notable conditions are *events*: a stable name plus fields, e.g.
+    {"event": "heroes_matching_short", "name": "Avengers"}
+LegendaryRandomizer returns the events of a setup in result["events"] (this is
+what simulate.py counts) and logs each one with record.event / record.fields
+set, so a structured handler can pick them up. EventFilter drops or samples
+them by name.
+"""
+import logging
+import os
+import random
+
+logger = logging.getLogger("legendary")
+logger.addHandler(logging.NullHandler())
+
+# Level used by configure() when none is given, e.g. LEGENDARY_LOG_LEVEL=DEBUG
+LEVEL_ENV = "LEGENDARY_LOG_LEVEL"
+
+
+class EventFilter(logging.Filter):
+    """Drops disabled events and keeps a random sample of the others.
+
+    Plain log records (no event name) always pass.
+    """
+
+    def __init__(self, disabled=(), sample_rate=1.0):
+        super().__init__()
+        self.disabled = set(disabled)
+        self.sample_rate = sample_rate
+        self._rng = random.Random()
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        if event is None: return True
+        if event in self.disabled: return False
+        return self.sample_rate >= 1 or self._rng.random() < self.sample_rate
+
+
+def event(level, name, msg, **fields):
+    """Logs an event; msg may use the fields, e.g. "Not enough '%(keyword)s'"."""
+    if logger.isEnabledFor(level):
+        args = (fields,) if fields else ()
+        logger.log(level, msg, *args, extra={"event": name, "fields": fields})
+
+
+def configure(level=None, disabled=(), sample_rate=1.0):
+    """Attaches one stderr handler (safe to call on every Streamlit rerun)."""
+    level = level or os.environ.get(LEVEL_ENV, "WARNING")
+    logger.setLevel(level)
+    for handler in logger.handlers:
+        if getattr(handler, '_legendary', False):
+            handler.filters = [EventFilter(disabled, sample_rate)]
+            return handler
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(EventFilter(disabled, sample_rate))
+    handler._legendary = True
+    logger.addHandler(handler)
+    return handler
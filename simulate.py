@@ -0,0 +1,182 @@
+"""Monte Carlo fairness audit for the randomizer.
+
+Runs many generate_setup calls across a process pool and aggregates them into
+frequency tables:
+
+  - hero / villain group / mastermind appearance rates (share of setups)
+  - per player count: distributions of Scheme Twists, Bystanders and Hero
+    Deck size, plus the share of setups that raised a warning event
+  - warning event rates (by event name, see setup_log.py) and failed setups
+
+The work is cut into chunks; every chunk gets its own seed derived from the
+run seed, and every setup a seed drawn from its chunk's RNG, so a report is
+reproducible whatever the number of workers.
+Each worker loads the shared catalog once (under fork it is inherited from
+the parent, which loads it before the pool starts).
+
+Usage: python simulate.py --runs 100000 [--players 1 2 3 4 5]
+                          [--sets "Core Set" ...] [--workers N] [--seed S]
+                          [--out report.json]
+"""
+import argparse
+import json
+import multiprocessing
+import random
+from collections import Counter
+
+import catalog
+from app import SEED_RANGE, LegendaryRandomizer
+
+CHUNK_SIZE = 250
+
+
+def _init_worker():
+    # Decode the card files once per worker (a no-op if inherited via fork)
+    catalog.get_catalog()
+
+
+def _label(obj, name_key):
+    return f"{obj[name_key]} ({obj['set']})"
+
+
+def _empty_tally():
+    return {
+        "runs": 0, "failed": 0, "warned": 0,
+        "heroes": Counter(), "villains": Counter(), "masterminds": Counter(),
+        "twists": Counter(), "bystanders": Counter(), "hero_deck": Counter(),
+        "warnings": Counter(), "errors": Counter(),
+    }
+
+
+def _merge(total, part):
+    for key, value in part.items():
+        total[key] += value
+
+
+def run_chunk(task):
+    """Generates one chunk of setups with its own seed and tallies them."""
+    user_sets, player_count, runs, seed = task
+    seeds = random.Random(seed)
+    tally = _empty_tally()
+
+    randomizer = LegendaryRandomizer(user_sets, player_count)
+    if not randomizer.load_data():
+        tally["runs"] = tally["failed"] = runs
+        tally["errors"]["load_data"] = runs
+        return player_count, tally
+
+    for _ in range(runs):
+        tally["runs"] += 1
+        try:
+            result = randomizer.generate_setup(seeds.randrange(SEED_RANGE))
+        except Exception as e:
+            tally["failed"] += 1
+            tally["errors"][type(e).__name__] += 1
+            continue
+        if not result:
+            tally["failed"] += 1
+            tally["errors"]["no_result"] += 1
+            continue
+
+        setup = randomizer.setup
+        tally["masterminds"][_label(setup['mastermind'], 'name')] += 1
+        for v in setup['villains']:
+            tally["villains"][_label(v, 'group_name')] += 1
+        heroes = [h for h in setup['heroes'] if not h.get('is_placeholder')]
+        for h in heroes:
+            tally["heroes"][_label(h, 'hero')] += 1
+
+        tally["twists"][str(randomizer.scheme_mods['twists'])] += 1
+        tally["bystanders"][str(result['Villain_Deck_Setup']['Bystanders'])] += 1
+        tally["hero_deck"][str(len(setup['heroes']))] += 1
+
+        warnings = [e['event'] for e in result['events']]
+        if warnings: tally["warned"] += 1
+        tally["warnings"].update(set(warnings))
+
+    return player_count, tally
+
+
+def _tasks(user_sets, runs, players, seed):
+    seeder = random.Random(seed)
+    tasks = []
+    for p in players:
+        remaining = runs
+        while remaining > 0:
+            size = min(CHUNK_SIZE, remaining)
+            tasks.append((user_sets, p, size, seeder.getrandbits(64)))
+            remaining -= size
+    return tasks
+
+
+def _rates(counter, runs):
+    # Most frequent first; ties by name so reports diff cleanly
+    ordered = sorted(counter.items(), key=lambda kv: (-kv[1], kv[0]))
+    return {k: round(n / runs, 6) for k, n in ordered} if runs else {}
+
+
+def _distribution(counter):
+    return {k: counter[k] for k in sorted(counter, key=lambda k: (len(k), k))}
+
+
+def simulate(user_sets=None, runs=1000, players=(1, 2, 3, 4, 5), workers=None, seed=0):
+    """Runs `runs` setups per player count and returns the frequency report."""
+    shared = catalog.get_catalog()
+    if user_sets is None: user_sets = sorted(shared.all_sets)
+    tasks = _tasks(list(user_sets), runs, players, seed)
+
+    per_player = {p: _empty_tally() for p in players}
+    if workers == 1:
+        results = map(run_chunk, tasks)
+        for p, tally in results: _merge(per_player[p], tally)
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+            for p, tally in pool.imap_unordered(run_chunk, tasks):
+                _merge(per_player[p], tally)
+
+    overall = _empty_tally()
+    for tally in per_player.values(): _merge(overall, tally)
+    done = overall["runs"] - overall["failed"]
+
+    return {
+        "seed": seed,
+        "sets": sorted(user_sets),
+        "runs": overall["runs"],
+        "failed": overall["failed"],
+        "errors": dict(overall["errors"]),
+        "warning_rate": round(overall["warned"] / done, 6) if done else 0,
+        "warnings": _rates(overall["warnings"], done),
+        "heroes": _rates(overall["heroes"], done),
+        "villains": _rates(overall["villains"], done),
+        "masterminds": _rates(overall["masterminds"], done),
+        "players": {
+            p: {
+                "runs": t["runs"],
+                "failed": t["failed"],
+                "warning_rate": round(t["warned"] / (t["runs"] - t["failed"]), 6) if t["runs"] > t["failed"] else 0,
+                "twists": _distribution(t["twists"]),
+                "bystanders": _distribution(t["bystanders"]),
+                "hero_deck": _distribution(t["hero_deck"]),
+            }
+            for p, t in per_player.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo audit of the Legendary randomizer")
+    parser.add_argument("--runs", type=int, default=1000, help="setups per player count")
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--sets", nargs="+", default=None, help="expansions (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = simulate(args.sets, args.runs, args.players, args.workers, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text)
+        print(f"Simulated {report['runs']} setups ({report['failed']} failed) -> {args.out}")
+    else:
+        print(text)
@@ -0,0 +1,203 @@
+import random
+import re
+
+import pytest
+
+import app
+import catalog
+import scheme_rules
+
+SETS = ["Core Set", "X-Men", "Civil War", "Dark City"]
+
+
+def _in_sets(item, sets):
+    wanted = {s.lower() for s in sets}
+    return any(s.strip().lower() in wanted for s in (item.get('set') or '').split('/'))
+
+
+def _fragments(names, seed=0):
+    """Whole names and pieces of them, as the Scheme rules and the sidebar ask for."""
+    rng = random.Random(seed)
+    queries = {"", "x", "zz", "no such name at all"}
+    for name in names:
+        if not name: continue
+        words = name.split()
+        queries.update({name, name.upper(), name + "s", words[0], words[-1], name[:2], name[-4:]})
+        # Typos: each word loses its last letter
+        queries.add(" ".join(w[:-1] if len(w) > 3 else w for w in words))
+        start = rng.randrange(len(name))
+        queries.add(name[start:start + rng.randint(1, 8)])
+    return sorted(queries)
+
+
+def _word_match(name, query):
+    """The linear typo-tolerant match of the baseline's "Always include" rule."""
+    q_words = [w for w in re.findall(r'\w+', query.lower()) if len(w) > 2]
+    if not q_words: return False
+    return sum(1 for w in q_words if w in name) >= len(q_words) * 0.75
+
+
+@pytest.mark.parametrize("key", sorted(catalog.DATA_FILES))
+def test_name_index_matches_linear_scans(shared, key):
+    index = shared.names[key]
+    lower = [(n or '').lower() for n in index.raw]
+    for query in _fragments(index.raw):
+        q = query.lower()
+        assert index.equal(query) == [pos for pos, n in enumerate(lower) if n == q], query
+        assert index.containing(query) == [pos for pos, n in enumerate(lower) if q in n], query
+        assert index.word_match(query) == [pos for pos, n in enumerate(lower) if _word_match(n, query)], query
+
+    for scheme in shared.data['schemes']:
+        text = " ".join(scheme.get('description', [])).lower()
+        assert index.contained_in(text) == [pos for pos, n in enumerate(lower) if n in text]
+
+
+@pytest.mark.parametrize("key", ["henchmen", "villains", "heroes"])
+def test_catalog_lookups_pick_what_the_linear_scans_picked(shared, key):
+    mask = shared.selection_mask(SETS)
+    items = [item for item in shared.data[key] if _in_sets(item, SETS)]
+
+    def name(item):
+        return catalog.item_name(key, item).lower()
+
+    for query in _fragments([catalog.item_name(key, item) for item in items], seed=1):
+        q = query.lower()
+        # _find_group_by_name / _find_hero_by_name: exact name, then the first containing it
+        if key == 'heroes':
+            expected = next((i for i in items if name(i) == q), None) or next((i for i in items if q in name(i)), None)
+            assert shared.find_hero(query, mask) is expected, query
+        # "Always include": the first substring or word match
+        expected = next((i for i in items if q in name(i) or _word_match(name(i), query)), None)
+        assert shared.find_fuzzy(key, query, mask) is expected, query
+
+
+def _baseline_score(hero, deck, mechanics, class_needs, team_needs):
+    """score_hero of the baseline on the raw Hero dicts, without the random noise."""
+    def team(h):
+        return (h['cards'][0].get('team') if h.get('cards') else None) or 'Unknown'
+
+    def cost(card):
+        digits = re.search(r'\d+', str(card['cost']))
+        return int(digits.group(0)) if digits else 0
+
+    def needs(text):
+        return {cls for cls in catalog.STANDARD_CLASSES if f"[{cls}]" in text}
+
+    blob = "".join(" ".join(c.get('abilities', [])).lower() + " " for c in hero['cards'])
+    costs = [cost(c) for c in hero['cards'] if c.get('cost')]
+    score = 0
+
+    # A. Mechanic synergy
+    flags = {
+        "wound": "wound" in blob or "heal" in blob,
+        "rescue": "bystander" in blob or "rescue" in blob,
+        "artifact": "artifact" in blob,
+        "ko": "ko " in blob,
+        "graveyard": "ko pile" in blob or "discard pile" in blob,
+    }
+    score += sum(points for flag, points in mechanics.items() if flags[flag])
+
+    # B. Curve balancing
+    deck = [h for h in deck if not h.get('is_placeholder')]
+    deck_costs = [cost(c) for h in deck for c in h.get('cards', []) if c.get('cost')]
+    deck_avg = sum(deck_costs) / len(deck_costs) if deck_costs else 0
+    cand_avg = sum(costs) / len(costs) if costs else 0
+    if not deck_costs:
+        if 3.5 <= cand_avg <= 4.5: score += 2
+    elif deck_avg > 4.2:
+        if cand_avg < 3.5: score += 4
+        elif cand_avg > 4.5: score -= 2
+    elif deck_avg < 3.0:
+        if cand_avg > 4.0: score += 3
+    elif 3.0 <= cand_avg <= 4.0:
+        score += 1
+
+    # Enemy counters
+    cand_classes = {cls.lower() for c in hero['cards'] for cls in c.get('classes', [])}
+    if cand_classes & class_needs: score += 3
+    my_team = team(hero)
+    if my_team != 'Unknown' and my_team.replace('-', ' ').title().replace(' ', '').lower() in team_needs:
+        score += 3
+
+    # C. Conditional team synergy
+    if my_team.lower() != 'unknown' and my_team.lower() in [team(h) for h in deck]:
+        score += 4 if f"[{my_team.lower()}]" in blob else 0.5
+
+    # D. Class synergy
+    deck_classes = {cls.lower() for h in deck for c in h.get('cards', []) for cls in c.get('classes', [])}
+    deck_needs = set().union(*(needs(" ".join(c.get('abilities', [])).lower()) for h in deck for c in h.get('cards', [])))
+    triggers_deck = cand_classes & deck_needs
+    triggered_by_deck = needs(blob) & deck_classes
+    score += 3 * bool(triggers_deck) + 3 * bool(triggered_by_deck)
+    if not triggers_deck and not triggered_by_deck and cand_classes & deck_classes:
+        score += 1
+    return score
+
+
+def test_hero_matrix_scores_like_the_baseline_scorer(shared):
+    heroes = list(shared.data['heroes'])
+    rows = shared.hero_rows(heroes)
+    teams = sorted(set(shared.hero_matrix.team_key_ids) | {"nosuchteam"})
+    rng = random.Random(7)
+    for _ in range(60):
+        deck = rng.sample(heroes, rng.randint(0, 5))
+        if rng.random() < 0.3:
+            deck.append({"hero": "Player Pick", "is_placeholder": True})
+        mechanics = {flag: points for flag, points in app.MECHANIC_POINTS.items() if rng.random() < 0.4}
+        class_needs = set(rng.sample(catalog.STANDARD_CLASSES, rng.randint(0, 2)))
+        team_needs = set(rng.sample(teams, rng.randint(0, 2)))
+
+        state = app.DeckState(shared.hero_features)
+        state.extend(deck)
+        scores = shared.hero_matrix.score(rows, state, mechanics, class_needs, team_needs)
+        expected = [_baseline_score(h, deck, mechanics, class_needs, team_needs) for h in heroes]
+        assert scores.tolist() == expected
+
+
+def _card_abilities(item):
+    return [card.get('abilities', []) for card in item.get('cards', [])]
+
+
+def test_ability_index_matches_the_scheme_keyword_scans(shared):
+    # The baseline scanned every card: the keyword Villain Group rule ignoring
+    # case, Shrink Tech for "Size-Changing" as written
+    records = [scheme_rules.get_scheme_record(s) for s in shared.data['schemes']]
+    keywords = {step['keyword'] for r in records for step in r['steps'] if step['op'] == 'keyword_villains'}
+    assert keywords
+
+    villains = shared.data['villains']
+    for keyword in keywords:
+        expected = [pos for pos, group in enumerate(villains)
+                    if any(keyword.lower() in a.lower() for abilities in _card_abilities(group) for a in abilities)]
+        assert shared.abilities('villains').containing(keyword) == expected, keyword
+
+    heroes = shared.data['heroes']
+    expected = [pos for pos, hero in enumerate(heroes)
+                if any("Size-Changing" in a for abilities in _card_abilities(hero) for a in abilities)]
+    assert expected
+    assert shared.abilities('heroes').containing("Size-Changing") == expected
+
+
+@pytest.mark.parametrize("key", ["heroes", "villains"])
+def test_ability_index_matches_a_token_scan(shared, key):
+    items = shared.data[key]
+    cards = [(pos, ci, [catalog.ability_tokens(a) for a in abilities])
+             for pos, item in enumerate(items) for ci, abilities in enumerate(_card_abilities(item))]
+
+    # Phrases of one to three tokens taken from the ability text, plus misses
+    rng = random.Random(3)
+    phrases = {"", "no-such-keyword", "Size-Changing", "rise of the living dead"}
+    for _ in range(150):
+        _, _, abilities = rng.choice(cards)
+        tokens = [t for a in abilities for t in a]
+        if not tokens: continue
+        start = rng.randrange(len(tokens))
+        phrases.add(" ".join(tokens[start:start + rng.randint(1, 3)]).upper())
+
+    index = shared.abilities(key)
+    for phrase in sorted(phrases):
+        needle = catalog.ability_tokens(phrase)
+        n = len(needle)
+        expected = tuple((pos, ci) for pos, ci, abilities in cards
+                         if needle and any(a[i:i + n] == needle for a in abilities for i in range(len(a))))
+        assert index.cards_with(phrase) == expected, phrase
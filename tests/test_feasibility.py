@@ -0,0 +1,48 @@
+import catalog
+
+
+def _unavailable(shared, sets, key='schemes', players=3):
+    return shared.selection(shared.selection_mask(sets)).unavailable(key, players)
+
+
+def test_scheme_missing_required_group(shared):
+    # "Kree-Skrull War" needs the Skrulls, which are not in Guardians of the Galaxy
+    alone = _unavailable(shared, ["Guardians of the Galaxy"])
+    assert "'Skrull'" in alone["Kree-Skrull War, The"]
+    assert "Kree-Skrull War, The" not in _unavailable(shared, ["Guardians of the Galaxy", "Core Set"])
+
+
+def test_scheme_missing_required_henchmen(shared):
+    alone = _unavailable(shared, ["X-Men"])
+    assert alone["Mutant-Hunting Super Sentinels"] == ["Henchman Group 'Sentinels'"]
+    assert "Mutant-Hunting Super Sentinels" not in _unavailable(shared, ["X-Men", "Core Set"])
+
+
+def test_versus_scheme_needs_two_teams(shared):
+    assert _unavailable(shared, ["Civil War"])["Avengers vs. X-Men"] == ["3 and 3 Heroes of two Teams"]
+    assert "Avengers vs. X-Men" not in _unavailable(shared, ["Civil War", "Core Set"])
+
+
+def test_problems_of_one_item(shared):
+    scheme = next(s for s in shared.items('schemes') if s['name'] == "Avengers vs. X-Men")
+    assert shared.problems('schemes', scheme, 3, shared.selection_mask(["Civil War"]))
+    assert shared.problems('schemes', scheme, 3, shared.selection_mask(["Civil War", "Core Set"])) == []
+
+
+def _hero(name, team, item_set):
+    return {"hero": name, "set": item_set, "cards": [{"cost": "3", "team": team, "classes": ["Tech"], "abilities": []}]}
+
+
+def test_mastermind_missing_its_group():
+    heroes = [_hero(f"Hero {i}", "avengers", "Base") for i in range(6)]
+    villains = [{"group_name": "Base Villains", "set": "Base", "cards": []},
+                {"group_name": "Doombots", "set": "Extra", "cards": []}]
+    henchmen = [{"name": "Base Henchmen", "set": "Base"}]
+    masterminds = [{"name": "Doctor Doom", "set": "Base", "always_leads": "Doombots"},
+                   {"name": "Plain Boss", "set": "Base", "always_leads": "Base Villains"}]
+    data = {"heroes": heroes, "villains": villains, "henchmen": henchmen, "masterminds": masterminds, "schemes": []}
+    small = catalog.Catalog(data, [], None)
+
+    base = small.selection(small.selection_mask(["Base"])).unavailable('masterminds', 2)
+    assert base == {"Doctor Doom": ["'Doombots', the group it always leads"]}
+    assert small.selection(small.selection_mask(["Base", "Extra"])).unavailable('masterminds', 2) == {}
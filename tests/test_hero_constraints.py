@@ -0,0 +1,96 @@
+import collections
+import random
+
+import hero_constraints
+from hero_constraints import AT_LEAST, EXACT, Constraint, Problem
+
+
+def _meets(chosen, constraints):
+    for c in constraints:
+        n = sum(1 for pos in chosen if pos in c.members)
+        if n < c.need or (c.kind == EXACT and n != c.need): return False
+    return True
+
+
+def test_infeasible_problem_falls_back_to_best_effort():
+    # Two "Hulk" Heroes exist, three are needed
+    hulk = Constraint("3 Heroes with 'Hulk'", EXACT, {0, 1}, 3)
+    team = Constraint("1 [x-men] Hero", AT_LEAST, {5, 6}, 1)
+    problem = Problem([hulk, team], capacity=5, open_members=range(10))
+    assert not problem.feasible
+    assert problem.sample(random.Random(1)) is None
+    assert hero_constraints.choose([problem], random.Random(1)) == (None, None)
+
+    chosen = hero_constraints.best_effort([hulk, team], 5, random.Random(1))
+    assert set(chosen) >= {0, 1}
+    assert len(set(chosen) & {5, 6}) == 1
+    assert len(chosen) == 3
+
+
+def test_capacity_makes_problem_infeasible():
+    a = Constraint("2 [avengers] Heroes", AT_LEAST, {0, 1, 2}, 2)
+    b = Constraint("2 [x-men] Heroes", AT_LEAST, {3, 4, 5}, 2)
+    assert not Problem([a, b], capacity=3, open_members=range(10)).feasible
+    assert Problem([a, b], capacity=4, open_members=range(10)).feasible
+
+
+def test_versus_alternatives():
+    # Three teams; one alternative per ordered pair, "exactly 3 of one, 3 of another"
+    teams = {"avengers": {0, 1, 2, 3}, "x-men": {4, 5, 6}, "shield": {7, 8}}
+    problems = []
+    for a, members_a in teams.items():
+        for b, members_b in teams.items():
+            if a == b or len(members_a) < 3 or len(members_b) < 3: continue
+            problems.append(Problem([Constraint(a, EXACT, members_a, 3), Constraint(b, EXACT, members_b, 3)],
+                                    capacity=6, open_members=range(9)))
+    assert len(problems) == 2  # shield has too few Heroes
+
+    rng = random.Random(3)
+    for _ in range(50):
+        index, chosen = hero_constraints.choose(problems, rng)
+        assert index is not None
+        assert len(chosen) == 6
+        counts = collections.Counter(t for pos in chosen for t, m in teams.items() if pos in m)
+        assert counts == {"avengers": 3, "x-men": 3}
+
+
+def test_at_least_constraints_spanning_teams():
+    # Hero 2 is on both teams, so a single Hero can meet both constraints
+    avengers = Constraint("1 [avengers] Hero", AT_LEAST, {0, 1, 2}, 1)
+    xmen = Constraint("1 [x-men] Hero", AT_LEAST, {2, 3, 4}, 1)
+    problem = Problem([avengers, xmen], capacity=2, open_members=range(10))
+    assert problem.feasible
+
+    seen = set()
+    rng = random.Random(5)
+    for _ in range(300):
+        chosen = problem.sample(rng)
+        assert _meets(chosen, [avengers, xmen])
+        seen.add(tuple(chosen))
+    # Irredundant solutions: {2} alone, or one of {0, 1} with one of {3, 4}
+    assert seen == {(2,), (0, 3), (0, 4), (1, 3), (1, 4)}
+
+    # With one slot only the shared Hero works
+    only = Problem([avengers, xmen], capacity=1, open_members=range(10))
+    assert only.total == 1
+    assert only.sample(rng) == [2]
+
+
+def test_reserve_is_left_open():
+    team = Constraint("2 [x-men] Heroes", AT_LEAST, {0, 1, 2}, 2)
+    # 5 open Heroes, 2 slots left after the constraint, 3 reserved for the Villain Deck
+    assert Problem([team], capacity=4, open_members=range(5), reserve=1).feasible
+    assert not Problem([team], capacity=4, open_members={0, 1, 2, 3}, reserve=3).feasible
+
+
+def test_same_seed_same_solution():
+    hulk = Constraint("2 Heroes with 'Hulk'", EXACT, {0, 1, 2, 3}, 2)
+    team = Constraint("1 [avengers] Hero", AT_LEAST, {3, 4, 5, 6}, 1)
+
+    def draw(seed):
+        rng = random.Random(seed)
+        problem = Problem([hulk, team], capacity=5, open_members=range(20))
+        return [problem.sample(rng) for _ in range(20)]
+
+    assert draw(42) == draw(42)
+    assert draw(42) != draw(43)
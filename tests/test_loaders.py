@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import binary_catalog
+import catalog
+
+
+@pytest.fixture(scope="module")
+def json_data():
+    data = {}
+    for key, filename in catalog.DATA_FILES.items():
+        with open(filename, 'r', encoding='utf-8') as f:
+            data[key] = json.load(f)
+    return data
+
+
+def _same_catalog(a, b):
+    assert a.all_sets == b.all_sets
+    assert a.set_bits == b.set_bits
+    assert a.set_masks == b.set_masks
+    for key in a.data:
+        assert list(a.data[key]) == list(b.data[key])
+        assert a.names[key].raw == b.names[key].raw
+    assert a.hero_teams == b.hero_teams
+
+
+def _in_sets(item, sets):
+    wanted = {s.lower() for s in sets}
+    return any(s.strip().lower() in wanted for s in (item.get('set') or '').split('/'))
+
+
+def test_all_sets_match_json(json_data):
+    reference = catalog.Catalog(json_data, [], catalog._file_stamp())
+    _same_catalog(reference, catalog.load_catalog(sets=reference.all_sets))
+
+
+def test_some_sets_match_filtered_json(json_data):
+    sets = ["Core Set", "X-Men", "Civil War"]
+    selected = catalog.load_catalog(sets=sets)
+    for key, items in json_data.items():
+        assert list(selected.data[key]) == [item for item in items if _in_sets(item, sets)]
+
+
+def test_binary_matches_json(json_data, tmp_path):
+    stamp = catalog._file_stamp()
+    path = str(tmp_path / "catalog.bin")
+    binary_catalog.build(json_data, stamp, path)
+
+    lazy = binary_catalog.load(stamp, path)
+    assert lazy is not None
+    for key, items in json_data.items():
+        assert lazy[key].column('set') == [item.get('set') for item in items]
+        assert list(lazy[key]) == items
+
+    reference = catalog.Catalog(json_data, [], stamp)
+    _same_catalog(reference, catalog.Catalog(binary_catalog.load(stamp, path), [], stamp))
+
+
+def test_binary_catalog_decodes_on_first_use(json_data, tmp_path):
+    stamp = catalog._file_stamp()
+    path = str(tmp_path / "catalog.bin")
+    binary_catalog.build(json_data, stamp, path)
+
+    lazy = catalog.Catalog(binary_catalog.load(stamp, path), [], stamp)
+    assert not any(items.positions for items in lazy.data.values())
+
+    core = lazy.selection(lazy.selection_mask(["Core Set"]))
+    lazy.hero_rows(core.data['heroes'])
+    assert len(lazy.data['heroes'].positions) == len(core.data['heroes']) < len(json_data['heroes'])
+
+    reference = catalog.Catalog(json_data, [], stamp)
+    for scheme, expected in zip(lazy.items('schemes'), reference.items('schemes')):
+        assert lazy.requirements(scheme, 3) == reference.requirements(expected, 3)
+
+
+def test_binary_ignored_when_stale(json_data, tmp_path):
+    stamp = catalog._file_stamp()
+    path = str(tmp_path / "catalog.bin")
+    binary_catalog.build(json_data, stamp, path)
+    stale = tuple((entry[0] + 1, entry[1]) if entry else None for entry in stamp)
+    assert binary_catalog.load(stale, path) is None
@@ -0,0 +1,73 @@
+import concurrent.futures
+import threading
+
+import pytest
+
+import app
+import catalog
+
+SETS = ["Core Set", "X-Men"]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-thread prefetch pool whose first job holds it until released."""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+    monkeypatch.setattr(app, "prefetch_pool", executor)
+    yield release
+    release.set()
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def setup_cache(monkeypatch):
+    cache = catalog.ResultCache(maxsize=8)
+    monkeypatch.setattr(catalog, "setup_cache", cache)
+    return cache
+
+
+def test_rerolls_are_served_from_the_queue(shared, pool, setup_cache):
+    prefetch = app.SetupPrefetcher(depth=3)
+    prefetch.configure(SETS, 3, {})
+    prefetch.fill()
+    seeds = [seed for seed, _ in prefetch.queue]
+    pool.set()
+
+    served = [prefetch.next() for _ in range(3)]
+    assert [s['Seed'] for s in served] == seeds
+    assert prefetch.next() is None
+    # The same request + seed is now a cache hit with the same setup
+    assert app.generate_cached_setup(SETS, 3, {}, seeds[0]) == served[0]
+
+
+def test_configuration_change_cancels_the_queue(shared, pool, setup_cache):
+    prefetch = app.SetupPrefetcher(depth=3)
+    prefetch.configure(SETS, 3, {})
+    prefetch.fill()
+    futures = [future for _, future in prefetch.queue]
+
+    prefetch.configure(SETS, 4, {})
+    assert all(future.cancelled() for future in futures)
+    assert prefetch.next() is None
+
+    # Same configuration again: the queue is kept
+    prefetch.fill()
+    queued = list(prefetch.queue)
+    prefetch.configure(SETS, 4, {'scheme': "Random"})
+    assert list(prefetch.queue) == queued
+
+
+def test_prefetched_setups_stay_out_of_the_cache(shared, pool, setup_cache):
+    prefetch = app.SetupPrefetcher(depth=3)
+    prefetch.configure(SETS, 3, {})
+    for _ in range(4):
+        prefetch.fill()
+        assert len(prefetch.queue) == 3
+    pool.set()
+    concurrent.futures.wait([future for _, future in prefetch.queue])
+    assert len(setup_cache) == 0
+
+    prefetch.next()
+    assert len(setup_cache) == 1
@@ -0,0 +1,118 @@
+import collections
+
+import pytest
+
+import scheme_rules
+from app import LegendaryRandomizer
+
+
+def _scheme(shared, name):
+    return next(s for s in shared.items('schemes') if s['name'] == name)
+
+
+@pytest.mark.parametrize("players", [1, 2, 3, 4, 5])
+def test_versus_scheme_deals_three_and_three(shared, players):
+    scheme = _scheme(shared, "Avengers vs. X-Men")
+    reqs = scheme_rules.scheme_requirements(scheme_rules.get_scheme_record(scheme), players)
+    assert reqs['heroes'] == 6
+
+    randomizer = LegendaryRandomizer(shared.all_sets, players, {'scheme': "Avengers vs. X-Men"}, seed=players)
+    result = randomizer.generate_setup()
+    assert "hero_constraints_infeasible" not in [e['event'] for e in result['events']]
+
+    teams = collections.Counter(shared.hero_features(h).team for h in randomizer.setup['heroes'])
+    assert sorted(teams.values()) == [3, 3]
+
+
+def test_cached_setups_are_copies(shared):
+    import app
+    first = app.generate_cached_setup(shared.all_sets, 3, {}, seed=11)
+    first['Heroes'].append("edited")
+    second = app.generate_cached_setup(shared.all_sets, 3, {}, seed=11)
+    assert "edited" not in second['Heroes']
+    assert second['Seed'] == first['Seed']
+
+
+def test_models_built_once_across_threads():
+    import concurrent.futures
+    import catalog
+
+    fresh = catalog.load_catalog()
+    villains = list(fresh.items('villains'))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        runs = list(pool.map(lambda _: [id(fresh.model(v)) for v in villains], range(8)))
+    assert all(run == runs[0] for run in runs)
+
+
+def test_optimizer_returns_within_budget(shared):
+    randomizer = LegendaryRandomizer(shared.all_sets, 3, {'optimize_ms': 30}, seed=5)
+    result = randomizer.generate_setup()
+    span = next(s for s in result['timings'] if s['phase'] == "optimize_heroes")
+    assert span['steps'] > 0
+    # The deadline is checked before every step, and a step takes ~1 ms
+    assert span['ms'] < 30 + 20
+
+
+def test_optimizer_same_seed_same_deck(shared):
+    # With a step cap that runs out well before the time budget
+    def deal(seed):
+        randomizer = LegendaryRandomizer(shared.all_sets, 3, {'optimize_ms': 10_000, 'optimize_steps': 40}, seed=seed)
+        result = randomizer.generate_setup()
+        span = next(s for s in result['timings'] if s['phase'] == "optimize_heroes")
+        return result['Heroes'], span['steps'], span['best_score']
+
+    first = deal(21)
+    assert first[1] == 40
+    assert deal(21) == first
+
+
+def test_hero_picks_vary_like_the_baseline(shared):
+    # The baseline picked the best of 10 random Heroes, and no Hero made it
+    # into more than ~10% of 3-player setups; scoring the whole pool and
+    # taking the best made a few Heroes appear in half of them.
+    randomizer = LegendaryRandomizer(shared.all_sets, 3)
+    randomizer.load_data()
+    runs = 200
+    picks = collections.Counter()
+    for seed in range(runs):
+        randomizer.generate_setup(seed)
+        picks.update(h['hero'] for h in randomizer.setup['heroes'] if not h.get('is_placeholder'))
+    assert picks.most_common(1)[0][1] / runs < 0.2
+
+
+def test_ui_labels_resolve_to_the_listed_items(shared):
+    randomizer = LegendaryRandomizer(shared.all_sets, 3)
+    randomizer.load_data()
+    heroes = randomizer.data['heroes']
+    selection = shared.selection(randomizer.set_mask)
+    for label, hero in selection.labeled['heroes'].items():
+        if '(' in hero['hero']: continue  # e.g. "Captain America (Falcon)" reads as a set suffix
+        assert randomizer._find_by_ui_name(label, heroes, 'hero') is hero
+    # Items are matched by identity, not by comparing the dicts
+    copies = [dict(h) for h in heroes]
+    assert randomizer._find_by_ui_name(selection.options['heroes'][1], copies, 'hero') is None
+
+
+def test_batch_scores_match_score_hero(shared, monkeypatch):
+    # Every pick's best batch score must be what score_hero logs for the winner
+    best = []
+    score = type(shared.hero_matrix).score
+
+    def recording(self, *args):
+        scores = score(self, *args)
+        best.append(round(float(scores.max()), 2))
+        return scores
+
+    monkeypatch.setattr(type(shared.hero_matrix), "score", recording)
+    checked = 0
+    for players in (1, 3, 5):
+        randomizer = LegendaryRandomizer(shared.all_sets, players)
+        randomizer.load_data()
+        for seed in range(40):
+            del best[:]
+            randomizer.generate_setup(seed)
+            logged = [log['score'] for log in randomizer.setup['synergy_logs']
+                      if log['reasons'] != ["Random Seed (Variety)"]]
+            assert logged == best
+            checked += len(best)
+    assert checked > 300
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+import app
+import scheme_rules
+
+BASELINE_MODS = os.path.join(os.path.dirname(__file__), "data", "baseline_scheme_mods.json")
+
+# Fixed on purpose since the baseline parser: "3 Heroes of one Team and 3
+# Heroes of another" sized the Hero Deck to 3 instead of 6
+CHANGED = {"Avengers vs. X-Men (Civil War)": {"hero_deck_count": 6}}
+
+
+class FirstPick:
+    """Stands in for the randomizer's RNG: every random pick takes the first candidates."""
+
+    def choice(self, seq):
+        return seq[0]
+
+    def sample(self, seq, k):
+        return list(seq)[:k]
+
+
+def _plain(value):
+    """Heroes / Henchmen objects by name, tuples as lists, as stored in the fixture."""
+    if isinstance(value, dict) and 'cards' in value: return value.get('hero') or value['name']
+    if isinstance(value, (list, tuple)): return [_plain(v) for v in value]
+    if isinstance(value, dict): return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+@pytest.mark.parametrize("player_count", sorted(scheme_rules.SETUP_RULES))
+def test_compiled_rules_match_the_baseline_parser(shared, player_count):
+    # tests/data/baseline_scheme_mods.json is the scheme_mods the text parser
+    # built before the rules were compiled (all expansions, every random pick
+    # taking the first candidates), minus the defaults
+    with open(BASELINE_MODS, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    randomizer = app.LegendaryRandomizer(shared.all_sets, player_count)
+    assert randomizer.load_data()
+    defaults = scheme_rules.default_scheme_mods(player_count)
+    for scheme in randomizer.data['schemes']:
+        label = f"{scheme['name']} ({scheme['set']})"
+        expected = {**baseline[label][str(player_count)], **CHANGED.get(label, {})}
+        expected = {k: v for k, v in expected.items() if v != defaults[k]}
+
+        randomizer.reset(0)
+        randomizer.rng = FirstPick()
+        randomizer.parse_scheme_rules(scheme)
+        mods = {k: _plain(v) for k, v in randomizer.scheme_mods.items() if v != defaults[k]}
+        assert mods == expected, label
+
+
+def test_cached_records_match_a_fresh_compile(shared):
+    records = scheme_rules.load_compiled_schemes()
+    for scheme in shared.data['schemes']:
+        text = scheme_rules.scheme_text(scheme)
+        assert records[text] == scheme_rules.compile_scheme_text(text), scheme['name']
+
+def test_includes_keep_their_place_among_the_names():
+    # Rule order: a named Villain Group, an "Always include", then a Hero name
+    # constraint and another Villain Group (sections 7, 7b, 12 and 8)
+    record = {
+        "players": {p: {} for p in scheme_rules.SETUP_RULES},
+        "steps": [
+            {"op": "add", "field": "required_villains", "value": "Skrulls"},
+            {"op": "include", "name": "Hulk"},
+            {"op": "add", "field": "required_hero_deck_includes", "value": {"name": "Spider", "count": 2}},
+            {"op": "add", "field": "required_villains", "value": "Brotherhood"},
+            {"op": "include", "name": "Sentinel"},
+        ],
+    }
+    reqs = scheme_rules.scheme_requirements(record, 3)
+    assert reqs['required_villains'] == ["Skrulls", "Brotherhood"]
+    assert reqs['includes'] == [
+        {"name": "Hulk", "villains": 1, "henchmen": 0, "heroes": 0},
+        {"name": "Sentinel", "villains": 2, "henchmen": 0, "heroes": 2},
+    ]
+    assert [c['val'] for c in reqs['hero_constraints']] == ["Spider", "Spider"]